@@ -1,6 +1,8 @@
 """ This is the main module that builds all aspects of the latools program and runs the GUI."""
 
-print("LAtools is currently loading. Please wait. This may take several minutes.")
+# The worker processes of the slower stages import this module too, but only the program itself shows the message
+if __name__ == '__main__':
+	print("LAtools is currently loading. Please wait. This may take several minutes.")
 
 from PyQt5.QtWidgets import *
 from PyQt5.QtGui import QIcon, QKeyEvent, QDesktopServices
@@ -10,12 +12,14 @@ import os
 import latools as la
 import json
 import zipfile
+import multiprocessing
 
 # Import the templates
 from templates import titleScreen
 from templates import graphPane
 from templates import progressPane
 from templates import stageTabs
+from templates import batchWindow
 
 # Import the stage files
 from stages import importStage
@@ -28,6 +32,7 @@ from stages import filteringStage
 from stages import exportStage
 
 from project import runningProject
+from project import parallelProcessing
 
 import logging
 import logging.config
@@ -287,10 +292,24 @@ class MainWindow(QMainWindow):
 		saveLog.setStatusTip("Saves a zip folder of your error logs to the LAtools directory")
 		saveLog.triggered.connect(self.zipLogs)
 
+		# A file option for processing several data folders with one project's stage parameters
+		batchProcess = QAction(QIcon('open.png'), 'Batch processing', self)
+		batchProcess.setStatusTip("Process several data folders using the stage parameters of a saved project")
+		batchProcess.triggered.connect(self.batchProcessing)
+
+		# A file option for saving a snapshot of the processed data with the project, so that it opens quickly
+		useSnapshots = QAction('Use snapshots', self, checkable=True)
+		useSnapshots.setChecked(True)
+		useSnapshots.setStatusTip("Save the processed data with your project, so that it can be reopened without "
+								  "running each stage again")
+		useSnapshots.toggled.connect(self.snapshotsToggled)
+
 		menubar = self.menuBar()
 		fileMenu = menubar.addMenu('&File')
 		fileMenu.addAction(saveFile)
+		fileMenu.addAction(useSnapshots)
 		fileMenu.addAction(saveLog)
+		fileMenu.addAction(batchProcess)
 		# fileMenu.addAction(loadFile)
 		# fileMenu.addAction(exportFile)
 		# fileMenu.addAction(exitAct)
@@ -313,6 +332,17 @@ class MainWindow(QMainWindow):
 		""" Runs the save command on the current running project """
 		self.project.saveProject()
 	
+	def snapshotsToggled(self, checked):
+		"""
+		Turns the saving and loading of project snapshots on or off
+
+		Parameters
+		----------
+		checked : bool
+			Whether snapshots are used
+		"""
+		self.project.useSnapshots = checked
+
 	def exportButton(self):
 		""" Runs the export command on the current running project """
 		if self.project.eg is not None:
@@ -400,7 +430,7 @@ class MainWindow(QMainWindow):
 
 			if reply == QMessageBox.Yes:
 				# If yes is selected the project is saved, then closed
-				self.project.saveProject()
+				self.project.saveProject(wait=True)
 				event.accept()
 			elif reply == QMessageBox.No:
 				# If no, the project is closed
@@ -415,6 +445,11 @@ class MainWindow(QMainWindow):
 		self.configWindow = ConfigWindow(self.importStageObj)
 		self.configWindow.show()
 
+	def batchProcessing(self):
+		""" Displays the Batch Processing popup window """
+		self.batchWindow = batchWindow.BatchWindow(self.titleScreenObj.recentProjects)
+		self.batchWindow.show()
+
 	def setProjectTitle(self, title):
 		"""
 		Updates the program window with the project title
@@ -646,7 +681,10 @@ class ImportListener():
 			The index of the stage to load
 		"""
 		self.stageObjects[index].loadValues()
-		self.progressPane.progressUpdater.reset()
+
+		# If the stage's call is running, the progress bar is left for it to update
+		if not self.progressPane.project.stageRunner.isBusy():
+			self.progressPane.progressUpdater.reset()
 
 	def enterPressed(self, main, stage):
 		"""
@@ -665,6 +703,17 @@ class ImportListener():
 			# If we are on the stages screen, the command is sent to the indexed stage
 			self.stageObjects[stage].enterPressed()
 
+	def setOutdatedStages(self, indexes):
+		"""
+		Marks the stages whose results were made from an older version of an earlier stage's result
+
+		Parameters
+		----------
+		indexes : [int]
+			The indexes of the out of date stages
+		"""
+		self.stageTabs.setOutdated(indexes)
+
 	def loadFilters(self, filters, filterOnOff):
 		"""
 		The filter information from the save file which is currently being loaded is sent to the filtering stage
@@ -713,6 +762,10 @@ class ImportListener():
 # run in a conditional that only accepts the main routine.
 if __name__ == '__main__':
 
+	# Some stages run across several processes, which must not start another copy of the program
+	# when it has been packaged as an executable
+	multiprocessing.freeze_support()
+
 	# Set the appropriate file paths to write logs to
 	if getattr(sys, 'frozen', False):
 		# If the program is running as a bundle, then get the relative directory
@@ -765,4 +818,8 @@ if __name__ == '__main__':
 	app = QApplication([])
 	main = MainWindow()
 	main.show()
-	sys.exit(app.exec_())
+	exitCode = app.exec_()
+
+	# The processes kept for the slower stages are stopped with the program
+	parallelProcessing.shutdownPool()
+	sys.exit(exitCode)
@@ -0,0 +1,205 @@
+"""
+Processes several data folders with the stage parameters of one saved project, each in its own process.
+This has no GUI dependencies, so the work can be sent to other processes.
+"""
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import multiprocessing
+import os
+import queue
+
+from project import lalogParser
+from project import replay
+
+# The states a project in the queue can be in
+QUEUED = "Queued"
+RUNNING = "Running"
+DONE = "Done"
+FAILED = "Failed"
+CANCELLED = "Cancelled"
+
+# The queue a worker process reports each project it starts to. Set by initWorker in each worker process.
+startedQueue = None
+
+
+def initWorker(started):
+	"""
+	Keeps the queue that the worker process reports the projects it starts to. Run as each worker process starts.
+
+	Parameters
+	----------
+	started : multiprocessing.Queue
+		The queue the index of each project is put in when it starts
+	"""
+	global startedQueue
+	startedQueue = started
+
+
+def outputNames(folders):
+	"""
+	Names the output sub-folder of each data folder after the data folder. Data folders with the same name,
+	such as a/run1 and b/run1, are told apart by a hash of their full path.
+
+	Parameters
+	----------
+	folders : [str]
+		The data folders
+
+	Returns
+	----------
+	[str] : The name of each data folder's output sub-folder
+	"""
+	names = [os.path.basename(os.path.normpath(folder)) for folder in folders]
+	counts = Counter(names)
+	for i, folder in enumerate(folders):
+		if counts[names[i]] > 1:
+			pathHash = hashlib.sha1(os.path.abspath(folder).encode("utf-8")).hexdigest()[:8]
+			names[i] = "{}_{}".format(names[i], pathHash)
+	return names
+
+
+def processFolder(dataFolder, templateFile, outdir, name, index=None):
+	"""
+	Replays a template project's stage calls on a data folder, and exports the results. Run in a worker process.
+
+	Parameters
+	----------
+	dataFolder : str
+		The folder of data files to process
+	templateFile : str
+		The .lalog file whose stage parameters are used
+	outdir : str
+		The folder the results are exported to
+	name : str
+		The name of the data folder's own sub-folder of outdir, from outputNames
+	index : int or None
+		The index of the project in its queue, which is reported once it has started
+
+	Returns
+	----------
+	str : The folder the results were exported to
+	"""
+	if startedQueue is not None and index is not None:
+		startedQueue.put(index)
+
+	contents = lalogParser.readLog(templateFile)
+
+	# Each project runs in its own process already, so despiking and autorange are run in that process
+	eg = replay.replay(contents, dataFolder=dataFolder, workers=1)
+	if eg is None:
+		raise ValueError("The template project has no import stage")
+
+	projectOutdir = os.path.join(outdir, name)
+	os.makedirs(projectOutdir, exist_ok=True)
+
+	# Sample statistics are only available once the background has been subtracted, as in the export stage
+	stats = None
+	if "bkgsub" in eg.stages_complete:
+		stats = replay.DEFAULT_STATS
+	replay.export(eg, projectOutdir, stats=stats)
+
+	# The log is saved so that the project can be opened in the GUI
+	eg.save_log(directory=projectOutdir, logname=name)
+
+	return projectOutdir
+
+
+class BatchQueue:
+	""" A list of data folders that are processed with the same template project, several at a time """
+
+	def __init__(self, templateFile, outdir, workers=None):
+		"""
+		Creates an empty queue
+
+		Parameters
+		----------
+		templateFile : str
+			The .lalog file whose stage parameters are used for every folder
+		outdir : str
+			The folder the results are exported to
+		workers : int or None
+			The number of projects processed at once. If None, one is processed on each core.
+		"""
+		self.templateFile = templateFile
+		self.outdir = outdir
+		self.workers = workers
+
+		self.folders = []
+		self.futures = []
+		self.executor = None
+
+		# The indices of the projects that the worker processes have started
+		self.startedQueue = None
+		self.started = set()
+
+	def start(self, folders):
+		"""
+		Starts processing the data folders
+
+		Parameters
+		----------
+		folders : [str]
+			The data folders to process
+		"""
+		self.folders = list(folders)
+		names = outputNames(self.folders)
+
+		# The pool is started from the GUI thread, so its processes are spawned rather than forked with the
+		# GUI's threads. Each one reports the projects it starts, as a queued future also counts as running.
+		context = multiprocessing.get_context('spawn')
+		self.startedQueue = context.Queue()
+		self.started = set()
+		self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+											initializer=initWorker, initargs=(self.startedQueue,))
+		self.futures = [self.executor.submit(processFolder, folder, self.templateFile, self.outdir, names[i], i)
+						for i, folder in enumerate(self.folders)]
+
+		# The pool closes itself once every project is done
+		self.executor.shutdown(wait=False)
+
+	def cancel(self):
+		""" Drops the projects that haven't started. Projects that are already running are finished. """
+		for future in self.futures:
+			future.cancel()
+
+	def status(self, index):
+		"""
+		Gets the state of a project in the queue
+
+		Parameters
+		----------
+		index : int
+			The index of the project's data folder
+
+		Returns
+		----------
+		(str, str) : The state of the project, and the output folder or error message once it is done
+		"""
+		future = self.futures[index]
+		self.collectStarted()
+
+		if future.cancelled():
+			return CANCELLED, ""
+		if not future.done():
+			if index in self.started:
+				return RUNNING, ""
+			return QUEUED, ""
+
+		error = future.exception()
+		if error is not None:
+			return FAILED, str(error)
+		return DONE, future.result()
+
+	def collectStarted(self):
+		""" Records the projects that the worker processes have reported starting since this was last called """
+		while True:
+			try:
+				self.started.add(self.startedQueue.get_nowait())
+			except queue.Empty:
+				return
+
+	def isFinished(self):
+		""" Returns True once every project is done, failed or cancelled """
+		return all(future.done() for future in self.futures)
@@ -0,0 +1,102 @@
+""" Works out the histograms of a crossplot on a worker thread, so that the crossplot window fills in as they are
+done instead of waiting for every pair """
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+import logging
+
+
+class CrossplotSignals(QObject):
+	""" The signals of a CrossplotBuilder, which are received on the GUI thread """
+
+	# Emitted with the key and PairHistograms of a crossplot, once its analytes and bins are known
+	prepared = pyqtSignal(object, object)
+
+	# Emitted with the key of a crossplot, and the (i, j) of a pair whose histogram is done
+	pairReady = pyqtSignal(object, int, int)
+
+	# Emitted with the key of a crossplot once every pair is done
+	finished = pyqtSignal(object)
+
+	# Emitted with the key of a crossplot, and the error, if it could not be made
+	failed = pyqtSignal(object, object)
+
+
+class CrossplotJob(QRunnable):
+	""" Works out every pair of a crossplot, stopping early if a newer request is made """
+
+	def __init__(self, builder, request, key, prepare):
+		"""
+		Parameters
+		----------
+		builder : CrossplotBuilder
+			The builder that made the job
+		request : int
+			The number of the request, used to tell whether it has been replaced
+		key : tuple
+			The key of the crossplot, which is sent with each signal
+		prepare : function
+			Called on the worker thread to get the crossplot's PairHistograms
+		"""
+		super().__init__()
+		self.builder = builder
+		self.request = request
+		self.key = key
+		self.prepare = prepare
+
+	def cancelled(self):
+		return self.request != self.builder.request
+
+	def run(self):
+		""" Works out each pair in turn on the worker thread, the analytes that vary the most first """
+		signals = self.builder.signals
+		try:
+			if self.cancelled():
+				return
+			histograms = self.prepare()
+			if self.cancelled():
+				return
+			signals.prepared.emit(self.key, histograms)
+
+			done = set(histograms.computedPairs())
+			for i, j in histograms.pairsBySpread():
+				if self.cancelled():
+					return
+				if (i, j) in done:
+					continue
+				histograms.pair(i, j)
+				signals.pairReady.emit(self.key, int(i), int(j))
+			signals.finished.emit(self.key)
+		except Exception as e:
+			logging.getLogger(__name__).error("Could not make the crossplot", exc_info=True)
+			if not self.cancelled():
+				signals.failed.emit(self.key, e)
+
+
+class CrossplotBuilder:
+	""" Makes one crossplot at a time on a worker thread. A newer request stops the one before it. """
+
+	def __init__(self):
+		self.signals = CrossplotSignals()
+
+		self.pool = QThreadPool()
+		self.pool.setMaxThreadCount(1)
+		self.request = 0
+
+	def build(self, key, prepare):
+		"""
+		Starts making a crossplot, stopping any crossplot that is being made
+
+		Parameters
+		----------
+		key : tuple
+			The key of the crossplot, which is sent with each signal
+		prepare : function
+			Called on the worker thread to get the crossplot's PairHistograms, such as from a cache
+		"""
+		self.request += 1
+		self.pool.start(CrossplotJob(self, self.request, key, prepare))
+
+	def cancel(self):
+		""" Stops the current crossplot after the pair it is working on """
+		self.request += 1
@@ -0,0 +1,334 @@
+"""
+Works out the 2D histograms drawn by the crossplot window. The units, valid values and bins of each analyte are
+found once for a crossplot, and every value is given the index of its bin. A pair's histogram is then a single
+bincount of the pair's combined bin indices, and the mirrored pair is its transpose. The histograms of recently
+viewed crossplots are cached, keyed by their sample, filter state and number of bins. The pairs can be worked out
+one at a time, such as by the CrossplotBuilder, starting with the analytes that vary the most.
+"""
+
+from collections import OrderedDict
+import threading
+
+import latools.helpers as helpers
+import numpy as np
+
+# The default memory budget of the cache, in bytes
+DEFAULT_BUDGET = 256 * 1024 ** 2
+
+
+def binEdges(values, bins):
+	"""
+	Works out evenly spaced bin edges that cover some values, as np.histogram does
+
+	Parameters
+	----------
+	values : array
+		The values, without any NaNs
+	bins : int
+		The number of bins
+
+	Returns
+	----------
+	array : The bins + 1 edges
+	"""
+	if len(values) == 0:
+		lo, hi = 0., 1.
+	else:
+		lo, hi = float(values.min()), float(values.max())
+	if lo == hi:
+		lo, hi = lo - 0.5, hi + 0.5
+	return np.linspace(lo, hi, bins + 1)
+
+
+def binIndices(values, edges):
+	"""
+	Finds the bin of each value, as np.histogram2d does, with the last bin including its upper edge
+
+	Parameters
+	----------
+	values : array
+		The values. Any that aren't finite are given bin 0, and should be left out by their mask.
+	edges : array
+		The bin edges
+
+	Returns
+	----------
+	array : The index of the bin of each value
+	"""
+	bins = len(edges) - 1
+	idx = np.searchsorted(edges, values, side='right') - 1
+	idx[values == edges[-1]] = bins - 1
+	np.clip(idx, 0, bins - 1, out=idx)
+	return idx.astype(np.uint16 if bins < 2 ** 16 else np.int64)
+
+
+class PairHistograms:
+	""" The histograms of every pair of analytes of one crossplot """
+
+	def __init__(self, analytes, values, masks, focusStage, internalStandard, bins):
+		"""
+		Finds the units, valid values and bins of every analyte. The histograms are worked out as they are needed.
+
+		Parameters
+		----------
+		analytes : [str]
+			The analytes, in the order of the crossplot's rows and columns
+		values : np.ndarray
+			The (analytes x time) nominal values of the analytes
+		masks : np.ndarray or None
+			A boolean (analytes x time) array, which is True where a value passes the filters, or a (time)
+			array if every analyte has the same filter. None if the values aren't filtered.
+		focusStage : str
+			The focus stage of the values, used to pick their units
+		internalStandard : str
+			The internal standard, used to pick the units of ratios
+		bins : int
+			The number of bins of each histogram, along each axis
+		"""
+		self.analytes = list(analytes)
+		self.bins = bins
+		self.lock = threading.Lock()
+
+		self.valid = np.isfinite(values)
+		if masks is not None:
+			self.valid &= masks
+
+		self.multipliers = {}
+		self.units = {}
+		self.edges = {}
+		# The coefficient of variation of each analyte's valid values, which orders the pairs
+		self.spread = np.full(len(self.analytes), -1.)
+		self.indices = np.zeros(values.shape, dtype=np.uint16 if bins < 2 ** 16 else np.int64)
+		for n, a in enumerate(self.analytes):
+			# The units are picked from every value, whether or not it is filtered out
+			self.multipliers[a], self.units[a] = helpers.helpers.unitpicker(np.nanmean(values[n]),
+																	focus_stage=focusStage,
+																	denominator=internalStandard)
+			scaled = values[n] * self.multipliers[a]
+			kept = scaled[self.valid[n]]
+			self.edges[a] = binEdges(kept, bins)
+			self.indices[n] = binIndices(np.where(self.valid[n], scaled, self.edges[a][0]), self.edges[a])
+
+			if len(kept) > 0 and np.mean(kept) != 0:
+				self.spread[n] = np.std(kept) / abs(np.mean(kept))
+
+		# The histograms of the pairs (i, j) with i < j. The pairs with i > j are their transposes.
+		self.histograms = {}
+
+	def pair(self, i, j):
+		"""
+		Gets the histogram of a pair, working it out if it hasn't been
+
+		Parameters
+		----------
+		i : int
+			The index of the pair's y analyte
+		j : int
+			The index of the pair's x analyte
+
+		Returns
+		----------
+		np.ndarray : The (bins x bins) counts, with rows for the bins of analyte i and columns for analyte j
+		"""
+		if i > j:
+			return self.pair(j, i).T
+
+		with self.lock:
+			hist = self.histograms.get((i, j))
+			# Another thread may finish the last pair and drop these meanwhile, so they are read together
+			valid, indices = self.valid, self.indices
+		if hist is not None:
+			return hist
+
+		both = valid[i] & valid[j]
+		combined = indices[i][both].astype(np.int64) * self.bins + indices[j][both]
+		hist = np.bincount(combined, minlength=self.bins ** 2).reshape(self.bins, self.bins)
+
+		with self.lock:
+			self.histograms[(i, j)] = hist
+			if self.indices is not None and self.complete():
+				# Every pair is done, so the bin indices aren't needed again
+				self.indices = None
+				self.valid = None
+		return hist
+
+	def pairs(self):
+		""" Gets the (i, j) of every pair with i < j """
+		return list(zip(*np.triu_indices(len(self.analytes), k=1)))
+
+	def pairsBySpread(self):
+		"""
+		Gets every pair with i < j, starting with the pairs of the analytes that vary the most. Each analyte is
+		paired with every analyte that varies more than it before the next analyte is started.
+
+		Returns
+		----------
+		[(int, int)] : The pairs, in the order they should be worked out
+		"""
+		ranks = np.empty(len(self.analytes), dtype=int)
+		ranks[np.argsort(-self.spread, kind='stable')] = np.arange(len(self.analytes))
+		return sorted(self.pairs(), key=lambda p: (max(ranks[p[0]], ranks[p[1]]), min(ranks[p[0]], ranks[p[1]])))
+
+	def computedPairs(self):
+		""" Gets the (i, j) of every pair with i < j whose histogram has been worked out """
+		with self.lock:
+			return list(self.histograms.keys())
+
+	def complete(self):
+		""" Checks whether the histogram of every pair has been worked out """
+		n = len(self.analytes)
+		return len(self.histograms) == n * (n - 1) // 2
+
+	def nbytes(self):
+		""" Returns the memory used by the histograms and bin indices, in bytes """
+		with self.lock:
+			total = sum(h.nbytes for h in self.histograms.values())
+			if self.indices is not None:
+				total += self.indices.nbytes + self.valid.nbytes
+			return total
+
+
+def sampleArrays(dat, analytes, filt):
+	"""
+	Copies the values and filter masks of a single sample out of its data object. This is done on the GUI thread,
+	so that the histograms can be worked out on a worker thread without reading the analyse object.
+
+	Parameters
+	----------
+	dat : latools.D
+		The sample's data object
+	analytes : [str]
+		The analytes to cross plot
+	filt : bool
+		Whether the values left out by the sample's filters are left out of the histograms
+
+	Returns
+	----------
+	(np.ndarray, np.ndarray or None) : The (analytes x time) nominal values, and the matching filter masks,
+		or None if the values aren't filtered
+	"""
+	values = np.array([helpers.stat_fns.nominal_values(dat.focus[a]) for a in analytes], dtype=float)
+	masks = None
+	if filt:
+		masks = np.array([dat.filt.grab_filt(True, a) for a in analytes], dtype=bool)
+	return values, masks
+
+
+def sessionArrays(eg, analytes, filt, samples=None, subset=None):
+	"""
+	Copies the values and filter masks of every sample out of the analyse object, joined end to end as
+	eg.get_focus does, but without changing eg.focus. This is done on the GUI thread, so that the histograms can
+	be worked out on a worker thread without reading the analyse object.
+
+	Parameters
+	----------
+	eg : latools.analyse
+		The analyse object
+	analytes : [str]
+		The analytes to cross plot
+	filt : bool
+		Whether the values left out by each sample's filters are left out of the histograms
+	samples : [str] or None
+		The samples to include. If None, the samples of the subset are used.
+	subset : str or None
+		The subset of samples to include. If None, every sample is used.
+
+	Returns
+	----------
+	(np.ndarray, np.ndarray) : The (analytes x time) nominal values, and the filter mask of each time
+	"""
+	if samples is None:
+		samples = eg._get_samples(subset)
+
+	values = []
+	masks = []
+	for sample in samples:
+		dat = eg.data[sample]
+		values.append([helpers.stat_fns.nominal_values(dat.focus[a]) for a in analytes])
+		masks.append(dat.filt.grab_filt(filt))
+
+	if len(values) == 0:
+		return np.zeros((len(analytes), 0)), np.zeros(0, dtype=bool)
+	return np.concatenate(values, axis=1).astype(float), np.concatenate(masks).astype(bool)
+
+
+def filterState(eg, sample, filt):
+	"""
+	Describes the state of the filters that a crossplot depends on, for use in its cache key
+
+	Parameters
+	----------
+	eg : latools.analyse
+		The analyse object
+	sample : str
+		The sample of the crossplot, or "ALL" for every sample
+	filt : bool
+		Whether the crossplot is filtered
+
+	Returns
+	----------
+	str : The focus stage, and the filter switches if the crossplot is filtered
+	"""
+	if not filt:
+		return eg.focus_stage
+	if sample == "ALL":
+		return eg.focus_stage + repr([d.filt.switches for d in eg.data.values()])
+	return eg.focus_stage + repr(eg.data[sample].filt.switches)
+
+
+class HistogramCache:
+	""" The histograms of the most recently viewed crossplots, within a memory budget """
+
+	def __init__(self, budget=DEFAULT_BUDGET):
+		"""
+		Creates an empty cache
+
+		Parameters
+		----------
+		budget : int
+			The most memory the cache keeps, in bytes. The most recently used crossplot is always kept.
+		"""
+		self.budget = budget
+		self.entries = OrderedDict()
+		self.lock = threading.RLock()
+
+	def get(self, key):
+		"""
+		Gets the cached histograms of a crossplot, marking them as the most recently used
+
+		Parameters
+		----------
+		key : tuple
+			The (sample, filter state, bins) of the crossplot
+
+		Returns
+		----------
+		PairHistograms or None : The histograms, or None if they aren't cached
+		"""
+		with self.lock:
+			histograms = self.entries.get(key)
+			if histograms is not None:
+				self.entries.move_to_end(key)
+			return histograms
+
+	def add(self, key, histograms):
+		""" Caches the histograms of a crossplot """
+		with self.lock:
+			self.entries[key] = histograms
+			self.entries.move_to_end(key)
+			self.trim()
+
+	def nbytes(self):
+		""" Returns the memory used by the cached histograms, in bytes """
+		return sum(h.nbytes() for h in self.entries.values())
+
+	def trim(self):
+		""" Drops the least recently used crossplots until the cache is within its budget """
+		with self.lock:
+			while len(self.entries) > 1 and self.nbytes() > self.budget:
+				self.entries.popitem(last=False)
+
+	def clear(self):
+		""" Drops every crossplot, such as when a stage has been applied and the data has changed """
+		with self.lock:
+			self.entries.clear()
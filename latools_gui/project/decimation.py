@@ -0,0 +1,179 @@
+"""
+Reduces long traces to about as many points as the graph has pixels. Each trace is summarised once into a pyramid of
+levels, where each level keeps the minimum and maximum of twice as many samples as the level below it. Drawing the
+minimum and maximum of each bucket means that spikes are still drawn, however far the graph is zoomed out.
+This has no GUI dependencies.
+"""
+
+import numpy as np
+
+# The number of buckets in the coarsest level, which is drawn for the parts of the trace outside the view
+TOP_BUCKETS = 512
+
+# The width used if the graph hasn't been shown yet, in pixels
+DEFAULT_PIXELS = 1000
+
+
+def combinePairs(y, index, pick):
+	"""
+	Combines neighbouring pairs of buckets into one, keeping the minimum or maximum of each pair and its position
+
+	Parameters
+	----------
+	y : np.ndarray
+		The minimum or maximum of each bucket, which may be NaN
+	index : np.ndarray
+		The sample index of each value in y
+	pick : callable
+		np.fmin or np.fmax, which ignore NaN values
+
+	Returns
+	----------
+	(np.ndarray, np.ndarray) : The combined values, and their sample indexes
+	"""
+	if len(y) % 2 == 1:
+		y = np.append(y, np.nan)
+		index = np.append(index, index[-1])
+
+	a, b = y[0::2], y[1::2]
+	ia, ib = index[0::2], index[1::2]
+
+	combined = pick(a, b)
+	# The second of the pair is kept if it was picked, or if the first is NaN
+	useB = (combined == b) & ((combined != a) | np.isnan(a))
+	return combined, np.where(useB, ib, ia)
+
+
+class MinMaxPyramid:
+	""" The minimum and maximum of a trace over buckets of 2, 4, 8, ... samples """
+
+	def __init__(self, x, y, topBuckets=TOP_BUCKETS):
+		"""
+		Builds every level of the pyramid
+
+		Parameters
+		----------
+		x : np.ndarray
+			The sample times, in increasing order
+		y : np.ndarray
+			The sample values. NaN values are left as gaps in the trace.
+		topBuckets : int
+			The most buckets in the coarsest level
+		"""
+		self.x = np.asarray(x, dtype=float)
+		self.y = np.asarray(y, dtype=float)
+
+		# Each level is a tuple of (minimum, minimum index, maximum, maximum index) for each bucket.
+		# Level 0 is the trace itself, with buckets of one sample.
+		index = np.arange(len(self.y))
+		self.levels = [(self.y, index, self.y, index)]
+
+		while len(self.levels[-1][0]) > topBuckets:
+			lowY, lowI, highY, highI = self.levels[-1]
+			self.levels.append(combinePairs(lowY, lowI, np.fmin) + combinePairs(highY, highI, np.fmax))
+
+	def __len__(self):
+		return len(self.y)
+
+	def nbytes(self):
+		""" Returns the memory used by the pyramid's levels, in bytes """
+		return sum(array.nbytes for level in self.levels[1:] for array in level) + self.x.nbytes + self.y.nbytes
+
+	def levelFor(self, samples, pixels):
+		"""
+		Chooses the coarsest level that still has a bucket for each pixel
+
+		Parameters
+		----------
+		samples : int
+			The number of samples in view
+		pixels : int
+			The width of the graph in pixels
+
+		Returns
+		----------
+		int : The level to draw
+		"""
+		if pixels <= 0 or samples <= pixels:
+			return 0
+		return min(int(np.log2(samples / pixels)), len(self.levels) - 1)
+
+	def points(self, level, start, stop):
+		"""
+		Gets the points to draw for a range of buckets in a level. Each bucket gives its minimum and maximum,
+		in the order they occur.
+
+		Parameters
+		----------
+		level : int
+			The level of the pyramid
+		start : int
+			The first bucket
+		stop : int
+			The bucket after the last
+
+		Returns
+		----------
+		(np.ndarray, np.ndarray) : The x and y values of the points
+		"""
+		if level == 0:
+			return self.x[start:stop], self.y[start:stop]
+
+		lowY, lowI, highY, highI = [array[start:stop] for array in self.levels[level]]
+
+		lowFirst = lowI <= highI
+		index = np.empty(2 * len(lowY), dtype=lowI.dtype)
+		y = np.empty(2 * len(lowY))
+		index[0::2] = np.where(lowFirst, lowI, highI)
+		index[1::2] = np.where(lowFirst, highI, lowI)
+		y[0::2] = np.where(lowFirst, lowY, highY)
+		y[1::2] = np.where(lowFirst, highY, lowY)
+
+		return self.x[index], y
+
+	def select(self, xmin=None, xmax=None, pixels=DEFAULT_PIXELS):
+		"""
+		Gets the points to draw for a view of the trace. The view is drawn with about two points per pixel,
+		and the rest of the trace with the coarsest level, so that the whole trace is always drawn.
+
+		Parameters
+		----------
+		xmin : float
+			The left of the view, or None for the start of the trace
+		xmax : float
+			The right of the view, or None for the end of the trace
+		pixels : int
+			The width of the graph in pixels
+
+		Returns
+		----------
+		(np.ndarray, np.ndarray) : The x and y values of the points
+		"""
+		n = len(self.y)
+		top = len(self.levels) - 1
+		if top == 0:
+			return self.x, self.y
+
+		# The samples in view, with one more on each side so that the line reaches the edges
+		first = 0 if xmin is None else max(int(np.searchsorted(self.x, xmin)) - 1, 0)
+		last = n if xmax is None else min(int(np.searchsorted(self.x, xmax)) + 1, n)
+		if last <= first:
+			return self.levelPoints(top)
+
+		level = self.levelFor(last - first, pixels)
+
+		# The view is widened to whole buckets of the coarsest level, so the levels join without a gap
+		topStart = first >> top
+		topStop = ((last - 1) >> top) + 1
+		start = topStart << top
+		stop = min(topStop << top, n)
+
+		parts = [self.points(top, 0, topStart),
+				 self.points(level, start >> level, ((stop - 1) >> level) + 1),
+				 self.points(top, topStop, len(self.levels[top][0]))]
+
+		return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+	def levelPoints(self, level):
+		""" Gets the points to draw for every bucket of a level """
+		return self.points(level, 0, len(self.levels[level][0]))
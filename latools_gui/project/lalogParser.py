@@ -0,0 +1,209 @@
+"""
+Reads the stage calls out of an .lalog file. This has no GUI dependencies, so that saved projects can also be
+replayed from the command line.
+"""
+
+from collections import namedtuple
+import ast
+import re
+
+# The stage parameter lists, the name they are saved under, and the index of the stage they complete
+STAGE_CALLS = [("__init__", "import", 0),
+			   ("despike", "despike", 1),
+			   ("autorange", "autorange", 2),
+			   ("bkg_calc_weightedmean", "bkg_calc_weightedmean", 2),
+			   ("bkg_calc_interp1d", "bkg_calc_interp1d", 2),
+			   ("bkg_subtract", "bkg_subtract", 3),
+			   ("ratio", "ratio", 4),
+			   ("calibrate", "calibrate", 5)]
+
+# Only one of the background calculations is kept: whichever was run most recently
+EXCLUSIVE_CALLS = {"bkg_calc_weightedmean": "bkg_calc_interp1d",
+				   "bkg_calc_interp1d": "bkg_calc_weightedmean"}
+
+# The filter calls that are replayed when loading the filtering stage
+FILTER_CALLS = ["filter_threshold",
+				"filter_threshold_percentile",
+				"filter_gradient_threshold",
+				"filter_trim",
+				"filter_correlation",
+				"filter_defragment",
+				"filter_exclude_downhole",
+				"filter_clustering",
+				"optimise_signal"]
+
+# The calls that turn filters on and off
+FILTER_SWITCHES = ["filter_on", "filter_off"]
+
+
+# A stage call, filter or filter switch that has been read from the log
+FilterCall = namedtuple("FilterCall", ["call", "params"])
+FilterSwitch = namedtuple("FilterSwitch", ["call", "args"])
+
+# Every call is written to the log as "name :: args=(...) kwargs={...}"
+CALL_PATTERN = re.compile(r"^(?P<call>\w+) :: args=(?P<args>.*) kwargs=(?P<kwargs>\{.*\})$")
+
+# The stage calls, keyed by their name, with the name they are saved under and the index of the stage
+STAGE_LOOKUP = {call: (stage, index) for call, stage, index in STAGE_CALLS}
+
+
+class LogContents:
+	""" The stage parameters, filters and filter switches saved in an .lalog file """
+
+	def __init__(self):
+		"""
+		Creates an empty record, as for a project with no completed stages.
+		"""
+
+		# The keyword arguments of each stage call, keyed by the stage's saved name
+		self.stageParams = {}
+
+		# The index of the last completed stage, or -1 if there are none
+		self.lastStage = -1
+
+		# A list of filter calls, as FilterCall("filter name", {filter params})
+		self.filters = []
+
+		# A list of filter on and off calls, as FilterSwitch("filter_on" or "filter_off", (filter name, [analyte]))
+		self.filterOnOff = []
+
+	def updateLastStage(self, index):
+		"""
+		Keeps track of the last completed stage
+
+		Parameters
+		----------
+		index : int
+			The index of a completed stage
+		"""
+		if index > self.lastStage:
+			self.lastStage = index
+
+
+def parseLog(logFileStrings):
+	"""
+	Reads the stage calls from the lines of an .lalog file. Each line is read once, and is matched to its call
+	by name.
+
+	Parameters
+	----------
+	logFileStrings : [str]
+		The lines of the log file
+
+	Returns
+	----------
+	LogContents : The stage parameters, filters and filter switches in the file
+	"""
+	contents = LogContents()
+
+	for line in logFileStrings:
+		match = CALL_PATTERN.match(line)
+		if match is None:
+			continue
+
+		call = match.group("call")
+		args = match.group("args")
+
+		# Stage and filter calls are only made with keyword arguments
+		if call in STAGE_LOOKUP and args == "()":
+			stage, index = STAGE_LOOKUP[call]
+			contents.stageParams[stage] = ast.literal_eval(match.group("kwargs"))
+			# We remove any past instances of the alternative call
+			if stage in EXCLUSIVE_CALLS:
+				contents.stageParams.pop(EXCLUSIVE_CALLS[stage], None)
+			contents.updateLastStage(index)
+
+		elif call in FILTER_CALLS and args == "()":
+			contents.filters.append(FilterCall(call, ast.literal_eval(match.group("kwargs"))))
+
+		elif call in FILTER_SWITCHES and match.group("kwargs") == "{}":
+			contents.filterOnOff.append(FilterSwitch(call, ast.literal_eval(args)))
+
+	# Only the final state of each filter switch needs to be replayed
+	contents.filterOnOff = collapseSwitches(contents.filterOnOff)
+
+	return contents
+
+
+def collapseSwitches(filterOnOff):
+	"""
+	Removes the filter on and off calls that are overridden by a later call, such as from a checkbox being toggled
+	several times. Replaying the remaining calls in order gives the same filter state.
+
+	Parameters
+	----------
+	filterOnOff : [FilterSwitch]
+		The filter on and off calls, in the order they were made
+
+	Returns
+	----------
+	[FilterSwitch] : The calls that affect the final state, in the order they were made
+	"""
+
+	# The switches are keyed by the filter and analyte they affect, and are kept in the order they were last made
+	switches = {}
+	for switch in filterOnOff:
+		args = switch.args
+
+		if len(args) == 0:
+			# A switch with no filter affects every filter
+			switches = {}
+		elif len(args) == 1:
+			# A switch with no analyte affects every analyte of the filter
+			switches = {key: value for key, value in switches.items() if key[0] != repr(args[0])}
+
+		key = tuple(repr(arg) for arg in args[:2])
+		switches.pop(key, None)
+		switches[key] = switch
+
+	return list(switches.values())
+
+
+def isFilterLine(line):
+	"""
+	Checks whether a line of an .lalog file creates, changes or switches a filter
+
+	Parameters
+	----------
+	line : str
+		A line of the log file
+
+	Returns
+	----------
+	bool : True if the line is a filter call
+	"""
+	call = line.split(" :: ", 1)[0]
+	return call.startswith("filter_") or call in FILTER_CALLS
+
+
+def blankNones(stageParams):
+	"""
+	Replaces any parameters that are listed as None with an empty string, as they would appear in the stage
+	parameter textboxes. The stages treat a blank textbox as None, or as the parameter's default.
+
+	Parameters
+	----------
+	stageParams : dict
+		The keyword arguments of each stage call, keyed by the stage's saved name. Updated in place.
+	"""
+	for stage in stageParams.keys():
+		for key in stageParams[stage].keys():
+			if stageParams[stage][key] is None:
+				stageParams[stage][key] = ""
+
+
+def readLog(fileName):
+	"""
+	Reads the stage calls from an .lalog file
+
+	Parameters
+	----------
+	fileName : str
+		The path to the log file
+
+	Returns
+	----------
+	LogContents : The stage parameters, filters and filter switches in the file
+	"""
+	with open(fileName, "r") as logFile:
+		return parseLog(logFile.read().splitlines())
@@ -0,0 +1,378 @@
+"""
+Runs the per-sample work of the slower stage calls across a pool of processes.
+
+The latools analyse object processes its samples one after another, but several of its steps are independent
+for each sample. These functions split those steps across a ProcessPoolExecutor, then merge the results back
+into the analyse object, so that it ends up in the same state (and with the same log entry) as if the analyse
+method had been called directly.
+
+The pool is started on the stage runner's worker thread, so its processes are always spawned rather than
+forked. A forked process would copy the GUI's threads and locks in whatever state they were in. Spawning a
+process is slow, so the one pool is kept between stage calls and its processes only start once.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import os
+import threading
+import warnings
+
+import matplotlib.pyplot as plt
+
+
+def workerCount(workers=None):
+	"""
+	Works out how many processes to use
+
+	Parameters
+	----------
+	workers : int or None
+		The requested number of processes. If None, one process is used for each of the machine's cores.
+
+	Returns
+	----------
+	int : The number of processes, at least 1
+	"""
+	if workers is None:
+		workers = os.cpu_count() or 1
+	return max(1, int(workers))
+
+
+# The pool of processes shared by the stage calls, and the number of processes it was started with
+sharedPool = None
+sharedPoolWorkers = None
+sharedPoolLock = threading.Lock()
+
+
+def processPool(workers):
+	"""
+	Gets the pool of processes shared by the stage calls, starting it if there isn't one with the requested number
+	of processes. The pool starts each process the first time it is needed.
+
+	Parameters
+	----------
+	workers : int
+		The number of processes
+
+	Returns
+	----------
+	ProcessPoolExecutor : The pool
+	"""
+	global sharedPool, sharedPoolWorkers
+	with sharedPoolLock:
+		if sharedPool is not None and sharedPoolWorkers != workers:
+			sharedPool.shutdown(wait=False)
+			sharedPool = None
+
+		if sharedPool is None:
+			sharedPool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+			sharedPoolWorkers = workers
+		return sharedPool
+
+
+def shutdownPool():
+	""" Stops the processes of the shared pool, such as when the program is closed """
+	global sharedPool
+	with sharedPoolLock:
+		if sharedPool is not None:
+			sharedPool.shutdown(wait=False)
+			sharedPool = None
+
+
+def runSamples(eg, worker, args, workers, desc, samples=None):
+	"""
+	Runs a worker function for every sample of the analyse object, across a pool of processes.
+
+	Parameters
+	----------
+	eg : latools.analyse
+		The analyse object
+	worker : function
+		A module-level function, called as worker(d, *args) with a copy of each sample's data object.
+		It must return a picklable result.
+	args : tuple
+		The other arguments for the worker function
+	workers : int
+		The number of processes to use
+	desc : str
+		Description for the progress bar
+	samples : [str] or None
+		The samples to run the worker for. If None, every sample is used.
+
+	Returns
+	----------
+	dict : The worker's result for each sample name
+	"""
+	if samples is None:
+		samples = list(eg.data.keys())
+
+	results = {}
+	with eg.pbar.set(total=len(samples), desc=desc) as prog:
+		futures = {}
+		try:
+			executor = processPool(workers)
+			for s in samples:
+				futures[executor.submit(worker, eg.data[s], *args)] = s
+			for future in as_completed(futures):
+				results[futures[future]] = future.result()
+				prog.update()
+		except BrokenProcessPool:
+			# A process of the pool has died, so a new pool is started for the next call
+			shutdownPool()
+			raise
+		except BaseException:
+			# If a sample fails, or the job is cancelled, the samples that haven't started are dropped
+			for future in futures:
+				future.cancel()
+			raise
+	return results
+
+
+def despikeSample(d, expdecay_despiker, exponent, noise_despiker, win, nlim, maxiter):
+	"""
+	Despikes a single sample. Run in a worker process.
+
+	Returns
+	----------
+	(Bunch, array, list) : The sample's despiked data, recalculated total counts, and log with the despike call
+	"""
+	d.despike(expdecay_despiker, exponent, noise_despiker, win, nlim, maxiter)
+	return d.data['despiked'], d.data['total_counts'], d.log
+
+
+def despike(eg, workers=None, expdecay_despiker=False, exponent=None, noise_despiker=True, win=3, nlim=12.,
+			exponentplot=False, maxiter=4, autorange_kwargs={}, focus_stage='rawdata'):
+	"""
+	A parallel version of latools.analyse.despike. The parameters are the same, apart from workers.
+
+	Parameters
+	----------
+	eg : latools.analyse
+		The analyse object to despike
+	workers : int or None
+		The number of processes to use. If None, one process is used for each core.
+	"""
+	# The keyword arguments are logged as they would be by latools
+	kwargs = {"expdecay_despiker": expdecay_despiker,
+			  "exponent": exponent,
+			  "noise_despiker": noise_despiker,
+			  "win": win,
+			  "nlim": nlim,
+			  "exponentplot": exponentplot,
+			  "maxiter": maxiter}
+
+	workers = workerCount(workers)
+
+	# With only one process there's nothing to gain, so latools does the work itself
+	if workers == 1:
+		eg.despike(**kwargs)
+		return
+
+	if focus_stage != eg.focus_stage:
+		eg.set_focus(focus_stage)
+
+	# The exponent is found once, from the standards, before the samples are split up
+	if expdecay_despiker and exponent is None:
+		if not hasattr(eg, 'expdecay_coef'):
+			eg.find_expcoef(plot=exponentplot, autorange_kwargs=autorange_kwargs)
+		exponent = eg.expdecay_coef
+
+	results = runSamples(eg, despikeSample,
+						 (expdecay_despiker, exponent, noise_despiker, win, nlim, maxiter),
+						 workers, 'Despiking')
+
+	# The results are merged back in the order of the samples, once they are all complete
+	for s, d in eg.data.items():
+		d.data['despiked'], d.data['total_counts'], log = results[s]
+		d.setfocus('despiked')
+		# The worker's log already records the focus change, as it is made by the sample's own despike
+		d.log = log
+
+	eg.stages_complete.update(['despiked'])
+	eg.focus_stage = 'despiked'
+
+	eg.log.append('despike :: args=() kwargs={}'.format(kwargs))
+
+
+# The attributes of a sample that are set by its autorange method
+AUTORANGE_ATTRIBUTES = ('bkg', 'sig', 'trn', 'bkgrng', 'sigrng', 'trnrng', 'ns', 'n', 'log')
+
+
+def autorangeSample(d, analyte, gwin, swin, win, on_mult, off_mult, transform):
+	"""
+	Finds the signal and background ranges of a single sample. Run in a worker process.
+
+	Returns
+	----------
+	(dict, list or None) : The sample attributes set by autorange, and the times of any transitions that
+		couldn't be found
+	"""
+	# latools only returns the failed transitions along with a plot of them, which the worker process can
+	# only draw to a file
+	plt.switch_backend('agg')
+
+	failed = d.autorange(analyte=analyte, gwin=gwin, swin=swin, win=win, on_mult=on_mult, off_mult=off_mult,
+						 ploterrs=True, transform=transform)
+	plotlines = None
+	if failed is not None:
+		f, plotlines = failed
+		plt.close(f)
+	return {a: getattr(d, a) for a in AUTORANGE_ATTRIBUTES if hasattr(d, a)}, plotlines
+
+
+def autorangeWarning(fails):
+	"""
+	Warns about the samples whose transitions couldn't all be found, with the same message as
+	latools.analyse.autorange
+
+	Parameters
+	----------
+	fails : dict
+		The times of the failed transitions, for each sample that has any
+	"""
+	wstr = ('\n\n' + '*' * 41 + '\n' +
+			'                 WARNING\n' + '*' * 41 + '\n' +
+			'Autorange failed for some samples:\n')
+
+	kwidth = max([len(k) for k in fails.keys()]) + 1
+	fstr = '  {:' + '{}'.format(kwidth) + 's}: '
+	for k in sorted(fails.keys()):
+		wstr += fstr.format(k) + ', '.join(['{:.1f}'.format(f) for f in fails[k]]) + '\n'
+
+	wstr += ('\n*** THIS IS NOT NECESSARILY A PROBLEM ***\n' +
+			 'But please check the plots below to make\n' +
+			 'sure they look OK. Failures are marked by\n' +
+			 'dashed vertical red lines.\n\n' +
+			 'To examine an autorange failure in more\n' +
+			 'detail, use the `autorange_plot` method\n' +
+			 'of the failing data object, e.g.:\n' +
+			 "dat.data['Sample'].autorange_plot(params)\n" +
+			 '*' * 41 + '\n')
+	warnings.warn(wstr)
+
+
+def autorange(eg, workers=None, analyte='total_counts', gwin=5, swin=3, win=20, on_mult=[1., 1.5],
+			  off_mult=[1.5, 1], transform='log'):
+	"""
+	A parallel version of latools.analyse.autorange. The parameters are the same, apart from workers.
+	Each sample is processed by the same latools code as the serial version, so the ranges and the warning
+	about failed transitions are identical.
+
+	Parameters
+	----------
+	eg : latools.analyse
+		The analyse object to autorange
+	workers : int or None
+		The number of processes to use. If None, one process is used for each core.
+	"""
+	# The keyword arguments are logged as they would be by latools
+	kwargs = {"analyte": analyte,
+			  "gwin": gwin,
+			  "swin": swin,
+			  "win": win,
+			  "on_mult": on_mult,
+			  "off_mult": off_mult,
+			  "transform": transform}
+
+	workers = workerCount(workers)
+
+	# With only one process there's nothing to gain, so latools does the work itself
+	if workers == 1:
+		eg.autorange(**kwargs)
+		return
+
+	# An analyte of None is passed on, so that each sample's autorange treats it as latools does
+	if analyte in eg.analytes:
+		eg.minimal_analytes.update([analyte])
+
+	results = runSamples(eg, autorangeSample,
+						 (analyte, gwin, swin, win, on_mult, off_mult, transform),
+						 workers, 'AutoRange')
+
+	# The results are merged back in the order of the samples, once they are all complete
+	fails = {}
+	for s, d in eg.data.items():
+		attributes, plotlines = results[s]
+		for a, v in attributes.items():
+			setattr(d, a, v)
+		if plotlines is not None:
+			fails[s] = plotlines
+
+	if len(fails) > 0:
+		autorangeWarning(fails)
+
+	eg.stages_complete.update(['autorange'])
+
+	eg.log.append('autorange :: args=() kwargs={}'.format(kwargs))
+
+
+def plotSample(d, outdir, analytes, focus, plotKwargs):
+	"""
+	Draws the trace plot of a single sample and saves it as a pdf. Run in a worker process.
+
+	Returns
+	----------
+	str : The path to the saved plot
+	"""
+	# The worker process has no windows to draw to, so the figure is only drawn to the file
+	plt.switch_backend('agg')
+
+	f, a = d.tplot(analytes=analytes, focus_stage=focus, **plotKwargs)
+	plotFile = os.path.join(outdir, d.sample + '_traces.pdf')
+	f.savefig(plotFile)
+	plt.close(f)
+	return plotFile
+
+
+def tracePlots(eg, workers=None, **kwargs):
+	"""
+	A parallel version of latools.analyse.trace_plots. The parameters are the same, apart from workers.
+	Each sample's plot is drawn by the same latools code as the serial version, and saved to the same file.
+
+	Parameters
+	----------
+	eg : latools.analyse
+		The analyse object to plot
+	workers : int or None
+		The number of processes to use. If None, one process is used for each core.
+	"""
+	workers = workerCount(workers)
+
+	# With only one process there's nothing to gain, so latools does the work itself
+	if workers == 1:
+		eg.trace_plots(**kwargs)
+		return
+
+	focus = kwargs.get('focus')
+	if focus is None:
+		focus = eg.focus_stage
+	outdir = kwargs.get('outdir')
+	if outdir is None:
+		outdir = os.path.join(eg.report_dir, focus)
+	if not os.path.isdir(outdir):
+		os.mkdir(outdir)
+
+	# trace_plots sorts the analytes in the latools versions that have analytes_sorted, and uses them as given
+	# in older versions, so each plot's traces and legend are in the same order as the serial version's
+	analytes = kwargs.get('analytes')
+	if hasattr(eg, 'analytes_sorted'):
+		analytes = eg.analytes_sorted(analytes, focus_stage=focus)
+
+	samples = kwargs.get('samples')
+	if kwargs.get('subset') is not None:
+		samples = eg._get_samples(kwargs['subset'])
+	elif samples is None:
+		samples = eg.subsets['All_Analyses']
+	elif isinstance(samples, str):
+		samples = [samples]
+
+	# The plotting options are given to each sample's tplot, with trace_plots' defaults
+	plotKwargs = {'figsize': [10, 4], 'scale': 'log', 'filt': None, 'ranges': False, 'stats': False,
+				  'stat': 'nanmean', 'err': 'nanstd'}
+	plotKwargs.update({k: v for k, v in kwargs.items() if k in plotKwargs})
+
+	runSamples(eg, plotSample, (outdir, analytes, focus, plotKwargs), workers, 'Drawing Plots',
+			   samples=list(samples))
+
+	eg.log.append('trace_plots :: args=() kwargs={}'.format(kwargs))
@@ -0,0 +1,170 @@
+"""
+Keeps track of which stage results are up to date. The stage calls form a chain, where each call works on the
+results of the calls before it. Each result is recorded under a hash of its call's parameters and the hash of the
+result it was made from, so that a call with unchanged parameters doesn't need to be run again, and the results
+that were made from an older version of a changed result can be found.
+This has no GUI dependencies.
+"""
+
+from collections import namedtuple
+import hashlib
+import json
+
+# The calls in the order they are applied, and the index of the stage in latoolsgui.STAGES that makes them.
+# Both background calculations make the same result, so they are recorded as the one "bkg_calc" call.
+PIPELINE_CALLS = [("import", 0),
+				  ("despike", 1),
+				  ("autorange", 2),
+				  ("bkg_calc", 3),
+				  ("bkg_subtract", 3),
+				  ("ratio", 4),
+				  ("calibrate", 5),
+				  ("filtering", 6),
+				  ("export", 7)]
+
+# Stage calls that are recorded under another call's name
+CALL_ALIASES = {"bkg_calc_weightedmean": "bkg_calc",
+				"bkg_calc_interp1d": "bkg_calc"}
+
+# A recorded result: the hash it is recorded under, the call and parameters that made it, and its return value
+Record = namedtuple("Record", ["hash", "call", "params", "result"])
+
+
+class Pipeline:
+	""" The recorded results of each stage call, and which of them are out of date """
+
+	def __init__(self, calls=PIPELINE_CALLS):
+		"""
+		Creates an empty pipeline, as for a project with no completed stages
+
+		Parameters
+		----------
+		calls : [(str, int)]
+			The calls in the order they are applied, and the index of the stage that makes each of them
+		"""
+		self.calls = [call for call, index in calls]
+		self.stageIndex = dict(calls)
+
+		# The most recent result of each call
+		self.records = {}
+
+		# The calls whose recorded result was made from an older version of an earlier result
+		self.outdated = set()
+
+	def node(self, call):
+		""" Gets the name a stage call is recorded under """
+		return CALL_ALIASES.get(call, call)
+
+	def upstreamHash(self, call):
+		"""
+		Gets the hash of the result a call works on: the most recent result recorded before it in the chain.
+		Stages that haven't been applied, such as the optional despiking, are skipped.
+
+		Parameters
+		----------
+		call : str
+			The stage call
+
+		Returns
+		----------
+		str : The hash of the earlier result, or a blank string if there are none
+		"""
+		for earlier in reversed(self.calls[:self.calls.index(self.node(call))]):
+			if earlier in self.records:
+				return self.records[earlier].hash
+		return ""
+
+	def paramHash(self, call, params):
+		"""
+		Gets the hash a call's result is recorded under
+
+		Parameters
+		----------
+		call : str
+			The stage call
+		params : dict
+			The parameters of the call
+
+		Returns
+		----------
+		str : The hash of the call's name, its parameters and the result it works on
+		"""
+		paramHash = hashlib.sha1()
+		paramHash.update(self.upstreamHash(call).encode())
+		paramHash.update(call.encode())
+		paramHash.update(json.dumps(params, sort_keys=True, default=repr).encode())
+		return paramHash.hexdigest()
+
+	def isCurrent(self, call, params):
+		"""
+		Checks whether a call has already been made with these parameters, on the current version of the
+		result it works on
+
+		Parameters
+		----------
+		call : str
+			The stage call
+		params : dict
+			The parameters of the call
+
+		Returns
+		----------
+		bool : True if the call's recorded result can be used instead of running the call
+		"""
+		node = self.node(call)
+		record = self.records.get(node)
+		return record is not None and node not in self.outdated and record.hash == self.paramHash(call, params)
+
+	def result(self, call):
+		""" Gets the return value of the most recent call, or None if it hasn't been made """
+		record = self.records.get(self.node(call))
+		if record is None:
+			return None
+		return record.result
+
+	def applied(self, call, params, result=None):
+		"""
+		Records the result of a call, and marks any later results that were made from an older version of it
+
+		Parameters
+		----------
+		call : str
+			The stage call
+		params : dict
+			The parameters of the call
+		result : object
+			The return value of the call
+
+		Returns
+		----------
+		[str] : The calls whose results have become out of date
+		"""
+		node = self.node(call)
+		self.records[node] = Record(self.paramHash(call, params), call, params, result)
+		self.outdated.discard(node)
+
+		# Each later result is checked against the hash it would have if it were made again now.
+		# Once one result is out of date, every result after it was made from out of date data.
+		newlyOutdated = []
+		stale = False
+		for later in self.calls[self.calls.index(node) + 1:]:
+			record = self.records.get(later)
+			if record is None:
+				continue
+			if later in self.outdated:
+				stale = True
+			elif stale or record.hash != self.paramHash(record.call, record.params):
+				self.outdated.add(later)
+				newlyOutdated.append(later)
+				stale = True
+
+		return newlyOutdated
+
+	def outdatedStages(self):
+		""" Returns the sorted indexes of the stages that have an out of date result """
+		return sorted({self.stageIndex[call] for call in self.outdated})
+
+	def clear(self):
+		""" Forgets every recorded result, such as when a different project is loaded """
+		self.records = {}
+		self.outdated = set()
@@ -0,0 +1,323 @@
+"""
+Replays the stage calls saved in an .lalog file without the GUI, then exports the results.
+This lets archived projects be reprocessed on a machine with no display. Run from the latools_gui directory:
+
+	python -m project.replay path/to/project.lalog --export path/to/output
+
+Use --help for the full list of options.
+"""
+
+import argparse
+import inspect
+import logging
+import os
+import sys
+
+import latools as la
+
+from project import lalogParser
+from project import parallelProcessing
+
+# The focus stages in the order they are created
+FOCUS_STAGES = ["rawdata", "despiked", "bkgsub", "ratios", "calibrated"]
+
+# The stat functions that are used by default in the export stage
+DEFAULT_STATS = ["mean", "std"]
+
+
+def textValue(params, key, default=""):
+	"""
+	Gets a parameter as it would be written into a stage textbox
+
+	Parameters
+	----------
+	params : dict
+		The keyword arguments of the stage call
+	key : str
+		The name of the parameter
+	default : object
+		The value used if the parameter isn't in the log
+
+	Returns
+	----------
+	str : The text of the parameter
+	"""
+	return str(params.get(key, default))
+
+
+def numberValue(text, cast, default=None):
+	"""
+	Converts the text of a stage textbox in the same way as the stage, where blank means the default value
+
+	Parameters
+	----------
+	text : str
+		The textbox contents
+	cast : type
+		int or float
+	default : object
+		The value used if the textbox is blank
+
+	Returns
+	----------
+	The converted value, or the default
+	"""
+	if text == "":
+		return default
+	return cast(text)
+
+
+def pairValue(params, key):
+	"""
+	Converts a pair of values, such as on_mult, in the same way as the autorange stage.
+	The pair is None unless both values are given.
+
+	Parameters
+	----------
+	params : dict
+		The keyword arguments of the stage call
+	key : str
+		The name of the parameter
+
+	Returns
+	----------
+	[float, float] or None : The pair of values
+	"""
+	pair = params.get(key, "")
+	if pair == "" or len(pair) != 2 or str(pair[0]) == "" or str(pair[1]) == "":
+		return None
+	return [float(pair[0]), float(pair[1])]
+
+
+def importKwargs(params, dataFolder=None):
+	""" The keyword arguments of the import stage call, as made by ImportStage.loadValues """
+	return {"data_folder": dataFolder if dataFolder is not None else params.get("data_folder", ""),
+			"config": params.get("config", "") or "DEFAULT",
+			"extension": params.get("extension", ""),
+			"srm_identifier": params.get("srm_identifier", "")}
+
+
+def despikeKwargs(params):
+	""" The keyword arguments of the despike call, as made by DespikingStage.loadValues """
+	return {"expdecay_despiker": params.get("expdecay_despiker", False),
+			"exponent": numberValue(textValue(params, "exponent"), float),
+			"noise_despiker": params.get("noise_despiker", True),
+			"win": numberValue(textValue(params, "win"), float, 3),
+			"nlim": numberValue(textValue(params, "nlim"), float, 12.0),
+			"exponentplot": False,
+			"maxiter": numberValue(textValue(params, "maxiter", 4), int, 4)}
+
+
+def autorangeKwargs(params):
+	""" The keyword arguments of the autorange call, as made by AutorangeStage.loadValues """
+	return {"analyte": params.get("analyte", "total_counts"),
+			"gwin": numberValue(textValue(params, "gwin", 5), int),
+			"swin": numberValue(textValue(params, "swin", 3), int),
+			"win": numberValue(textValue(params, "win", 20), int),
+			"on_mult": pairValue(params, "on_mult"),
+			"off_mult": pairValue(params, "off_mult"),
+			"transform": params.get("transform", False)}
+
+
+def weightedmeanKwargs(params):
+	""" The keyword arguments of the weighted mean background call, as made by BackgroundStage.loadValues """
+	return {"analytes": None,
+			"weight_fwhm": numberValue(textValue(params, "weight_fwhm"), float),
+			"n_min": numberValue(textValue(params, "n_min", 20), int, 20),
+			"n_max": numberValue(textValue(params, "n_max"), int),
+			"cstep": numberValue(textValue(params, "cstep"), float),
+			"bkg_filter": params.get("bkg_filter", False),
+			"f_win": numberValue(textValue(params, "f_win", 7), int, 7),
+			"f_n_lim": numberValue(textValue(params, "f_n_lim", 3), int, 3)}
+
+
+def interp1dKwargs(params):
+	""" The keyword arguments of the interpolated background call, as made by BackgroundStage.loadValues """
+	return {"analytes": None,
+			"kind": numberValue(textValue(params, "kind", 1), int, 1),
+			"n_min": numberValue(textValue(params, "n_min", 10), int, 10),
+			"n_max": numberValue(textValue(params, "n_max"), int),
+			"cstep": numberValue(textValue(params, "cstep"), float),
+			"bkg_filter": params.get("bkg_filter", False),
+			"f_win": numberValue(textValue(params, "f_win", 7), int, 7),
+			"f_n_lim": numberValue(textValue(params, "f_n_lim", 3), int, 3)}
+
+
+def calibrateKwargs(params, eg):
+	""" The keyword arguments of the calibrate call, as made by CalibrationStage.loadValues """
+
+	# The stage's default n_min is taken from latools, and every defined SRM is used unless listed
+	defaultN_min = inspect.signature(la.analyse.calibrate).parameters["n_min"].default
+	srms = params.get("srms_used", "")
+	if srms == "":
+		srms = list(la.helpers.srm.get_defined_srms(eg.srmfile))
+
+	return {"analytes": None,
+			"drift_correct": params.get("drift_correct", True),
+			"srms_used": srms,
+			"n_min": numberValue(textValue(params, "n_min", 10), int, int(defaultN_min))}
+
+
+def replay(contents, dataFolder=None, workers=1):
+	"""
+	Runs the stage calls and filters from a parsed log, in the same order as loading the project in the GUI
+
+	Parameters
+	----------
+	contents : lalogParser.LogContents
+		The parsed log file
+	dataFolder : str
+		Replaces the data folder saved in the log, for projects whose data has been moved
+	workers : int or None
+		The number of processes used for despiking and autorange. If None, one is used for each core.
+
+	Returns
+	----------
+	latools.analyse : The analyse object, or None if the log has no import
+	"""
+	logger = logging.getLogger(__name__)
+
+	stageParams = contents.stageParams
+	lalogParser.blankNones(stageParams)
+
+	if "import" not in stageParams:
+		return None
+
+	logger.info("Importing data")
+	eg = la.analyse(**importKwargs(stageParams["import"], dataFolder))
+
+	if "despike" in stageParams:
+		logger.info("Despiking")
+		parallelProcessing.despike(eg, workers=workers, **despikeKwargs(stageParams["despike"]))
+
+	if "autorange" in stageParams:
+		logger.info("Autorange")
+		parallelProcessing.autorange(eg, workers=workers, **autorangeKwargs(stageParams["autorange"]))
+
+	# The background stage calculates and subtracts the background as one step
+	if "bkg_calc_weightedmean" in stageParams or "bkg_calc_interp1d" in stageParams:
+		logger.info("Background")
+		if "bkg_calc_weightedmean" in stageParams:
+			eg.bkg_calc_weightedmean(**weightedmeanKwargs(stageParams["bkg_calc_weightedmean"]))
+		else:
+			eg.bkg_calc_interp1d(**interp1dKwargs(stageParams["bkg_calc_interp1d"]))
+		eg.bkg_subtract(analytes=None, errtype='stderr', focus_stage='despiked')
+
+	if "ratio" in stageParams:
+		logger.info("Ratio")
+		eg.ratio(internal_standard=stageParams["ratio"].get("internal_standard", " "))
+
+	if "calibrate" in stageParams:
+		logger.info("Calibration")
+		eg.calibrate(**calibrateKwargs(stageParams["calibrate"], eg))
+
+	# The filters are created, then turned on and off in the order they were saved
+	for name, params in contents.filters:
+		logger.info("Creating filter: {}".format(name))
+		getattr(eg, name)(**params)
+
+	for name, args in contents.filterOnOff:
+		getattr(eg, name)(*args)
+
+	return eg
+
+
+def export(eg, outdir, stages=None, filtered=False, stats=None, filtStats=False):
+	"""
+	Exports the traces and sample statistics of a replayed project, as the export stage does
+
+	Parameters
+	----------
+	eg : latools.analyse
+		The analyse object
+	outdir : str
+		The folder the exports are saved to
+	stages : [str]
+		The focus stages to export. If None, every completed stage is exported.
+	filtered : bool
+		Whether the exported traces are filtered
+	stats : [str]
+		The stat functions for the sample statistics. If None, no statistics are exported.
+	filtStats : bool
+		Whether the filters are applied to the sample statistics
+	"""
+	if stages is None:
+		stages = [s for s in FOCUS_STAGES if s in eg.stages_complete]
+
+	for stage in stages:
+		eg.export_traces(outdir=outdir, focus_stage=stage, analytes=eg.analytes, filt=filtered)
+
+	if stats is not None and len(stats) > 0:
+		eg.sample_stats(analytes=eg.analytes, filt=filtStats, stats=stats)
+		df = eg.getstats(save=False)
+		df.to_csv(os.path.join(outdir, "Sample_stats.csv"))
+
+
+def main(argv=None):
+	"""
+	The command line entry point
+
+	Parameters
+	----------
+	argv : [str]
+		The command line arguments. If None, sys.argv is used.
+
+	Returns
+	----------
+	int : The exit status
+	"""
+	parser = argparse.ArgumentParser(prog="python -m project.replay",
+									 description="Replays an LAtools GUI project (.lalog) without the GUI, "
+												 "and exports the results.")
+	parser.add_argument("lalog", help="The .lalog file to replay")
+	parser.add_argument("--export", dest="outdir", required=True,
+						help="The folder the exports are saved to")
+	parser.add_argument("--data-folder", dest="dataFolder", default=None,
+						help="Use this data folder instead of the one saved in the log")
+	parser.add_argument("--stages", nargs="+", default=None, choices=FOCUS_STAGES,
+						help="The focus stages to export (default: every completed stage)")
+	parser.add_argument("--filtered", action="store_true",
+						help="Apply the filters to the exported traces")
+	parser.add_argument("--stats", nargs="*", default=None,
+						help="Export sample statistics with these stat functions (default: {})".format(
+							" ".join(DEFAULT_STATS)))
+	parser.add_argument("--filter-stats", dest="filtStats", action="store_true",
+						help="Apply the filters to the sample statistics")
+	parser.add_argument("--workers", type=int, default=1,
+						help="Processes used for despiking and autorange. 0 uses one for each core (default: 1)")
+	parser.add_argument("--save-log", dest="saveLog", action="store_true",
+						help="Save the replayed project's .lalog in the export folder")
+	args = parser.parse_args(argv)
+
+	logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+	logger = logging.getLogger(__name__)
+
+	# --stats given with no functions means the export stage defaults
+	stats = args.stats
+	if stats is not None and len(stats) == 0:
+		stats = DEFAULT_STATS
+
+	workers = args.workers
+	if workers == 0:
+		workers = None
+
+	contents = lalogParser.readLog(args.lalog)
+	eg = replay(contents, args.dataFolder, workers)
+
+	if eg is None:
+		logger.error("{} has no imported data to replay".format(args.lalog))
+		return 1
+
+	os.makedirs(args.outdir, exist_ok=True)
+	export(eg, args.outdir, args.stages, args.filtered, stats, args.filtStats)
+
+	if args.saveLog:
+		eg.save_log(directory=args.outdir,
+					logname=os.path.splitext(os.path.basename(args.lalog))[0])
+
+	logger.info("Exported to {}".format(args.outdir))
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -1,8 +1,14 @@
 """ Defines and records details from the currently running project """
 
-import ast
 from PyQt5.QtWidgets import *
+from PyQt5.QtCore import QTimer
+from functools import partial
+import logging
 import os
+from project import stageRunner
+from project import lalogParser
+from project import snapshot
+from project import pipeline
 # from project.ErrLogger import logged Disused
 
 class RunningProject():
@@ -21,6 +27,7 @@ class RunningProject():
 			The main window created in latoolsgui
 		"""
 		self.mainWidget = mainWidget
+		self.logger = logging.getLogger(__name__)
 
 		# The latools analyse object
 		self.eg = None
@@ -42,9 +49,37 @@ class RunningProject():
 		# A reference to the Progress Bar, used for occasional resetting
 		self.progressBar = None
 
+		# The stage calls are run on a worker thread by the stage runner
+		self.stageRunner = stageRunner.StageRunner()
+		self.stageRunner.busyChanged.connect(self.runnerBusyChanged)
+		self.stageRunner.failed.connect(self.runnerFailed)
+		self.stageRunner.cancelled.connect(self.runnerFailed)
+
+		# Records which stage results are up to date, so that unchanged stages aren't run again
+		self.pipeline = pipeline.Pipeline()
+
+		# Whether a snapshot of the processed data is saved with the project and used to reopen it quickly
+		self.useSnapshots = True
+
+		# The state of a project that is currently being loaded
+		self.loading = False
+		self.loadFailed = False
+		self.restoring = False
+		self.loadIndex = 0
+		self.loadProgress = None
+		self.onLoaded = None
+
 	#@logged
-	def saveProject(self):
-		""" Save overwrites the current save file with the latest file strings """
+	def saveProject(self, wait=False):
+		"""
+		Save overwrites the current save file with the latest file strings
+
+		Parameters
+		----------
+		wait : bool
+			Whether the project is written before returning, such as when quitting. Otherwise it is written
+			on the stage runner, after any stage calls that are queued.
+		"""
 
 		# If the project hasn't been saved before it will not have a save file location
 		if not self.hasSaved:
@@ -70,11 +105,54 @@ class RunningProject():
 			file = open(self.folder + "/" + self.fileName + ".lalog", 'w')
 			return
 
-		# Otherwise the project is saved in the save folder location
-		if self.folder is not None:
-			self.eg.save_log(self.folder, self.fileName + ".lalog")
-		else:
+		if self.folder is None:
 			print("failed to save")
+			return
+
+		# The log and the snapshot are written by the same job, so that the snapshot matches the log it is
+		# saved with, even if a stage call is running when save is pressed
+		if wait:
+			# Any stage call that is running finishes first. Queued calls can't start until we return.
+			self.stageRunner.pool.waitForDone()
+			self.writeProject(self.eg, self.folder, self.fileName)
+		else:
+			self.stageRunner.run("save", partial(self.writeProject, self.eg, self.folder, self.fileName),
+								 onFailed=self.saveFailed)
+
+	def writeProject(self, eg, folder, name):
+		"""
+		Writes the project's .lalog file, and a snapshot of the processed data next to it, so that the stage
+		calls don't need to be replayed when the project is opened again. Problems with the snapshot are
+		logged rather than raised, as the project can still be loaded from its log.
+
+		Parameters
+		----------
+		eg : latools.analyse
+			The analyse object
+		folder : str
+			The folder the project is saved in
+		name : str
+			The name of the project
+		"""
+		eg.save_log(folder, name + ".lalog")
+
+		if self.useSnapshots:
+			try:
+				snapshot.save(eg, folder, name)
+			except Exception:
+				self.logger.exception("The snapshot could not be saved")
+
+	def saveFailed(self, error):
+		"""
+		Tells the user that the stage runner has failed to save the project
+
+		Parameters
+		----------
+		error : Exception
+			The exception raised while saving the project
+		"""
+		self.logger.error("The project could not be saved", exc_info=error)
+		QMessageBox.information(self.mainWidget, "Save failed", "The project could not be saved:\n" + str(error))
 
 	def newFile(self, name, location = None):
 		"""
@@ -95,10 +173,12 @@ class RunningProject():
 			self.hasSaved = True
 
 	#@logged
-	def loadFile(self, name, location, progress=None):
+	def loadFile(self, name, location, progress=None, onLoaded=None):
 		"""
 		Loads a save file, stores the file info, populates the stage parameters and runs
-		the stage function calls
+		the stage function calls. The stage calls are run one after the other on the stage runner,
+		so this returns before the project has finished loading. If the project has an up to date snapshot,
+		the data is imported and the later stage results are read from it, so their calls are not run.
 
 		Parameters
 		----------
@@ -108,10 +188,13 @@ class RunningProject():
 			The file location for the save file
 		progress : ProgressBar
 			The progress bar object that will be used in this project
+		onLoaded : callable
+			Called once every stage in the save file has been loaded
 		"""
 		self.fileName = name
 		self.folder = location
 		self.hasSaved = True
+		self.pipeline.clear()
 
 		# A list of filter calls in the lalog file
 		self.filters = []
@@ -125,129 +208,200 @@ class RunningProject():
 		logFileStrings = logFile.read().splitlines()
 
 		if len(logFileStrings) == 0:
+			if onLoaded is not None:
+				onLoaded()
 			return
 
-		# Each line is checked for a characteristic indicating a particular stage's parameter list
-		# The line is then cropped to only the section resembling a dictionary of parameters.
-		# This is then cast to an actual dictionary and saved.
-		# The lastStage value is then updated to find the last completed stage
-		for line in logFileStrings:
-
-			if "__init__ :: args=() kwargs=" in line:
-				subLine = line.replace("__init__ :: args=() kwargs=", "")
-				self.stageParams["import"] = ast.literal_eval(subLine)
-				self.updateLastStage(0)
-
-			if "despike :: args=() kwargs=" in line:
-				subLine = line.replace("despike :: args=() kwargs=", "")
-				self.stageParams["despike"] = ast.literal_eval(subLine)
-				self.updateLastStage(1)
-
-			if "autorange :: args=() kwargs=" in line:
-				subLine = line.replace("autorange :: args=() kwargs=", "")
-				self.stageParams["autorange"] = ast.literal_eval(subLine)
-				self.updateLastStage(2)
-
-			if "bkg_calc_weightedmean :: args=() kwargs=" in line:
-				subLine = line.replace("bkg_calc_weightedmean :: args=() kwargs=", "")
-				self.stageParams["bkg_calc_weightedmean"] = ast.literal_eval(subLine)
-				# We remove any past instances of bkg_calc_interp1d calls
-				self.stageParams.pop("bkg_calc_interp1d", None)
-				self.updateLastStage(2)
-
-			if "bkg_calc_interp1d :: args=() kwargs=" in line:
-				subLine = line.replace("bkg_calc_interp1d :: args=() kwargs=", "")
-				self.stageParams["bkg_calc_interp1d"] = ast.literal_eval(subLine)
-				# We remove any past instances of bkg_calc_weightedmean calls
-				self.stageParams.pop("bkg_calc_weightedmean", None)
-				self.updateLastStage(2)
-
-			if "bkg_subtract :: args=() kwargs=" in line:
-				subLine = line.replace("bkg_subtract :: args=() kwargs=", "")
-				self.stageParams["bkg_subtract"] = ast.literal_eval(subLine)
-				self.updateLastStage(3)
-
-			if "ratio :: args=() kwargs=" in line:
-				subLine = line.replace("ratio :: args=() kwargs=", "")
-				self.stageParams["ratio"] = ast.literal_eval(subLine)
-				self.updateLastStage(4)
-
-			if "calibrate :: args=() kwargs=" in line:
-				subLine = line.replace("calibrate :: args=() kwargs=", "")
-				self.stageParams["calibrate"] = ast.literal_eval(subLine)
-				self.updateLastStage(5)
-
-			if "filter_threshold :: args=() kwargs=" in line:
-				subLine = line.replace("filter_threshold :: args=() kwargs=", "")
-				self.filters.append(("filter_threshold", ast.literal_eval(subLine)))
-
-			if "filter_threshold_percentile :: args=() kwargs=" in line:
-				subLine = line.replace("filter_threshold_percentile :: args=() kwargs=", "")
-				self.filters.append(("filter_threshold_percentile", ast.literal_eval(subLine)))
-
-			if "filter_gradient_threshold :: args=() kwargs=" in line:
-				subLine = line.replace("filter_gradient_threshold :: args=() kwargs=", "")
-				self.filters.append(("filter_gradient_threshold", ast.literal_eval(subLine)))
-
-			if "filter_trim :: args=() kwargs=" in line:
-				subLine = line.replace("filter_trim :: args=() kwargs=", "")
-				self.filters.append(("filter_trim", ast.literal_eval(subLine)))
-
-			if "filter_correlation :: args=() kwargs=" in line:
-				subLine = line.replace("filter_correlation :: args=() kwargs=", "")
-				self.filters.append(("filter_correlation", ast.literal_eval(subLine)))
-
-			if "filter_defragment :: args=() kwargs=" in line:
-				subLine = line.replace("filter_defragment :: args=() kwargs=", "")
-				self.filters.append(("filter_defragment", ast.literal_eval(subLine)))
-
-			if "filter_exclude_downhole :: args=() kwargs=" in line:
-				subLine = line.replace("filter_exclude_downhole :: args=() kwargs=", "")
-				self.filters.append(("filter_exclude_downhole", ast.literal_eval(subLine)))
-
-			if "filter_clustering :: args=() kwargs=" in line:
-				subLine = line.replace("filter_clustering :: args=() kwargs=", "")
-				self.filters.append(("filter_clustering", ast.literal_eval(subLine)))
-
-			if "optimise_signal :: args=() kwargs=" in line:
-				subLine = line.replace("optimise_signal :: args=() kwargs=", "")
-				self.filters.append(("optimise_signal", ast.literal_eval(subLine)))
-
-			if "filter_on :: args=" in line:
-				subLine = line.replace("filter_on :: args=", "").replace(" kwargs={}", "")
-				self.filterOnOff.append(("filter_on", ast.literal_eval(subLine)))
-
-			if "filter_off :: args=" in line:
-				subLine = line.replace("filter_off :: args=", "").replace(" kwargs={}", "")
-				self.filterOnOff.append(("filter_off", ast.literal_eval(subLine)))
+		# The stage parameters, filters and filter on/off calls are read from the log
+		contents = lalogParser.parseLog(logFileStrings)
+		self.stageParams.update(contents.stageParams)
+		self.filters = contents.filters
+		self.filterOnOff = contents.filterOnOff
+		self.updateLastStage(contents.lastStage)
 
 		# Any parameters that are listed as None are replaced with an empty string, so that they
 		# can be input into the stage parameter textboxes.
-		for stage in self.stageParams.keys():
-			for key in self.stageParams[stage].keys():
-				if self.stageParams[stage][key] is None:
-					self.stageParams[stage][key] = ""
+		lalogParser.blankNones(self.stageParams)
 
 		# Set up loading bar
+		self.loadProgress = None
 		if progress is not None:
-			bar = progress.set(self.lastStage + 1, "loading stages")
+			self.loadProgress = progress.set(self.lastStage + 1, "loading stages")
+
+		# The completed stages are loaded in order
+		self.loading = True
+		self.loadFailed = False
+		self.restoring = False
+		self.loadIndex = 0
+		self.onLoaded = onLoaded
+
+		# If the project has an up to date snapshot, the stage results are copied from it once the data is imported
+		if self.useSnapshots and snapshot.isCurrent(location, name):
+			self.restoring = True
+
+		self.loadNextStage()
+
+	def importAndRestore(self, importCall):
+		"""
+		Imports the project's data, and then copies the later stage results into it from the project's snapshot.
+		This is run on the stage runner in place of the import stage's call.
+
+		Parameters
+		----------
+		importCall : callable
+			The import stage's call, which returns the new analyse object
+
+		Returns
+		----------
+		(latools.analyse, bool) : The analyse object, and whether the stage results were restored
+		"""
+		eg = importCall()
+		return eg, snapshot.restore(eg, self.folder, self.fileName)
+
+	def snapshotRestored(self, name, params, onFinished, result):
+		"""
+		Finishes the import stage once the snapshot has been read. If the snapshot couldn't be used,
+		the later stage calls are replayed instead.
+
+		Parameters
+		----------
+		name : str
+			The name of the import stage's call
+		params : dict
+			The parameters of the call
+		onFinished : callable
+			The import stage's update, called with the analyse object
+		result : (latools.analyse, bool)
+			The analyse object, and whether the stage results were restored
+		"""
+		eg, self.restoring = result
+		self.stageApplied(name, params, onFinished, eg)
+
+	def runStage(self, name, function, params, onFinished=None, onFailed=None):
+		"""
+		Runs a stage call on the stage runner, unless the call's result is already up to date. The stages use
+		this rather than the stage runner, so that the pipeline can record each result.
+
+		Parameters
+		----------
+		name : str
+			The name of the stage call
+		function : callable
+			The stage call, with its arguments
+		params : dict
+			The parameters of the call that affect its result, used to tell whether it has changed
+		onFinished : callable
+			Called with the return value of the call once it has finished
+		onFailed : callable
+			Called with the exception if the call fails
+		"""
+
+		# When the data is restored from a snapshot, the import is run and the snapshot is read straight after it.
+		# The later calls' results are then already in the analyse object, so the calls are recorded but not run.
+		if self.loading and self.restoring:
+			if name == "import":
+				self.stageRunner.run(name, partial(self.importAndRestore, function),
+									 partial(self.snapshotRestored, name, params, onFinished), onFailed)
+			else:
+				self.stageApplied(name, params, onFinished, self.eg)
+			return
+
+		# A call that follows a queued call can't be checked until the queued call has finished
+		if not self.stageRunner.isBusy() and self.pipeline.isCurrent(name, params):
+			self.logger.info("The parameters of '{}' are unchanged, so it is not run again".format(name))
+			if onFinished is not None:
+				onFinished(self.pipeline.result(name))
+			return
+
+		self.stageRunner.run(name, function, partial(self.stageApplied, name, params, onFinished), onFailed)
+
+	def stageApplied(self, name, params, onFinished=None, result=None):
+		"""
+		Records a stage call's result in the pipeline, and marks the stages whose results are now out of date
+
+		Parameters
+		----------
+		name : str
+			The name of the stage call
+		params : dict
+			The parameters of the call
+		onFinished : callable
+			Called with the return value of the call
+		result : object
+			The return value of the call
+		"""
+		outdated = self.pipeline.applied(name, params, result)
+		if len(outdated) != 0:
+			self.logger.info("The results of {} are out of date".format(", ".join(outdated)))
+
+		if self.importListener is not None:
+			self.importListener.setOutdatedStages(self.pipeline.outdatedStages())
+
+		if onFinished is not None:
+			onFinished(result)
+
+	def loadNextStage(self):
+		"""
+		Loads the completed stages from the save file in order. A stage that hands its call to the stage runner
+		must finish before the next stage can be loaded, so loading is continued when the runner is idle again.
+		"""
+		while self.loadIndex <= self.lastStage and not self.loadFailed:
+			i = self.loadIndex
+			self.loadIndex += 1
 
-		# The completed stages are loaded
-		for i in range(self.lastStage + 1):
 			self.importListener.loadStage(i)
-			if progress is not None:
-				bar.update()
+			if self.loadProgress is not None:
+				self.loadProgress.update()
 
-		# The filters are loaded
-		if len(self.filters) != 0:
-			self.importListener.loadFilters(self.filters, self.filterOnOff)
+			# If the stage is running on the stage runner, we wait for it to finish
+			if self.stageRunner.isBusy():
+				return
+
+		self.loading = False
+
+		if self.loadFailed:
+			# We stop at the stage that failed, so that the user can see the problem
+			self.importListener.setStageIndex(self.loadIndex - 1)
+		else:
+			# The filters are loaded
+			if len(self.filters) != 0:
+				self.importListener.loadFilters(self.filters, self.filterOnOff)
+
+			# Load the stage after the last completed stage
+			self.importListener.setStageIndex(self.lastStage + 1)
 
 		# We reset the progress bar after the last stage call is run
-		if progress is not None:
-			bar.reset()
+		if self.loadProgress is not None:
+			self.loadProgress.reset()
+
+		if self.onLoaded is not None:
+			self.onLoaded()
+
+	def runnerBusyChanged(self, busy):
+		"""
+		Continues loading a project once the stage runner has finished the last stage's call
+
+		Parameters
+		----------
+		busy : bool
+			Whether the stage runner is busy
+		"""
+		if not busy and self.loading:
+			# Other objects are also notified that the runner is idle, so we let them update before
+			# the next stage starts the runner again.
+			QTimer.singleShot(0, self.loadNextStage)
 
-		# Load the stage after the last completed stage
-		self.importListener.setStageIndex(self.lastStage + 1)
+	def runnerFailed(self, name):
+		"""
+		Stops loading a project if one of its stage calls fails or is cancelled
+
+		Parameters
+		----------
+		name : str
+			The name of the failed or cancelled job
+		"""
+		if self.loading:
+			self.loadFailed = True
 
 	def setImportListener(self, importListener):
 		"""
@@ -0,0 +1,573 @@
+"""
+Saves and reopens the processed state of a project, so that a saved project can be opened without running its
+stage calls again. A snapshot is a compressed .npz file saved next to the project's .lalog file. It holds the
+results that the stages add to the analyse object: each sample's stage data and ranges, the background and the
+calibration, each stored as a named numeric or text array, with the other parameters stored as JSON text.
+Nothing in a snapshot is unpickled when it is read.
+
+When a project is opened, its data is imported from the data folder as before, and the results of the later
+stages are then copied in from the snapshot. Values with uncertainties are stored as their nominal values and
+standard deviations, so the correlations between them are not kept.
+
+The snapshot records a hash of the .lalog file it was saved with, and the version of latools that saved it.
+If either has changed since, or the snapshot can't be read, the project is loaded by replaying its stage calls.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import zipfile
+
+import latools
+import numpy as np
+import pandas as pd
+from latools.helpers.helpers import Bunch, un_interp1d
+from uncertainties import UFloat
+import uncertainties.unumpy as un
+
+from project import lalogParser
+
+# Changed whenever the layout of the snapshot changes, so that older snapshots are replayed instead
+SNAPSHOT_VERSION = 2
+
+# Added to the project name to give the snapshot's file name
+SNAPSHOT_EXTENSION = ".snapshot.npz"
+
+# The entries that hold the snapshot's details. The JSON text in STATE_KEY describes the other entries.
+VERSION_KEY = "version"
+LATOOLS_KEY = "latools"
+HASH_KEY = "lalog"
+STATE_KEY = "state"
+
+# Added to the name of an array with uncertainties to give the name of its standard deviations
+STD_SUFFIX = ".std"
+
+# The sample data that is read from the data folder by the import, and so isn't saved
+IMPORTED_DATA = ("Time", "rawdata")
+
+# The ranges that autorange adds to each sample
+RANGE_ATTRIBUTES = ("bkg", "sig", "trn", "bkgrng", "sigrng", "trnrng", "ns")
+
+# The markers latools gives the SRMs in its calibration plots
+SRM_MARKERS = 'osDsv<>PX'
+
+
+def snapshotName(folder, name):
+	"""
+	Gets the location of a project's snapshot
+
+	Parameters
+	----------
+	folder : str
+		The folder the project is saved in
+	name : str
+		The name of the project
+
+	Returns
+	----------
+	str : The path to the snapshot file
+	"""
+	return os.path.join(folder, name + SNAPSHOT_EXTENSION)
+
+
+def logHash(logName):
+	"""
+	Gets the hash that ties a snapshot to the .lalog file it was saved with
+
+	Parameters
+	----------
+	logName : str
+		The path to the .lalog file
+
+	Returns
+	----------
+	str : The SHA-1 hash of the file's contents
+	"""
+	with open(logName, "rb") as logFile:
+		return hashlib.sha1(logFile.read()).hexdigest()
+
+
+def latoolsVersion():
+	""" Gets the version of latools that is installed, as older releases don't record it in the module """
+	version = getattr(latools, "__version__", None)
+	if version is None:
+		import pkg_resources
+		try:
+			version = pkg_resources.get_distribution("latools").version
+		except pkg_resources.DistributionNotFound:
+			version = "unknown"
+	return str(version)
+
+
+def putArray(arrays, key, values):
+	"""
+	Adds an array to the snapshot's entries. An array with uncertainties is stored as its nominal values,
+	with its standard deviations in a second entry.
+
+	Parameters
+	----------
+	arrays : dict
+		The snapshot's entries
+	key : str
+		The name of the entry
+	values : array_like
+		The numeric or text values
+	"""
+	values = np.asarray(values)
+	if values.dtype.kind == "O":
+		arrays[key] = un.nominal_values(values).astype(float)
+		arrays[key + STD_SUFFIX] = un.std_devs(values).astype(float)
+	else:
+		arrays[key] = values
+
+
+def getArray(entries, key):
+	"""
+	Reads an array from the snapshot's entries, as it was given to putArray
+
+	Parameters
+	----------
+	entries : dict
+		The snapshot's entries
+	key : str
+		The name of the entry
+
+	Returns
+	----------
+	np.ndarray : The values, with their uncertainties if they had any
+	"""
+	if key + STD_SUFFIX in entries:
+		return un.uarray(entries[key], entries[key + STD_SUFFIX])
+	return entries[key]
+
+
+def putColumn(arrays, key, values):
+	"""
+	Adds a column or index of a table to the snapshot's entries. Columns of objects are stored as text,
+	as values with uncertainties, or as numbers, depending on what they hold.
+
+	Parameters
+	----------
+	arrays : dict
+		The snapshot's entries
+	key : str
+		The name of the entry
+	values : array_like
+		The values of the column
+	"""
+	values = np.asarray(values)
+	if values.dtype.kind == "O":
+		if all(isinstance(v, str) for v in values):
+			values = values.astype(str)
+		elif not any(isinstance(v, UFloat) for v in values):
+			try:
+				values = values.astype(float)
+			except (TypeError, ValueError):
+				values = values.astype(str)
+	putArray(arrays, key, values)
+
+
+def putTable(arrays, key, table):
+	"""
+	Adds a pandas table to the snapshot's entries, with an entry for each level of its index and each column
+
+	Parameters
+	----------
+	arrays : dict
+		The snapshot's entries
+	key : str
+		The name the table's entries start with
+	table : pd.DataFrame
+		The table
+
+	Returns
+	----------
+	dict : The names of the table's index levels and columns, used to rebuild it
+	"""
+	for i in range(table.index.nlevels):
+		putColumn(arrays, "{}/index/{}".format(key, i), table.index.get_level_values(i))
+	for j in range(table.shape[1]):
+		putColumn(arrays, "{}/columns/{}".format(key, j), table.iloc[:, j].values)
+
+	return {"index": list(table.index.names),
+			"columns": [list(c) if isinstance(c, tuple) else c for c in table.columns],
+			"columnNames": list(table.columns.names)}
+
+
+def getTable(entries, key, layout):
+	"""
+	Rebuilds a pandas table from the snapshot's entries
+
+	Parameters
+	----------
+	entries : dict
+		The snapshot's entries
+	key : str
+		The name the table's entries start with
+	layout : dict
+		The names of the table's index levels and columns, as returned by putTable
+
+	Returns
+	----------
+	pd.DataFrame : The table
+	"""
+	levels = [getArray(entries, "{}/index/{}".format(key, i)) for i in range(len(layout["index"]))]
+	if len(levels) == 1:
+		index = pd.Index(levels[0], name=layout["index"][0])
+	else:
+		index = pd.MultiIndex.from_arrays(levels, names=layout["index"])
+
+	labels = [tuple(c) if isinstance(c, list) else c for c in layout["columns"]]
+	if len(layout["columnNames"]) > 1:
+		columns = pd.MultiIndex.from_tuples(labels, names=layout["columnNames"])
+	else:
+		columns = pd.Index(labels, name=layout["columnNames"][0])
+
+	table = pd.DataFrame({j: getArray(entries, "{}/columns/{}".format(key, j)) for j in range(len(labels))},
+						 index=index)
+	table.columns = columns
+	return table
+
+
+def interpKind(interp):
+	""" Gets the kind of a scipy interpolator, which records spline kinds as 'spline' rather than their order """
+	if interp._kind == "spline":
+		return int(interp._spline.k)
+	return interp._kind
+
+
+def putSample(arrays, key, dat):
+	"""
+	Adds the stage data and ranges of a sample to the snapshot's entries
+
+	Parameters
+	----------
+	arrays : dict
+		The snapshot's entries
+	key : str
+		The name the sample's entries start with
+	dat : latools.D
+		The sample's data object
+
+	Returns
+	----------
+	dict : The sample's parameters, and the names of its entries
+	"""
+	sample = {"key": key,
+			  "focus": dat.focus_stage,
+			  "internal_standard": dat.internal_standard,
+			  "stages": {},
+			  "arrays": [],
+			  "ranges": [],
+			  "n": int(dat.n) if hasattr(dat, "n") else None}
+
+	for stage, values in dat.data.items():
+		if stage in IMPORTED_DATA:
+			continue
+		if isinstance(values, dict):
+			for analyte, v in values.items():
+				putArray(arrays, "{}/{}/{}".format(key, stage, analyte), v)
+			sample["stages"][stage] = list(values.keys())
+		else:
+			putArray(arrays, "{}/{}".format(key, stage), values)
+			sample["arrays"].append(stage)
+
+	for attribute in RANGE_ATTRIBUTES:
+		if hasattr(dat, attribute):
+			putArray(arrays, "{}/ranges/{}".format(key, attribute), getattr(dat, attribute))
+			sample["ranges"].append(attribute)
+
+	return sample
+
+
+def getSample(entries, sample, dat):
+	"""
+	Reads the stage data and ranges of a sample from the snapshot's entries, without changing its data object
+
+	Parameters
+	----------
+	entries : dict
+		The snapshot's entries
+	sample : dict
+		The sample's parameters, as returned by putSample
+	dat : latools.D
+		The sample's data object, used to check that the arrays match the imported data
+
+	Returns
+	----------
+	(dict, dict) : The sample's stage data, and its ranges
+	"""
+	key = sample["key"]
+	data = {}
+	for stage, analytes in sample["stages"].items():
+		data[stage] = Bunch((a, getArray(entries, "{}/{}/{}".format(key, stage, a))) for a in analytes)
+	for stage in sample["arrays"]:
+		data[stage] = getArray(entries, "{}/{}".format(key, stage))
+
+	for stage, values in data.items():
+		arrays = values.values() if isinstance(values, dict) else [values]
+		if any(len(v) != dat.Time.size for v in arrays):
+			raise ValueError("The {} data of {} doesn't match its imported data".format(stage, dat.sample))
+
+	if sample["focus"] not in data and sample["focus"] not in dat.data:
+		raise KeyError("The focus stage {} of {} is missing".format(sample["focus"], dat.sample))
+
+	ranges = {attribute: getArray(entries, "{}/ranges/{}".format(key, attribute))
+			  for attribute in sample["ranges"]}
+	return data, ranges
+
+
+def save(eg, folder, name):
+	"""
+	Saves a snapshot of the analyse object next to the project's .lalog file. This should be called just after the
+	log is saved, as the snapshot is tied to the log's current contents.
+
+	Parameters
+	----------
+	eg : latools.analyse
+		The analyse object
+	folder : str
+		The folder the project is saved in
+	name : str
+		The name of the project
+
+	Returns
+	----------
+	str : The path to the snapshot file
+	"""
+	snapshotFile = snapshotName(folder, name)
+	arrays = {}
+
+	# The filters are created again by the filtering stage, so their calls aren't part of the restored log
+	state = {"stages_complete": sorted(eg.stages_complete),
+			 "focus_stage": eg.focus_stage,
+			 "internal_standard": eg.internal_standard,
+			 "minimal_analytes": sorted(eg.minimal_analytes),
+			 "log": [line for line in eg.log if not lalogParser.isFilterLine(line)],
+			 "samples": {},
+			 "tables": {}}
+
+	for i, (sampleName, dat) in enumerate(eg.data.items()):
+		state["samples"][sampleName] = putSample(arrays, "samples/{}".format(i), dat)
+
+	if hasattr(eg, "expdecay_coef"):
+		putArray(arrays, "expdecay_coef", eg.expdecay_coef)
+		state["expdecay_coef"] = True
+
+	# The background
+	if hasattr(eg, "bkg"):
+		for part in ("raw", "summary"):
+			if part in eg.bkg:
+				state["tables"]["bkg/" + part] = putTable(arrays, "bkg/" + part, eg.bkg[part])
+		if "calc" in eg.bkg:
+			state["bkgCalc"] = {}
+			putArray(arrays, "bkg/calc/uTime", eg.bkg["calc"]["uTime"])
+			for analyte, stats in eg.bkg["calc"].items():
+				if analyte == "uTime":
+					continue
+				for stat, values in stats.items():
+					putArray(arrays, "bkg/calc/{}/{}".format(analyte, stat), values)
+				state["bkgCalc"][analyte] = list(stats.keys())
+
+	if hasattr(eg, "bkg_interps"):
+		state["bkgInterps"] = {}
+		for analyte, interp in eg.bkg_interps.items():
+			putArray(arrays, "bkg/interps/{}/x".format(analyte), interp.nom_interp.x)
+			putArray(arrays, "bkg/interps/{}/y".format(analyte),
+					 un.uarray(interp.nom_interp.y, interp.std_interp.y))
+			fillValue = interp.nom_interp.fill_value
+			state["bkgInterps"][analyte] = {"kind": interpKind(interp.nom_interp),
+											"bounds_error": bool(interp.nom_interp.bounds_error),
+											"fill_value": fillValue if isinstance(fillValue, str) else float(fillValue)}
+
+	# The calibration. Its interpolators are made again from its parameters, as latools makes them.
+	for table in ("srmtabs", "stdtab", "calib_params"):
+		if hasattr(eg, table):
+			state["tables"][table] = putTable(arrays, table, getattr(eg, table))
+	if hasattr(eg, "calib_ps"):
+		state["calibParams"] = {analyte: sorted(params.keys()) for analyte, params in eg.calib_ps.items()}
+	if hasattr(eg, "srms_used"):
+		state["srms_used"] = sorted(eg.srms_used)
+	state["srms_ided"] = bool(getattr(eg, "srms_ided", False))
+
+	arrays[VERSION_KEY] = np.array(SNAPSHOT_VERSION)
+	arrays[LATOOLS_KEY] = np.array(latoolsVersion())
+	arrays[HASH_KEY] = np.array(logHash(os.path.join(folder, name + ".lalog")))
+	arrays[STATE_KEY] = np.array(json.dumps(state))
+
+	# The snapshot is written to a temporary file first, so that an interrupted save doesn't leave a broken snapshot
+	tempFile = snapshotFile + ".tmp"
+	with open(tempFile, "wb") as file:
+		np.savez_compressed(file, **arrays)
+	os.replace(tempFile, snapshotFile)
+
+	return snapshotFile
+
+
+def checkSnapshot(snapshotArrays, folder, name):
+	"""
+	Checks that an open snapshot can be used for a project
+
+	Parameters
+	----------
+	snapshotArrays : numpy.lib.npyio.NpzFile
+		The snapshot's entries
+	folder : str
+		The folder the project is saved in
+	name : str
+		The name of the project
+
+	Returns
+	----------
+	bool : True if the snapshot was saved by this version of the GUI and latools, with the project's current log
+	"""
+	logger = logging.getLogger(__name__)
+	snapshotFile = snapshotName(folder, name)
+
+	if int(snapshotArrays[VERSION_KEY]) != SNAPSHOT_VERSION:
+		logger.info("The snapshot {} is from another version, so the project is replayed".format(snapshotFile))
+		return False
+
+	if str(snapshotArrays[LATOOLS_KEY]) != latoolsVersion():
+		logger.info("The snapshot {} was saved with another version of latools, so the project is replayed"
+					.format(snapshotFile))
+		return False
+
+	if str(snapshotArrays[HASH_KEY]) != logHash(os.path.join(folder, name + ".lalog")):
+		logger.info("The snapshot {} is out of date, so the project is replayed".format(snapshotFile))
+		return False
+
+	return True
+
+
+def isCurrent(folder, name):
+	"""
+	Checks whether a project has a snapshot that can be used to open it, without reading the snapshot's data
+
+	Parameters
+	----------
+	folder : str
+		The folder the project is saved in
+	name : str
+		The name of the project
+
+	Returns
+	----------
+	bool : True if the snapshot exists and matches the project's log and the installed latools
+	"""
+	snapshotFile = snapshotName(folder, name)
+	if not os.path.isfile(snapshotFile):
+		return False
+
+	try:
+		with np.load(snapshotFile, allow_pickle=False) as snapshotArrays:
+			return checkSnapshot(snapshotArrays, folder, name)
+	except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+		logging.getLogger(__name__).warning("The snapshot {} could not be read, so the project is replayed"
+											.format(snapshotFile), exc_info=True)
+		return False
+
+
+def restore(eg, folder, name):
+	"""
+	Copies the stage results saved in a project's snapshot into a newly imported analyse object. Everything is
+	read before the analyse object is changed, so if there is a problem it is left as it was imported.
+	Problems are logged rather than raised, as the project can still be loaded by replaying its stage calls.
+
+	Parameters
+	----------
+	eg : latools.analyse
+		The analyse object, just after the project's data has been imported
+	folder : str
+		The folder the project is saved in
+	name : str
+		The name of the project
+
+	Returns
+	----------
+	bool : True if the results were restored, or False if the stage calls need to be replayed
+	"""
+	logger = logging.getLogger(__name__)
+	snapshotFile = snapshotName(folder, name)
+
+	try:
+		with np.load(snapshotFile, allow_pickle=False) as snapshotArrays:
+			if not checkSnapshot(snapshotArrays, folder, name):
+				return False
+			state = json.loads(str(snapshotArrays[STATE_KEY]))
+
+			entries = {}
+			with eg.pbar.set(total=len(snapshotArrays.files), desc="Loading snapshot") as prog:
+				for key in snapshotArrays.files:
+					entries[key] = snapshotArrays[key]
+					prog.update()
+
+		if set(state["samples"]) != set(eg.data.keys()):
+			logger.info("The samples of {} have changed, so the project is replayed".format(snapshotFile))
+			return False
+		samples = {sampleName: getSample(entries, sample, eg.data[sampleName])
+				   for sampleName, sample in state["samples"].items()}
+
+		tables = {table: getTable(entries, table, layout) for table, layout in state["tables"].items()}
+
+		bkg = Bunch((part, tables["bkg/" + part]) for part in ("raw", "summary") if "bkg/" + part in tables)
+		if "bkgCalc" in state:
+			bkg["calc"] = Bunch(uTime=getArray(entries, "bkg/calc/uTime"))
+			for analyte, stats in state["bkgCalc"].items():
+				bkg["calc"][analyte] = {stat: getArray(entries, "bkg/calc/{}/{}".format(analyte, stat))
+										for stat in stats}
+
+		bkgInterps = {}
+		for analyte, kwargs in state.get("bkgInterps", {}).items():
+			bkgInterps[analyte] = un_interp1d(x=getArray(entries, "bkg/interps/{}/x".format(analyte)),
+											  y=getArray(entries, "bkg/interps/{}/y".format(analyte)), **kwargs)
+
+		calibPs = Bunch()
+		if "calib_params" in tables:
+			calibParams = tables["calib_params"]
+			for analyte, params in state.get("calibParams", {}).items():
+				calibPs[analyte] = {p: un_interp1d(calibParams.index.values, calibParams.loc[:, (analyte, p)].values)
+									for p in params}
+
+		expdecayCoef = getArray(entries, "expdecay_coef") if "expdecay_coef" in state else None
+	except (OSError, ValueError, KeyError, TypeError, IndexError, zipfile.BadZipFile):
+		logger.warning("The snapshot {} could not be read, so the project is replayed".format(snapshotFile),
+					   exc_info=True)
+		return False
+
+	# The snapshot has been read, so the analyse object is updated
+	for sampleName, (data, ranges) in samples.items():
+		dat = eg.data[sampleName]
+		sample = state["samples"][sampleName]
+		dat.data.update(data)
+		dat.__dict__.update(ranges)
+		if sample["n"] is not None:
+			dat.n = sample["n"]
+		dat.internal_standard = sample["internal_standard"]
+		dat.setfocus(sample["focus"])
+
+	eg.stages_complete = set(state["stages_complete"])
+	eg.focus_stage = state["focus_stage"]
+	eg.internal_standard = state["internal_standard"]
+	eg.minimal_analytes = set(state["minimal_analytes"])
+	eg.log = state["log"]
+
+	if expdecayCoef is not None:
+		eg.expdecay_coef = expdecayCoef
+	if len(bkg) != 0:
+		eg.bkg = bkg
+	if "bkgInterps" in state:
+		eg.bkg_interps = bkgInterps
+
+	for table in ("srmtabs", "stdtab", "calib_params"):
+		if table in tables:
+			setattr(eg, table, tables[table])
+	if "calibParams" in state:
+		eg.calib_ps = calibPs
+	if "srms_used" in state:
+		eg.srms_used = set(state["srms_used"])
+		eg.srm_mdict = {k: SRM_MARKERS[i] for i, k in enumerate(eg.srms_used)}
+	eg.srms_ided = state["srms_ided"]
+
+	return True
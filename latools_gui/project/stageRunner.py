@@ -0,0 +1,227 @@
+""" Runs the long data-processing calls of the stages on a worker thread, so that the GUI stays responsive """
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+from collections import deque
+
+import logging
+
+
+class JobCancelled(Exception):
+	""" Raised inside a job to stop it when the user has cancelled it """
+	pass
+
+
+class StageJobSignals(QObject):
+	"""
+	The signals a StageJob uses to report back to the GUI thread. A QRunnable is not a QObject, so it can't
+	own signals itself.
+	"""
+	finished = pyqtSignal(object)
+	failed = pyqtSignal(object)
+
+
+class StageJob(QRunnable):
+	""" A single stage call that is run on the stage runner's worker thread """
+
+	def __init__(self, name, function, onFinished=None, onFailed=None, readers=()):
+		"""
+		Stores the call and the functions to run back on the GUI thread once it is complete.
+
+		Parameters
+		----------
+		name : str
+			A short name for the job, used for logging
+		function : callable
+			The call to run on the worker thread. It is given no arguments, so any stage values it
+			needs should be bound before the job is created (eg. with functools.partial).
+		onFinished : callable
+			Called on the GUI thread with the return value of function, if it completes.
+		onFailed : callable
+			Called on the GUI thread with the exception raised by function, if it fails.
+		readers : [QThreadPool]
+			Pools whose jobs read the analyse object. Their running jobs are waited for before function is called.
+		"""
+		super().__init__()
+
+		self.name = name
+		self.function = function
+		self.onFinished = onFinished
+		self.onFailed = onFailed
+		self.readers = list(readers)
+
+		# The signals object is created on the GUI thread, so its signals are queued back to it
+		self.signals = StageJobSignals()
+
+		# The runner holds on to the job itself, so Qt shouldn't delete it when it has run
+		self.setAutoDelete(False)
+
+	def run(self):
+		""" Runs the job on the worker thread and reports the outcome """
+		try:
+			# The readers have been told to stop when the job started, but one may still be part way through
+			# reading the data this job is about to change
+			for pool in self.readers:
+				pool.waitForDone()
+			result = self.function()
+		except Exception as e:
+			self.signals.failed.emit(e)
+		else:
+			self.signals.finished.emit(result)
+
+
+class StageRunner(QObject):
+	"""
+	Runs stage calls one at a time on a worker thread. Calls are queued in the order they are requested,
+	and their results are passed back to the stage on the GUI thread, where the graph and progress
+	updates can safely be made.
+	"""
+
+	# Emitted with the job name when a job starts, finishes, fails or is cancelled
+	started = pyqtSignal(str)
+	finished = pyqtSignal(str)
+	failed = pyqtSignal(str)
+	cancelled = pyqtSignal(str)
+
+	# Emitted with True when the runner starts working through its queue, and False when it is empty again
+	busyChanged = pyqtSignal(bool)
+
+	def __init__(self, parent=None):
+		"""
+		Creates an idle runner with an empty queue.
+
+		Parameters
+		----------
+		parent : QObject
+			The Qt parent of the runner, if any
+		"""
+		super().__init__(parent)
+
+		# The stages all work on the one analyse object, so only one stage call may run at a time
+		self.pool = QThreadPool()
+		self.pool.setMaxThreadCount(1)
+
+		self.queue = deque()
+		self.currentJob = None
+
+		# Pools of other worker threads that read the analyse object, such as the graph's prefetcher
+		self.readers = []
+
+		self.logger = logging.getLogger(__name__)
+
+	def run(self, name, function, onFinished=None, onFailed=None):
+		"""
+		Queues a stage call to be run on the worker thread.
+
+		Parameters
+		----------
+		name : str
+			A short name for the job, used for logging
+		function : callable
+			The call to run. It is given no arguments.
+		onFinished : callable
+			Called on the GUI thread with the return value of function, if it completes.
+		onFailed : callable
+			Called on the GUI thread with the exception raised by function, if it fails. Any calls
+			queued behind a failed call are dropped.
+		"""
+		self.queue.append(StageJob(name, function, onFinished, onFailed, self.readers))
+
+		if self.currentJob is None:
+			self.busyChanged.emit(True)
+			self.startNext()
+
+	def addReader(self, pool):
+		"""
+		Registers a thread pool whose jobs read the analyse object. The pool's owner should stop its jobs when
+		the started signal is emitted, and each stage call waits for any job still running before it starts.
+
+		Parameters
+		----------
+		pool : QThreadPool
+			The pool of the reading jobs
+		"""
+		self.readers.append(pool)
+
+	def cancel(self):
+		"""
+		Drops any jobs waiting to run. The running job can't be stopped from outside, so it is expected to
+		raise JobCancelled at its next progress update (see ProgressUpdater.cancel).
+		"""
+		self.queue.clear()
+
+	def isBusy(self):
+		""" Returns True while there is a job running or waiting to run """
+		return self.currentJob is not None
+
+	def startNext(self):
+		""" Starts the next job in the queue, or notifies that the runner is idle if the queue is empty """
+		if len(self.queue) == 0:
+			self.currentJob = None
+			self.busyChanged.emit(False)
+			return
+
+		self.currentJob = self.queue.popleft()
+		self.currentJob.signals.finished.connect(self.jobFinished)
+		self.currentJob.signals.failed.connect(self.jobFailed)
+
+		self.started.emit(self.currentJob.name)
+		self.pool.start(self.currentJob)
+
+	@pyqtSlot(object)
+	def jobFinished(self, result):
+		"""
+		Receives the result of the current job on the GUI thread and passes it on to the stage
+
+		Parameters
+		----------
+		result : object
+			The value returned by the job's function
+		"""
+		job = self.currentJob
+
+		try:
+			if job.onFinished is not None:
+				job.onFinished(result)
+		except Exception as e:
+			# An exception escaping a Qt slot would close the program, so problems in the stage's own
+			# update code are treated as a failure of the job.
+			self.logger.exception("Problem occurred completing the '{}' job:".format(job.name))
+			self.queue.clear()
+			self.failed.emit(job.name)
+		else:
+			self.finished.emit(job.name)
+
+		self.startNext()
+
+	@pyqtSlot(object)
+	def jobFailed(self, error):
+		"""
+		Receives the exception raised by the current job on the GUI thread and passes it on to the stage
+
+		Parameters
+		----------
+		error : Exception
+			The exception raised by the job's function
+		"""
+		job = self.currentJob
+
+		# Later jobs in the queue usually depend on the failed one, so they are dropped
+		self.queue.clear()
+
+		# A cancelled job isn't a problem, so the stage isn't told about it
+		if isinstance(error, JobCancelled):
+			self.logger.info("The '{}' job was cancelled".format(job.name))
+			self.cancelled.emit(job.name)
+			self.startNext()
+			return
+
+		try:
+			if job.onFailed is not None:
+				job.onFailed(error)
+			else:
+				self.logger.error("Problem occurred in the '{}' job:".format(job.name), exc_info=error)
+		except Exception:
+			self.logger.exception("Problem occurred handling a failure of the '{}' job:".format(job.name))
+
+		self.failed.emit(job.name)
+		self.startNext()
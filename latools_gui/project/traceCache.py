@@ -0,0 +1,295 @@
+"""
+Keeps the drawable form of recently viewed samples, so that switching between samples in the graph doesn't unpack
+and transform the data again. For each (sample, focus stage), the nominal values of every analyte are unpacked from
+their uncertainties once into an (analytes x time) array, with their log10 values alongside. The min/max pyramids
+used for drawing, and the filter masks, are added as they are needed. The least recently used samples are dropped
+once the cache is over its memory budget. The cache can be filled from a worker thread, such as by the
+TracePrefetcher.
+"""
+
+from collections import OrderedDict
+import threading
+
+import latools.helpers as helpers
+import numpy as np
+
+from project.decimation import MinMaxPyramid
+
+# The default memory budget of the cache, in bytes
+DEFAULT_BUDGET = 512 * 1024 ** 2
+
+
+def filterMasks(filt, analytes):
+	"""
+	Gets the filter masks of every analyte at once. An analyte's mask is the values that pass every filter component
+	switched on for it, as made by filt.grab_filt(True, analyte).
+
+	Parameters
+	----------
+	filt : latools.filtering.filt_obj.filt
+		The sample's filters
+	analytes : [str]
+		The analytes, in the order of the rows
+
+	Returns
+	----------
+	np.ndarray : A boolean (analytes x time) array, which is True where a value passes the filters
+	"""
+	components = list(filt.components)
+	if len(components) == 0:
+		return np.ones((len(analytes), filt.size), dtype=bool)
+
+	# A value is filtered out if any switched on component leaves it out
+	switches = np.array([[filt.switches[a].get(c, False) for c in components] for a in analytes], dtype=bool)
+	failed = ~np.array([filt.components[c] for c in components], dtype=bool)
+	return ~(switches @ failed)
+
+
+class SampleTraces:
+	""" The unpacked traces of one sample at one focus stage """
+
+	def __init__(self, dat, focusStage):
+		"""
+		Unpacks the nominal values of every analyte, and their log10 values
+
+		Parameters
+		----------
+		dat : latools.D
+			The sample's data object
+		focusStage : str
+			The focus stage whose data is unpacked
+		"""
+		self.x = np.asarray(dat.Time, dtype=float)
+
+		# The values are held as (analytes x time) arrays, with a row for each analyte
+		self.analytes = list(dat.analytes)
+		self.rows = {analyte: i for i, analyte in enumerate(self.analytes)}
+		self.nominal = np.empty((len(self.analytes), len(self.x)))
+		for analyte, i in self.rows.items():
+			y, yerr = helpers.stat_fns.unpack_uncertainties(dat.data[focusStage][analyte])
+			self.nominal[i] = y
+
+		# Zero and negative values have no log, and are left as gaps in the trace
+		with np.errstate(divide='ignore', invalid='ignore'):
+			self.log = np.log10(self.nominal)
+
+		# The pyramids are keyed by (analyte, log scale)
+		self.pyramids = {}
+
+		# The filter masks for the filter switches in filterKey, as an (analytes x time) array. The filtered values,
+		# with NaN where a value is filtered out, are keyed by log scale, and their pyramids by (analyte, log scale).
+		self.filterKey = None
+		self.masks = None
+		self.filteredValues = {}
+		self.filteredPyramids = {}
+
+		# The pyramids and masks may be built by the graph and a prefetcher at the same time
+		self.lock = threading.Lock()
+
+	def values(self, analyte, logScale):
+		""" Gets an analyte's nominal values, or their log10 """
+		if logScale:
+			return self.log[self.rows[analyte]]
+		return self.nominal[self.rows[analyte]]
+
+	def pyramid(self, analyte, logScale):
+		"""
+		Gets the min/max pyramid of an analyte's trace, building it the first time it is needed
+
+		Parameters
+		----------
+		analyte : str
+			The analyte
+		logScale : bool
+			Whether the pyramid is of the log10 values
+
+		Returns
+		----------
+		MinMaxPyramid : The summarised trace
+		"""
+		key = (analyte, logScale)
+		with self.lock:
+			if key not in self.pyramids:
+				self.pyramids[key] = MinMaxPyramid(self.x, self.values(analyte, logScale))
+			return self.pyramids[key]
+
+	def filterMasks(self, dat):
+		"""
+		Gets the filter masks of every analyte, which are kept until the sample's filter switches change
+
+		Parameters
+		----------
+		dat : latools.D
+			The sample's data object
+
+		Returns
+		----------
+		np.ndarray : A boolean (analytes x time) array, which is True where a value passes the filters
+		"""
+		with self.lock:
+			key = repr(dat.filt.switches)
+			if key != self.filterKey:
+				self.filterKey = key
+				self.masks = filterMasks(dat.filt, self.analytes)
+				self.filteredValues = {}
+				self.filteredPyramids = {}
+			return self.masks
+
+	def filtered(self, dat, analyte, logScale):
+		"""
+		Gets an analyte's filter mask, and the min/max pyramid of its trace with the filtered out values removed.
+		These are kept until the sample's filter switches change.
+
+		Parameters
+		----------
+		dat : latools.D
+			The sample's data object
+		analyte : str
+			The analyte
+		logScale : bool
+			Whether the pyramid is of the log10 values
+
+		Returns
+		----------
+		(np.ndarray, MinMaxPyramid) : The mask of the values that pass the filters, and the filtered trace
+		"""
+		pyramid = self.pyramid(analyte, logScale)
+		masks = self.filterMasks(dat)
+		mask = masks[self.rows[analyte]]
+
+		with self.lock:
+			if (analyte, logScale) not in self.filteredPyramids:
+				if mask.all():
+					# Nothing is filtered out, so the trace's own pyramid is used
+					self.filteredPyramids[(analyte, logScale)] = pyramid
+				else:
+					# Every analyte is masked in one go, the first time a filtered trace is needed
+					if logScale not in self.filteredValues:
+						values = self.log if logScale else self.nominal
+						self.filteredValues[logScale] = np.where(masks, values, np.nan)
+					y = self.filteredValues[logScale][self.rows[analyte]]
+					self.filteredPyramids[(analyte, logScale)] = MinMaxPyramid(self.x, y)
+
+			return mask, self.filteredPyramids[(analyte, logScale)]
+
+	def nbytes(self):
+		""" Returns the memory used by the sample's arrays, in bytes """
+		with self.lock:
+			total = self.x.nbytes + self.nominal.nbytes + self.log.nbytes
+			# Each pyramid shares its trace's x and y arrays
+			total += sum(p.nbytes() - p.x.nbytes - p.y.nbytes for p in self.pyramids.values())
+			total += sum(p.nbytes() - p.x.nbytes - p.y.nbytes for key, p in self.filteredPyramids.items()
+						 if p is not self.pyramids.get(key))
+			total += sum(y.nbytes for y in self.filteredValues.values())
+			if self.masks is not None:
+				total += self.masks.nbytes
+			return total
+
+
+class TraceCache:
+	""" The unpacked traces of the most recently viewed samples, within a memory budget """
+
+	def __init__(self, budget=DEFAULT_BUDGET):
+		"""
+		Creates an empty cache
+
+		Parameters
+		----------
+		budget : int
+			The most memory the cache keeps, in bytes. The most recently used sample is always kept.
+		"""
+		self.budget = budget
+		self.samples = OrderedDict()
+
+		# Increased whenever the cache is cleared, so that traces unpacked from older data aren't added
+		self.generation = 0
+		self.lock = threading.RLock()
+
+	def get(self, eg, sample, focusStage):
+		"""
+		Gets the unpacked traces of a sample, unpacking them if they aren't cached
+
+		Parameters
+		----------
+		eg : latools.analyse
+			The analyse object
+		sample : str
+			The name of the sample
+		focusStage : str
+			The focus stage whose data is used
+
+		Returns
+		----------
+		SampleTraces : The sample's traces
+		"""
+		key = (sample, focusStage)
+		with self.lock:
+			traces = self.samples.get(key)
+			if traces is not None:
+				self.samples.move_to_end(key)
+				return traces
+			generation = self.generation
+
+		# The data is unpacked outside the lock, so that another thread can use the cache meanwhile
+		traces = SampleTraces(eg.data[sample], focusStage)
+
+		with self.lock:
+			if generation != self.generation:
+				# The data changed while it was being unpacked
+				return traces
+			if key in self.samples:
+				# Another thread unpacked the same sample first
+				self.samples.move_to_end(key)
+				return self.samples[key]
+			self.samples[key] = traces
+			self.trim()
+		return traces
+
+	def pyramid(self, eg, sample, focusStage, analyte, logScale):
+		"""
+		Gets the min/max pyramid of an analyte's trace
+
+		Parameters
+		----------
+		eg : latools.analyse
+			The analyse object
+		sample : str
+			The name of the sample
+		focusStage : str
+			The focus stage whose data is used
+		analyte : str
+			The analyte
+		logScale : bool
+			Whether the pyramid is of the log10 values
+
+		Returns
+		----------
+		MinMaxPyramid : The summarised trace
+		"""
+		traces = self.get(eg, sample, focusStage)
+		if (analyte, logScale) not in traces.pyramids:
+			traces.pyramid(analyte, logScale)
+			self.trim()
+		return traces.pyramid(analyte, logScale)
+
+	def touch(self, sample, focusStage):
+		""" Marks a sample as the most recently used, so that it is dropped last """
+		with self.lock:
+			if (sample, focusStage) in self.samples:
+				self.samples.move_to_end((sample, focusStage))
+
+	def nbytes(self):
+		""" Returns the memory used by the cached samples, in bytes """
+		return sum(traces.nbytes() for traces in self.samples.values())
+
+	def trim(self):
+		""" Drops the least recently used samples until the cache is within its budget """
+		with self.lock:
+			while len(self.samples) > 1 and self.nbytes() > self.budget:
+				self.samples.popitem(last=False)
+
+	def clear(self):
+		""" Drops every sample, such as when a stage has been applied and the data has changed """
+		with self.lock:
+			self.samples.clear()
+			self.generation += 1
@@ -0,0 +1,140 @@
+""" Prepares the traces of the samples next to the one being viewed on a worker thread, so that moving through
+the sample list is quick """
+
+from PyQt5.QtCore import QRunnable, QThreadPool
+
+import logging
+
+# The number of samples either side of the current sample that are prepared
+PREFETCH_SAMPLES = 3
+
+
+def neighbours(samples, current, count=PREFETCH_SAMPLES):
+	"""
+	Gets the samples either side of the current sample, nearest first
+
+	Parameters
+	----------
+	samples : [str]
+		The samples in the order they are listed
+	current : str
+		The sample being viewed
+	count : int
+		The number of samples to get on each side
+
+	Returns
+	----------
+	[str] : The neighbouring samples, alternating between the next and previous
+	"""
+	if current not in samples:
+		return []
+
+	index = samples.index(current)
+	nearby = []
+	for offset in range(1, count + 1):
+		for i in (index + offset, index - offset):
+			if 0 <= i < len(samples):
+				nearby.append(samples[i])
+	return nearby
+
+
+class PrefetchJob(QRunnable):
+	""" Prepares the traces of a list of samples, stopping early if a newer request is made """
+
+	def __init__(self, prefetcher, request, eg, samples, current, focusStage, logScale, filtering):
+		"""
+		Parameters
+		----------
+		prefetcher : TracePrefetcher
+			The prefetcher that made the job
+		request : int
+			The number of the request, used to tell whether it has been replaced
+		eg : latools.analyse
+			The analyse object
+		samples : [str]
+			The samples to prepare, in the order they are prepared
+		current : str
+			The sample being viewed, which is kept as the most recently used in the cache
+		focusStage : str
+			The focus stage being viewed
+		logScale : bool
+			Whether the graph is in log scale
+		filtering : bool
+			Whether the filter masks are prepared
+		"""
+		super().__init__()
+		self.prefetcher = prefetcher
+		self.request = request
+		self.eg = eg
+		self.samples = samples
+		self.current = current
+		self.focusStage = focusStage
+		self.logScale = logScale
+		self.filtering = filtering
+
+	def run(self):
+		""" Prepares each sample in turn on the worker thread """
+		cache = self.prefetcher.cache
+		try:
+			for sample in self.samples:
+				if self.request != self.prefetcher.request:
+					return
+
+				traces = cache.get(self.eg, sample, self.focusStage)
+				dat = self.eg.data[sample]
+				for analyte in dat.analytes:
+					traces.pyramid(analyte, self.logScale)
+					if self.filtering:
+						traces.filtered(dat, analyte, self.logScale)
+
+				# The sample being viewed shouldn't be the one dropped to make room
+				cache.touch(self.current, self.focusStage)
+				cache.trim()
+		except Exception:
+			# The graph prepares any sample that is missing when it is shown, so this is not a problem for the user
+			logging.getLogger(__name__).warning("Could not prefetch the sample traces", exc_info=True)
+
+
+class TracePrefetcher:
+	""" Fills a TraceCache with the samples next to the one being viewed, one request at a time """
+
+	def __init__(self, cache):
+		"""
+		Parameters
+		----------
+		cache : TraceCache
+			The cache that is filled
+		"""
+		self.cache = cache
+
+		# Only one request is worked on at a time, and a newer request stops the one before it
+		self.pool = QThreadPool()
+		self.pool.setMaxThreadCount(1)
+		self.request = 0
+
+	def prefetch(self, eg, samples, current, focusStage, logScale, filtering=False):
+		"""
+		Starts preparing the samples either side of the one being viewed
+
+		Parameters
+		----------
+		eg : latools.analyse
+			The analyse object
+		samples : [str]
+			The samples in the order they are listed
+		current : str
+			The sample being viewed
+		focusStage : str
+			The focus stage being viewed
+		logScale : bool
+			Whether the graph is in log scale
+		filtering : bool
+			Whether the filter masks are prepared
+		"""
+		self.request += 1
+		self.pool.start(PrefetchJob(self, self.request, eg, neighbours(samples, current), current,
+									focusStage, logScale, filtering))
+
+	def cancel(self):
+		""" Stops the current request after the sample it is working on """
+		self.request += 1
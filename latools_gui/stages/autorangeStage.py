@@ -5,10 +5,12 @@ from PyQt5.QtGui import *
 import latools as la
 import inspect
 import templates.controlsPane as controlsPane
+from project import parallelProcessing
 import json
 import ast
 import sys
 import os
+from functools import partial
 
 import logging
 
@@ -139,6 +141,12 @@ class AutorangeStage():
 		self.optionsGrid.addWidget(self.logTransformCheck, 2, 2, 1, 2)
 		self.logTransformCheck.setToolTip(self.stageInfo["log_transform_description"])
 
+		# We create the parallel processing option
+		self.parallelOption = QCheckBox(self.stageInfo["parallel_label"])
+		self.parallelOption.setChecked(True)
+		self.optionsGrid.addWidget(self.parallelOption, 3, 2, 1, 2)
+		self.parallelOption.setToolTip(self.stageInfo["parallel_description"])
+
 		# We create a reset to default button
 		self.defaultButton = QPushButton("Defaults")
 		self.defaultButton.clicked.connect(self.defaultButtonPress)
@@ -218,6 +226,12 @@ class AutorangeStage():
 				self.raiseError("The 'off_mult' values must be floating point numbers")
 				return
 
+		# The processing option isn't a stage value, so it isn't saved in the project.
+		# The samples are either split across one process per core, or processed one after another in this process
+		localWorkers = None
+		if not self.parallelOption.isChecked():
+			localWorkers = 1
+
 		# localNbin = None
 		# if self.nbinEdit.text() != "":
 		# 	try:
@@ -226,33 +240,40 @@ class AutorangeStage():
 		# 		self.raiseError("The 'nbin' value must be an integer")
 		# 		return
 
-		# The actual call to the analyse object for this stage is run, using the stage values as parameters
-		try:
-
-		
-			self.project.eg.autorange(analyte=self.analyteBox.currentText(),
-								gwin=localGwin,
-								swin=localSwin,
-								win=localWin,
-								on_mult=localOn_mult,
-								off_mult=localOff_mult,
-								#nbin=localNbin,
-								transform=self.logTransformCheck.isChecked())
-		except:
-			for l in self.project.eg.log:
-				self.logger.error(l)
-			# Logging the values
-			self.logger.error('Executing stage Autorange with stage variables: [Analyte]:{}\n[gwin]:{}\n[swin]:{}\n[win]:'
-							 '{}\n[on_mult]:{}\n[off_mult]:{}\n'.format( self.analyteBox.currentText(),
-													localGwin,
-													localSwin,
-													localWin,
-													localOn_mult,
-													localOff_mult))
-			self.logger.exception("Exception in autorange stage:")
-			self.raiseError("A problem occurred. There may be a problem with the input values.")
-			return
+		# The stage values are kept so that they can be logged if the call fails
+		self.stageValues = (self.analyteBox.currentText(),
+							localGwin,
+							localSwin,
+							localWin,
+							localOn_mult,
+							localOff_mult)
+
+		# The actual call to the analyse object for this stage is run on the stage runner's worker thread,
+		# using the stage values as parameters
+		params = {"analyte": self.analyteBox.currentText(),
+				  "gwin": localGwin,
+				  "swin": localSwin,
+				  "win": localWin,
+				  "on_mult": localOn_mult,
+				  "off_mult": localOff_mult,
+				  #"nbin": localNbin,
+				  "transform": self.logTransformCheck.isChecked()}
+
+		self.project.runStage("autorange",
+							  partial(parallelProcessing.autorange, self.project.eg, workers=localWorkers, **params),
+							  params,
+							  self.autorangeFinished,
+							  self.autorangeFailed)
+
+	def autorangeFinished(self, result=None):
+		"""
+		Updates the GUI once the stage runner has applied autorange to the data
 
+		Parameters
+		----------
+		result : None
+			The return value of the autorange call, which is not used
+		"""
 		self.graphPaneObj.updateGraph(showRanges=True)
 
 		# When the stage's processing is complete, the right button is enabled for the next stage.
@@ -261,6 +282,23 @@ class AutorangeStage():
 		# Automatically saves the project if it already has a save location
 		# self.project.reSave()
 
+	def autorangeFailed(self, error):
+		"""
+		Reports a problem once the stage runner has failed to apply autorange
+
+		Parameters
+		----------
+		error : Exception
+			The exception raised by the autorange call
+		"""
+		for l in self.project.eg.log:
+			self.logger.error(l)
+		# Logging the values
+		self.logger.error('Executing stage Autorange with stage variables: [Analyte]:{}\n[gwin]:{}\n[swin]:{}\n[win]:'
+						 '{}\n[on_mult]:{}\n[off_mult]:{}\n'.format(*self.stageValues))
+		self.logger.error("Exception in autorange stage:", exc_info=error)
+		self.raiseError("A problem occurred. There may be a problem with the input values.")
+
 	#@logged
 	def updateStageInfo(self):
 		""" The analyte dropdown can only be built once data is imported at runtime """
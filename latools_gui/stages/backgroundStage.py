@@ -9,6 +9,7 @@ import json
 import ast
 import sys
 import os
+from functools import partial
 
 import logging
 
@@ -302,35 +303,33 @@ class BackgroundStage():
 					self.raiseError("The 'f_n_lim' value must be an integer")
 					return
 
-			# The actual call to the analyse object for this stage is run, using the stage values as parameters
-			try:
-				
-				
-				self.project.eg.bkg_calc_weightedmean(analytes=None,
-								      weight_fwhm=myweight,
-								      n_min=myn_min,
-								      n_max=myn_max,
-								      cstep=mycstep,
-								      bkg_filter=self.bkg_filterOption.isChecked(),
-								      f_win=myf_win,
-								      f_n_lim=myf_n_lim)
-			except:
-				for l in self.project.eg.log:
-					self.logger.error(l)
-				# logging 
-				self.logger.error('Executing stage Background (weighted mean) with stage variables: [weight_fwhm]:{}\n[n_min]:{}\n[n_max]:'
-								 '{}\n[cstep]:{}\n[bkg_filter]:{}\n[f_win]:{}\n[f_n_lim]:{}\n'.format( myweight,
-																		myn_min,
-																		myn_max,
-																		mycstep,
-																		self.bkg_filterOption.isChecked(),
-																		myf_win,
-																		myf_n_lim))
-				
-
-				self.logger.exception("Exception in background stage:")
-				self.raiseError("A problem occurred. There may be a problem with the input values.")
-				return
+			# The stage values are kept so that they can be logged if the call fails
+			self.stageValues = ("weighted mean",
+								"weight_fwhm",
+								myweight,
+								myn_min,
+								myn_max,
+								mycstep,
+								self.bkg_filterOption.isChecked(),
+								myf_win,
+								myf_n_lim)
+
+			# The actual call to the analyse object for this stage is run on the stage runner's worker thread,
+			# using the stage values as parameters
+			params = {"analytes": None,
+					  "weight_fwhm": myweight,
+					  "n_min": myn_min,
+					  "n_max": myn_max,
+					  "cstep": mycstep,
+					  "bkg_filter": self.bkg_filterOption.isChecked(),
+					  "f_win": myf_win,
+					  "f_n_lim": myf_n_lim}
+
+			self.project.runStage("bkg_calc_weightedmean",
+								  partial(self.project.eg.bkg_calc_weightedmean, **params),
+								  params,
+								  self.calcFinished,
+								  self.calcFailed)
 		else:
 
 			# We protect against blank or incorrect fields in options
@@ -382,31 +381,41 @@ class BackgroundStage():
 					self.raiseError("The 'f_n_lim' value must be an integer")
 					return
 
-			try:
-				self.project.eg.bkg_calc_interp1d(analytes=None,
-											kind=myKind,
-											n_min=myn_min2,
-											n_max=myn_max2,
-											cstep=mycstep,
-											bkg_filter=self.bkg_filterOption.isChecked(),
-											f_win=myf_win,
-											f_n_lim=myf_n_lim)
-			except:
-				for l in self.project.eg.log:
-					self.logger.error(l)
-				# logging 
-				self.logger.error('Executing stage Background (interp) with stage variables: [weight_fwhm]:{}\n[n_min]:{}\n[n_max]:'
-								 '{}\n[cstep]:{}\n[bkg_filter]:{}\n[f_win]:{}\n[f_n_lim]:{}\n'.format( myweight,
-																		myn_min,
-																		myn_max,
-																		mycstep,
-																		self.bkg_filterOption.isChecked(),
-																		myf_win,
-																		myf_n_lim))
-				self.logger.exception("Exception in background stage:")
-				self.raiseError("A problem occurred. There may be a problem with the input values.")
-				return
+			# The stage values are kept so that they can be logged if the call fails
+			self.stageValues = ("interp",
+								"kind",
+								myKind,
+								myn_min2,
+								myn_max2,
+								mycstep,
+								self.bkg_filterOption.isChecked(),
+								myf_win,
+								myf_n_lim)
+
+			params = {"analytes": None,
+					  "kind": myKind,
+					  "n_min": myn_min2,
+					  "n_max": myn_max2,
+					  "cstep": mycstep,
+					  "bkg_filter": self.bkg_filterOption.isChecked(),
+					  "f_win": myf_win,
+					  "f_n_lim": myf_n_lim}
+
+			self.project.runStage("bkg_calc_interp1d",
+								  partial(self.project.eg.bkg_calc_interp1d, **params),
+								  params,
+								  self.calcFinished,
+								  self.calcFailed)
+
+	def calcFinished(self, result=None):
+		"""
+		Updates the GUI once the stage runner has calculated the background
 
+		Parameters
+		----------
+		result : None
+			The return value of the background calculation, which is not used
+		"""
 		self.graphPaneObj.updateBkg()
 
 		# The background calculation is now complete, and can now be subtracted and plotted
@@ -416,6 +425,23 @@ class BackgroundStage():
 		# Automatically saves the project if it already has a save location
 		# self.project.reSave()
 
+	def calcFailed(self, error):
+		"""
+		Reports a problem once the stage runner has failed to calculate the background
+
+		Parameters
+		----------
+		error : Exception
+			The exception raised by the background calculation
+		"""
+		for l in self.project.eg.log:
+			self.logger.error(l)
+		# logging
+		self.logger.error('Executing stage Background ({}) with stage variables: [{}]:{}\n[n_min]:{}\n[n_max]:'
+						 '{}\n[cstep]:{}\n[bkg_filter]:{}\n[f_win]:{}\n[f_n_lim]:{}\n'.format(*self.stageValues))
+		self.logger.error("Exception in background stage:", exc_info=error)
+		self.raiseError("A problem occurred. There may be a problem with the input values.")
+
 	#@logged
 	def pressedPopupButton(self):
 		""" Creates a popup for the background calculation when a button is pressed. """
@@ -425,7 +451,24 @@ class BackgroundStage():
 	#@logged
 	def pressedSubtractButton(self):
 		""" Subtracts an existing background calculation from the project data when a button is pressed. """
-		self.project.eg.bkg_subtract(analytes=None, errtype='stderr', focus_stage='despiked')
+		params = {"analytes": None,
+				  "errtype": 'stderr',
+				  "focus_stage": 'despiked'}
+
+		self.project.runStage("bkg_subtract",
+							  partial(self.project.eg.bkg_subtract, **params),
+							  params,
+							  self.subtractFinished)
+
+	def subtractFinished(self, result=None):
+		"""
+		Updates the GUI once the stage runner has subtracted the background
+
+		Parameters
+		----------
+		result : None
+			The return value of the background subtraction, which is not used
+		"""
 		self.graphPaneObj.updateGraph()
 		self.progressPaneObj.completedStage(3)
 
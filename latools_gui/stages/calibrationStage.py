@@ -10,6 +10,7 @@ import json
 import os
 import sys
 import ast
+from functools import partial
 
 
 
@@ -192,24 +193,42 @@ class CalibrationStage():
 			if srm[0].isChecked():
 				srmParam.append(srm[1])
 
-		# The actual call to the analyse object for this stage is run, using the stage values as parameters
-		try:
-			self.project.eg.calibrate(analytes=None,
-								drift_correct=self.drift_correctOption.isChecked(),
-								srms_used=srmParam,
-								#zero_intercept=self.zero_interceptOption.isChecked(),
-								n_min=myn_min)
-		except:
-			for l in self.project.eg.log:
-					self.logger.error(l)
-			self.logger.info('Executing stage Calibration with stage variables: [drift_correct]:{}\n[srms_used]:{}\n'
-							'[n_min]:{}\n'.format( self.drift_correctOption.isChecked(),
-										srmParam,
-										#self.zero_interceptOption.isChecked(),
-										myn_min))
-			self.logger.exception("Exception occured in calibration stage:")
-			self.raiseError("A problem occurred. There may be a problem with the input values.")
-			return
+		# The stage values are kept so that they can be logged if the call fails
+		self.stageValues = (self.drift_correctOption.isChecked(),
+							srmParam,
+							#self.zero_interceptOption.isChecked(),
+							myn_min)
+
+		# The popup is only shown for calibrations the user asked for, not those applied while loading a project.
+		# The flag is read now, as it is reset before the calibration has finished.
+		showPopup = not self.autoApplyButton
+		self.autoApplyButton = False
+
+		# The actual call to the analyse object for this stage is run on the stage runner's worker thread,
+		# using the stage values as parameters
+		params = {"analytes": None,
+				  "drift_correct": self.drift_correctOption.isChecked(),
+				  "srms_used": srmParam,
+				  #"zero_intercept": self.zero_interceptOption.isChecked(),
+				  "n_min": myn_min}
+
+		self.project.runStage("calibrate",
+							  partial(self.project.eg.calibrate, **params),
+							  params,
+							  partial(self.calibrateFinished, showPopup=showPopup),
+							  self.calibrateFailed)
+
+	def calibrateFinished(self, result=None, showPopup=True):
+		"""
+		Updates the GUI once the stage runner has calibrated the data
+
+		Parameters
+		----------
+		result : None
+			The return value of the calibrate call, which is not used
+		showPopup : bool
+			Whether the calibration popup is shown
+		"""
 		self.graphPaneObj.updateGraph()
 
 		self.popupButton.setEnabled(True)
@@ -221,9 +240,24 @@ class CalibrationStage():
 
 		# Pop-up button press added to the apply button
 		# TO DO: review this.
-		if not self.autoApplyButton:
+		if showPopup:
 			self.pressedPopupButton()
-		self.autoApplyButton = False
+
+	def calibrateFailed(self, error):
+		"""
+		Reports a problem once the stage runner has failed to calibrate the data
+
+		Parameters
+		----------
+		error : Exception
+			The exception raised by the calibrate call
+		"""
+		for l in self.project.eg.log:
+				self.logger.error(l)
+		self.logger.info('Executing stage Calibration with stage variables: [drift_correct]:{}\n[srms_used]:{}\n'
+						'[n_min]:{}\n'.format(*self.stageValues))
+		self.logger.error("Exception occured in calibration stage:", exc_info=error)
+		self.raiseError("A problem occurred. There may be a problem with the input values.")
 
 	#@logged
 	def pressedReloadButton(self):
@@ -5,10 +5,12 @@ from PyQt5.QtGui import *
 import latools as la
 import inspect
 import templates.controlsPane as controlsPane
+from project import parallelProcessing
 import json
 import ast
 import sys
 import os
+from functools import partial
 
 import logging
 
@@ -164,6 +166,29 @@ class DespikingStage():
 		self.pane2Maxiter.setToolTip(self.stageInfo["maxiter_description"])
 		self.maxiterLabel.setToolTip(self.stageInfo["maxiter_description"])
 
+		# Third pane
+
+		self.pane3VWidget = QWidget()
+		self.pane3VLayout = QVBoxLayout(self.pane3VWidget)
+		self.processingLabel = QLabel(self.stageInfo["processing_label"])
+		self.pane3VLayout.addWidget(self.processingLabel)
+
+		self.pane3Frame = QFrame()
+		self.pane3Frame.setFrameShape(QFrame.StyledPanel)
+		self.pane3Frame.setFrameShadow(QFrame.Raised)
+
+		self.pane3Layout = QGridLayout(self.pane3Frame)
+		self.pane3VLayout.addWidget(self.pane3Frame)
+		self.pane3VLayout.addStretch(1)
+
+		self.optionsGrid.addWidget(self.pane3VWidget)
+
+		# We create the parallel processing option
+		self.pane3ParallelOption = QCheckBox(self.stageInfo["parallel_label"])
+		self.pane3ParallelOption.setChecked(True)
+		self.pane3Layout.addWidget(self.pane3ParallelOption, 0, 0, 1, 0)
+		self.pane3ParallelOption.setToolTip(self.stageInfo["parallel_description"])
+
 		# We create a reset to default button
 		self.defaultButton = QPushButton("Defaults")
 		self.defaultButton.clicked.connect(self.defaultButtonPress)
@@ -237,33 +262,44 @@ class DespikingStage():
 				self.raiseError("The 'maxiter' value must be an integer")
 				return
 
-		# The actual call to the analyse object for this stage is run, using the stage values as parameters
-		try:
-			self.project.eg.despike(expdecay_despiker=self.pane1expdecayOption.isChecked(),
-								exponent=localExponent,
-								noise_despiker=self.pane2NoiseOption.isChecked(),
-								win=localWin,
-								nlim=localNlim,
-								exponentplot=False,
-								maxiter=localMaxiter)
-		except:
-			try:
-				for l in self.project.eg.log:
-					self.logger.error(l)
-				self.logger.error('Executing despiking stage with stage variables: [expdecay_despiker]:'
-							 '{}\n[exponent]:{}\n[noise_despiker]:{}\n[win]:{}\n[nlim]:{}\n[maxiter]'
-							 ':{}\n'.format( self.pane1expdecayOption.isChecked(),
-											 localExponent,
-											 self.pane2NoiseOption.isChecked(),
-											 localWin,
-											 localNlim,
-											 localMaxiter))
-				self.logger.exception("Problem occured in despiking stage:")
-			except:
-				self.logger.exception("Problem occured in despiking stage:")
+		# The stage values are kept so that they can be logged if the call fails
+		self.stageValues = (self.pane1expdecayOption.isChecked(),
+							localExponent,
+							self.pane2NoiseOption.isChecked(),
+							localWin,
+							localNlim,
+							localMaxiter)
+
+		# The actual call to the analyse object for this stage is run on the stage runner's worker thread,
+		# using the stage values as parameters
+		# The samples are either split across one process per core, or despiked one after another in this process
+		workers = None
+		if not self.pane3ParallelOption.isChecked():
+			workers = 1
+
+		params = {"expdecay_despiker": self.pane1expdecayOption.isChecked(),
+				  "exponent": localExponent,
+				  "noise_despiker": self.pane2NoiseOption.isChecked(),
+				  "win": localWin,
+				  "nlim": localNlim,
+				  "exponentplot": False,
+				  "maxiter": localMaxiter}
+
+		self.project.runStage("despike",
+							  partial(parallelProcessing.despike, self.project.eg, workers=workers, **params),
+							  params,
+							  self.despikeFinished,
+							  self.despikeFailed)
+
+	def despikeFinished(self, result=None):
+		"""
+		Updates the GUI once the stage runner has despiked the data
 
-			self.raiseError("A problem occurred. There may be a problem with the input values.")
-			return
+		Parameters
+		----------
+		result : None
+			The return value of the despike call, which is not used
+		"""
 
 		# If the exponential decay despiker is applied without specifying the 'exponent' option, the automatically
 		# calculated value is provided to the exponent textbox.
@@ -281,6 +317,27 @@ class DespikingStage():
 		# Automatically saves the project if it already has a save location
 		# self.project.reSave()
 
+	def despikeFailed(self, error):
+		"""
+		Reports a problem once the stage runner has failed to despike the data
+
+		Parameters
+		----------
+		error : Exception
+			The exception raised by the despike call
+		"""
+		try:
+			for l in self.project.eg.log:
+				self.logger.error(l)
+			self.logger.error('Executing despiking stage with stage variables: [expdecay_despiker]:'
+						 '{}\n[exponent]:{}\n[noise_despiker]:{}\n[win]:{}\n[nlim]:{}\n[maxiter]'
+						 ':{}\n'.format(*self.stageValues))
+			self.logger.error("Problem occured in despiking stage:", exc_info=error)
+		except:
+			self.logger.error("Problem occured in despiking stage:", exc_info=error)
+
+		self.raiseError("A problem occurred. There may be a problem with the input values.")
+
 	#@logged
 	def raiseError(self, message):
 		""" Creates an error box with the given message """
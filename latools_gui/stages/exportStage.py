@@ -5,9 +5,11 @@ from PyQt5.QtCore import QUrl, Qt
 import latools as la
 import logging
 import templates.controlsPane as controlsPane
+from templates.analyteLegend import AnalyteLegend
 import os
 import sys
 import json
+from functools import partial
 
 import logging
 
@@ -142,28 +144,15 @@ class ExportStage():
 
 		# Analytes combo
 
-		self.analyteBoxes = []
-		self.analytesWidget = QWidget()
-
 		self.analytesLabel = QLabel("<span style=\"color:#779999; font-weight:bold\">Analytes</span>")
 		self.optionsGrid.addWidget(self.analytesLabel, 1, 0)
 
-		self.scroll = QScrollArea()
-		self.scroll.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
-		self.scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-		self.scroll.setWidgetResizable(True)
-		self.scroll.setMinimumWidth(70)
-
-		self.innerWidget = QWidget()
-		self.innerWidget.setSizePolicy(QSizePolicy.Maximum, QSizePolicy.Maximum)
-
-		self.analyteLayout = QVBoxLayout(self.innerWidget)
-		self.optionsGrid.addWidget(self.scroll, 2, 0)
-		self.innerWidget.setToolTip(self.stageInfo["analyte_description"])
-
-		self.analytesWidget.scroll = self.scroll
-
-		self.scroll.setWidget(self.innerWidget)
+		# The analytes are checked in the same legend as the graphs, so the exports match what is shown
+		self.analyteModel = self.graphPaneObj.analyteModel
+		self.analyteList = AnalyteLegend(self.analyteModel)
+		self.analyteList.setMinimumWidth(70)
+		self.analyteList.setToolTip(self.stageInfo["analyte_description"])
+		self.optionsGrid.addWidget(self.analyteList, 2, 0)
 
 		# Focus stage
 
@@ -329,27 +318,13 @@ class ExportStage():
 			self.defaultDataFolder = self.project.dataLocation + "_export"
 		self.fileLocationLine.setText(self.defaultDataFolder)
 
-		# If we have already imported we need to remove the existing analytes
-		for i in range(len(self.analyteBoxes)):
-			self.analyteBoxes[i].setParent(None)
-		self.analyteBoxes.clear()
-
-		# We create the list of analyte checkboxes
-		for analyte in self.project.eg.analytes:
-			self.analyteBoxes.append(QCheckBox(str(analyte)))
-			self.analyteBoxes[-1].setChecked(True)
-			self.analyteLayout.addWidget(self.analyteBoxes[-1])
-
 
 	def pressedExportButton(self):
 		""" When the export button is pressed we run an export command based on the option values. """
 
 		try:
 			# We create a list of the checked analytes. There must be at least one checked.
-			analytes = []
-			for a in self.analyteBoxes:
-				if a.isChecked():
-					analytes.append(a.text())
+			analytes = self.analyteModel.checkedAnalytes()
 			if len(analytes) == 0:
 				self.raiseError("You must select at least one analyte.")
 				return
@@ -371,16 +346,15 @@ class ExportStage():
 					self.raiseError("You must select at least one analysis stage to include.")
 					return
 
-				# We run a separate export call for each focus stage selected.
-				for stage in stages:
-					self.project.eg.export_traces(outdir=self.fileLocationLine.text(),
-												  focus_stage=stage,
-												  analytes=analytes,
-												  filt=filtered)
-
-				infoBox = QMessageBox.information(self.exportStageWidget, "Export",
-												  "The data has been exported.",
-												  QMessageBox.Ok)
+				# The export calls are run on the stage runner's worker thread
+				self.project.stageRunner.run("export_traces",
+											 partial(self.exportTraces,
+													 self.fileLocationLine.text(),
+													 stages,
+													 analytes,
+													 filtered),
+											 partial(self.exportFinished, "The data has been exported."),
+											 self.exportFailed)
 
 			else:
 				# Otherwise run the Sample Statistics export
@@ -395,36 +369,114 @@ class ExportStage():
 					self.raiseError("You must select at least one stat function.")
 					return
 
-				# We run the sample statistics export function
-				self.project.eg.sample_stats(analytes=analytes,
-											 filt=self.filtStats.isChecked(),
-											 stats=stats)
-
-				# We create a data frame from of the sample statistics data
-				df = self.project.eg.getstats(save=False)
-				# We save the data frame to csv in the specified location
-				df.to_csv(os.path.join(self.fileLocationLine.text(), "Sample_stats" + str(self.statsExportCount) + ".csv"))
+				fileName = os.path.join(self.fileLocationLine.text(),
+										"Sample_stats" + str(self.statsExportCount) + ".csv")
 				self.statsExportCount += 1
 
-				infoBox = QMessageBox.information(self.exportStageWidget, "Export",
-												  "The sample statistics have been exported.",
-												  QMessageBox.Ok)
-			
+				self.project.stageRunner.run("sample_stats",
+											 partial(self.exportStats,
+													 fileName,
+													 analytes,
+													 self.filtStats.isChecked(),
+													 stats),
+											 partial(self.exportFinished,
+													 "The sample statistics have been exported."),
+											 self.exportFailed)
+
 		except:
-			for l in self.project.eg.log:
-					self.logger.error(l)
-			#logging 
-			self.logger.error('Attempting to export with stage variables: [export_type]:{}\n[filter]:{}\n'.format(
-					self.typeCombo.currentText(),
-					self.filtStats.isChecked()))
-			for a in self.analyteBoxes:
-				self.logger.error('[analyte {}:]{}'.format(a.text(), a.isChecked()))
-
-			for s in self.focus_stages:
-				self.logger.error('[stage {}]:{}'.format(s.text(), s.isChecked()))
-			
+			self.exportFailed()
+
+	def exportTraces(self, outdir, stages, analytes, filtered):
+		"""
+		Exports the traces of each of the focus stages. Run on the stage runner's worker thread.
+
+		Parameters
+		----------
+		outdir : str
+			The folder the traces are exported to
+		stages : list of str
+			The focus stages to export
+		analytes : list of str
+			The analytes to include
+		filtered : bool
+			Whether the filtered data is exported
+		"""
+
+		# We run a separate export call for each focus stage selected.
+		for stage in stages:
+			self.project.eg.export_traces(outdir=outdir,
+										  focus_stage=stage,
+										  analytes=analytes,
+										  filt=filtered)
+
+	def exportStats(self, fileName, analytes, filt, stats):
+		"""
+		Calculates the sample statistics and saves them to csv. Run on the stage runner's worker thread.
+
+		Parameters
+		----------
+		fileName : str
+			The csv file the statistics are saved to
+		analytes : list of str
+			The analytes to include
+		filt : bool
+			Whether the filters are applied
+		stats : list of str
+			The stat functions to include
+		"""
+
+		# We run the sample statistics export function
+		self.project.eg.sample_stats(analytes=analytes,
+									 filt=filt,
+									 stats=stats)
+
+		# We create a data frame from of the sample statistics data
+		df = self.project.eg.getstats(save=False)
+		# We save the data frame to csv in the specified location
+		df.to_csv(fileName)
+
+	def exportFinished(self, message, result=None):
+		"""
+		Lets the user know once the stage runner has completed the export
+
+		Parameters
+		----------
+		message : str
+			The message shown to the user
+		result : None
+			The return value of the export call, which is not used
+		"""
+		# The export is recorded so that it is marked out of date if an earlier stage changes.
+		# Exports are always run again, as the files may have been moved.
+		self.project.stageApplied("export", {})
+
+		infoBox = QMessageBox.information(self.exportStageWidget, "Export", message, QMessageBox.Ok)
+
+	def exportFailed(self, error=None):
+		"""
+		Logs a problem with the export
+
+		Parameters
+		----------
+		error : Exception
+			The exception raised by the export, if it was run by the stage runner
+		"""
+		for l in self.project.eg.log:
+				self.logger.error(l)
+		#logging
+		self.logger.error('Attempting to export with stage variables: [export_type]:{}\n[filter]:{}\n'.format(
+				self.typeCombo.currentText(),
+				self.filtStats.isChecked()))
+		for a in self.analyteModel.analytes:
+			self.logger.error('[analyte {}:]{}'.format(a, self.analyteModel.isChecked(a)))
+
+		for s in self.focus_stages:
+			self.logger.error('[stage {}]:{}'.format(s.text(), s.isChecked()))
+
+		if error is None:
 			self.logger.exception("Exception in export stage:")
-			return
+		else:
+			self.logger.error("Exception in export stage:", exc_info=error)
 
 	def raiseError(self, message):
 		""" Creates an error box with the given message """
@@ -9,6 +9,7 @@ import json
 import ast
 import os
 import sys
+from functools import partial
 
 import time
 
@@ -162,56 +163,80 @@ class ImportStage():
 	def pressedApplyButton(self):
 		""" Imports data into the project when the apply button is pressed. """
 
-		
-	
-		try:
-			self.logger.info('Attempting to locate data')
-			
-			self.project.eg = la.analyse(data_folder=self.fileLocationLine.text(),
-										 config=self.configOption.currentText(),
-										 extension=self.file_extensionOption.text(),
-										 srm_identifier=self.srm_identifierOption.text(),
-										 pbar=self.progressPaneObj.progressUpdater)
-
-			# The graph is updated with the newly imported raw data
-			self.graphPaneObj.updateGraph(importing=True)
-
-			# The progress pane is notified that the import stage has been completed
-			self.progressPaneObj.completedStage(0)
-
-			# The data location is recorded to be used as the default savefile location
-			self.project.setDataLocation(self.fileLocationLine.text())
-
-			# When the data is imported various stage parameters are updated via the importListener
-			if not self.importListener is None:
-				self.importListener.dataImported()
-
-			# Automatically saves the project if it already has a save location
-			# self.project.reSave()
-
-		except IOError: ## IO error seems obvious as we are importing data.
-			self.logger.exception("Error with Importing Data")
-			
-		except IndexError:
-			self.logger.exception("Invalid data folder")
+		self.logger.info('Attempting to locate data')
+
+		# The import is run on the stage runner's worker thread, so the stage values are read here
+		params = {"data_folder": self.fileLocationLine.text(),
+				  "config": self.configOption.currentText(),
+				  "extension": self.file_extensionOption.text(),
+				  "srm_identifier": self.srm_identifierOption.text()}
+
+		self.project.runStage("import",
+							  partial(la.analyse, pbar=self.progressPaneObj.progressUpdater, **params),
+							  params,
+							  self.importFinished,
+							  self.importFailed)
+
+	def importFinished(self, eg):
+		"""
+		Updates the GUI once the data has been imported by the stage runner
+
+		Parameters
+		----------
+		eg : latools.analyse
+			The newly created analyse object
+		"""
+		self.project.eg = eg
+
+		# The graph is updated with the newly imported raw data
+		self.graphPaneObj.updateGraph(importing=True)
+
+		# The progress pane is notified that the import stage has been completed
+		self.progressPaneObj.completedStage(0)
+
+		# The data location is recorded to be used as the default savefile location
+		self.project.setDataLocation(self.fileLocationLine.text())
+
+		# When the data is imported various stage parameters are updated via the importListener
+		if not self.importListener is None:
+			self.importListener.dataImported()
+
+		# Automatically saves the project if it already has a save location
+		# self.project.reSave()
+
+	def importFailed(self, error):
+		"""
+		Reports a problem with the import, once the stage runner has failed to import the data
+
+		Parameters
+		----------
+		error : Exception
+			The exception raised while importing
+		"""
+		if isinstance(error, IndexError):
+			self.logger.error("Invalid data folder", exc_info=error)
 			errorBox = QMessageBox.critical(self.importStageWidget,
 											"Error",
 											"Please select a folder containing valid .csv data files.",
 										QMessageBox.Ok)
 
-		except:
+		elif isinstance(error, IOError): ## IO error seems obvious as we are importing data.
+			self.logger.error("Error with Importing Data", exc_info=error)
+
+		else:
 			self.logger.error('Executing stage Import with stage variables: [Loaction]:{}\n[Config]:{}\n[Extension]:{}\n'
 						 '[srm_Identifier]:{}\n'.format( self.fileLocationLine.text(),
 										self.configOption.currentText(),
 										self.file_extensionOption.text(),
 										self.srm_identifierOption.text()))
-			self.logger.exception("Unhandled error during data import")
+			self.logger.error("Unhandled error during data import", exc_info=error)
 			print("An error occured")
 
 			errorBox = QMessageBox.critical(self.importStageWidget,
 							"Error",
 							"An unhandled error has occured. Please see error log for details.",
 							QMessageBox.Ok)
+
 	#@logged
 	def findDataButtonClicked(self):
 		""" Opens a file dialog to find a file directory for data import when a button is pressed. """
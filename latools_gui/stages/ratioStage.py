@@ -5,6 +5,7 @@ import json
 import sys
 import os
 import ast
+from functools import partial
 
 import templates.controlsPane as controlsPane
 
@@ -111,26 +112,52 @@ class RatioStage():
 	def pressedApplyButton(self):
 		""" Ratios the project data with a given standard when a button is pressed. """
 
-		try:
+		# The stage value is kept so that it can be logged if the call fails
+		self.internalStandard = self.internal_standardOption.currentText()
 
-			# The actual call to the analyse object for this stage is run, using the stage values as parameters
-			self.project.eg.ratio(internal_standard=self.internal_standardOption.currentText())
+		# The actual call to the analyse object for this stage is run on the stage runner's worker thread,
+		# using the stage values as parameters
+		params = {"internal_standard": self.internalStandard}
 
-			# Automatically saves the project if it already has a save location
-			# self.project.reSave()
+		self.project.runStage("ratio",
+							  partial(self.project.eg.ratio, **params),
+							  params,
+							  self.ratioFinished,
+							  self.ratioFailed)
 
-			self.graphPaneObj.updateGraph()
-			self.progressPaneObj.completedStage(4)
+	def ratioFinished(self, result=None):
+		"""
+		Updates the GUI once the stage runner has ratioed the data
 
-			self.project.importListener.updateRatio()
-		except:
-			for l in self.project.eg.log:
-					self.logger.error(l)
-			#logging 
-			self.logger.error('Executing stage Ratio with stage variables: [internal_standard]:{}\n['.format( self.internal_standardOption.currentText()))
-			
-			self.logger.exception("Exception in ratio stage:")
-			return
+		Parameters
+		----------
+		result : None
+			The return value of the ratio call, which is not used
+		"""
+
+		# Automatically saves the project if it already has a save location
+		# self.project.reSave()
+
+		self.graphPaneObj.updateGraph()
+		self.progressPaneObj.completedStage(4)
+
+		self.project.importListener.updateRatio()
+
+	def ratioFailed(self, error):
+		"""
+		Logs a problem once the stage runner has failed to ratio the data
+
+		Parameters
+		----------
+		error : Exception
+			The exception raised by the ratio call
+		"""
+		for l in self.project.eg.log:
+				self.logger.error(l)
+		#logging
+		self.logger.error('Executing stage Ratio with stage variables: [internal_standard]:{}\n['.format(self.internalStandard))
+
+		self.logger.error("Exception in ratio stage:", exc_info=error)
 
 	#@logged
 	def updateStageInfo(self):
@@ -0,0 +1,143 @@
+""" The analyte legend, which is shared by the graph windows and the export stage """
+
+from PyQt5.QtWidgets import *
+from PyQt5.QtGui import QBrush, QColor
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, pyqtSignal
+
+
+class AnalyteModel(QAbstractListModel):
+	"""
+	The project's analytes, their colours, and whether each one is checked. Every legend that shows the model,
+	and every graph that listens to it, is updated together.
+	"""
+
+	# Emitted once for each change, with the analytes whose check state changed
+	checkedChanged = pyqtSignal(list)
+
+	def __init__(self, parent=None):
+		super().__init__(parent)
+		self.analytes = []
+		self.colours = {}
+		self.checked = set()
+
+		# Highlighted analytes are shown in white on their colour
+		self.highlighted = set()
+
+	def setAnalytes(self, analytes, colours):
+		"""
+		Replaces the analytes, such as when a project is imported. Every analyte starts checked.
+
+		Parameters
+		----------
+		analytes : [str]
+			The names of the analytes
+		colours : dict
+			The hex colour of each analyte
+		"""
+		self.beginResetModel()
+		self.analytes = list(analytes)
+		self.colours = dict(colours)
+		self.checked = set(self.analytes)
+		self.highlighted = set()
+		self.endResetModel()
+
+	def rowCount(self, parent=QModelIndex()):
+		if parent.isValid():
+			return 0
+		return len(self.analytes)
+
+	def flags(self, index):
+		return Qt.ItemIsEnabled | Qt.ItemIsUserCheckable
+
+	def data(self, index, role=Qt.DisplayRole):
+		if not index.isValid():
+			return None
+		analyte = self.analytes[index.row()]
+
+		if role == Qt.DisplayRole:
+			return analyte
+		if role == Qt.CheckStateRole:
+			return Qt.Checked if analyte in self.checked else Qt.Unchecked
+		if role == Qt.ForegroundRole:
+			if analyte in self.highlighted:
+				return QBrush(QColor("white"))
+			return QBrush(QColor(self.colours.get(analyte, "black")))
+		if role == Qt.BackgroundRole and analyte in self.highlighted:
+			return QBrush(QColor(self.colours.get(analyte, "black")))
+		return None
+
+	def setData(self, index, value, role=Qt.EditRole):
+		""" Checks or unchecks an analyte when its box is clicked """
+		if not index.isValid() or role != Qt.CheckStateRole:
+			return False
+		self.setCheckStates({self.analytes[index.row()]: value == Qt.Checked})
+		return True
+
+	def isChecked(self, analyte):
+		return analyte in self.checked
+
+	def checkedAnalytes(self):
+		""" Gets the checked analytes, in order """
+		return [a for a in self.analytes if a in self.checked]
+
+	def setCheckStates(self, states):
+		"""
+		Checks or unchecks any number of analytes, updating the legends and graphs once
+
+		Parameters
+		----------
+		states : dict
+			Whether each analyte should be checked
+		"""
+		changed = [a for a in self.analytes if a in states and states[a] != (a in self.checked)]
+		if len(changed) == 0:
+			return
+
+		for analyte in changed:
+			if states[analyte]:
+				self.checked.add(analyte)
+			else:
+				self.checked.discard(analyte)
+
+		rows = [self.analytes.index(a) for a in changed]
+		self.dataChanged.emit(self.index(min(rows), 0), self.index(max(rows), 0), [Qt.CheckStateRole])
+		self.checkedChanged.emit(changed)
+
+	def toggleAll(self):
+		""" Checks every unchecked analyte, and unchecks every checked one """
+		self.setCheckStates({a: a not in self.checked for a in self.analytes})
+
+	def setHighlighted(self, analytes):
+		"""
+		Highlights some analytes, and removes the highlight from the rest
+
+		Parameters
+		----------
+		analytes : [str]
+			The analytes to highlight
+		"""
+		self.highlighted = set(analytes)
+		if len(self.analytes) > 0:
+			self.dataChanged.emit(self.index(0, 0), self.index(len(self.analytes) - 1, 0),
+								  [Qt.ForegroundRole, Qt.BackgroundRole])
+
+
+class AnalyteLegend(QListView):
+	""" A list of check boxes for the analytes of an AnalyteModel """
+
+	def __init__(self, model, parent=None):
+		"""
+		Parameters
+		----------
+		model : AnalyteModel
+			The shared analytes
+		"""
+		super().__init__(parent)
+		self.setModel(model)
+		self.setUniformItemSizes(True)
+		self.setSelectionMode(QAbstractItemView.NoSelection)
+
+	def setAnalyteHidden(self, analyte, hidden):
+		""" Hides an analyte from this legend only, such as the internal standard """
+		if analyte in self.model().analytes:
+			self.setRowHidden(self.model().analytes.index(analyte), hidden)
@@ -0,0 +1,210 @@
+""" A popup window for processing several data folders with the stage parameters of a saved project """
+
+from PyQt5.QtWidgets import *
+from PyQt5.QtGui import QIntValidator
+from PyQt5.QtCore import QTimer
+import os
+
+from project import batchQueue
+
+import logging
+
+# How often the status table is updated, in milliseconds
+STATUS_INTERVAL = 500
+
+
+class BatchWindow(QWidget):
+	"""
+	A popup window, accessed via the file menu, that processes a list of data folders using one saved project
+	as a template. Each folder is processed in its own process, and its progress is shown in a table.
+	"""
+
+	def __init__(self, recentProjects):
+		"""
+		Creates the popup window
+
+		Parameters
+		----------
+		recentProjects : RecentProjects
+			The list of recent projects, which are offered as templates
+		"""
+
+		QWidget.__init__(self)
+		self.setWindowTitle("Batch processing")
+
+		self.queue = None
+		self.logger = logging.getLogger(__name__)
+
+		# We use a grid layout
+		self.batchGrid = QGridLayout(self)
+
+		# The template project is chosen from the recent projects, or browsed for
+		self.batchGrid.addWidget(QLabel("Template project:"), 0, 0)
+		self.templateCombo = QComboBox()
+		self.templateCombo.setToolTip("<qt/>The stage parameters of this project are used to process every "
+									  "data folder.")
+		self.batchGrid.addWidget(self.templateCombo, 0, 1)
+
+		for line in recentProjects.fileContent:
+			name, location = line.split('*')
+			self.templateCombo.addItem(name, os.path.join(location, name + ".lalog"))
+
+		self.templateButton = QPushButton("Browse")
+		self.templateButton.clicked.connect(self.templateClicked)
+		self.batchGrid.addWidget(self.templateButton, 0, 2)
+
+		# The output folder
+		self.batchGrid.addWidget(QLabel("Output folder:"), 1, 0)
+		self.outdirLine = QLineEdit()
+		self.outdirLine.setToolTip("<qt/>Each data folder's results are saved to a sub-folder of this folder.")
+		self.batchGrid.addWidget(self.outdirLine, 1, 1)
+
+		self.outdirButton = QPushButton("Browse")
+		self.outdirButton.clicked.connect(self.outdirClicked)
+		self.batchGrid.addWidget(self.outdirButton, 1, 2)
+
+		# The number of projects processed at once
+		self.batchGrid.addWidget(QLabel("Processes:"), 2, 0)
+		self.workersLine = QLineEdit()
+		self.workersLine.setPlaceholderText("auto")
+		self.workersLine.setValidator(QIntValidator(1, 999))
+		self.workersLine.setToolTip("<qt/>The number of data folders processed at once. If blank, one is "
+									"processed on each of your computer's processor cores.")
+		self.batchGrid.addWidget(self.workersLine, 2, 1)
+
+		# The table of data folders and their status
+		self.table = QTableWidget(0, 3)
+		self.table.setHorizontalHeaderLabels(["Data folder", "Status", "Result"])
+		self.table.horizontalHeader().setStretchLastSection(True)
+		self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+		self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+		self.batchGrid.addWidget(self.table, 3, 0, 1, 3)
+
+		# The buttons for changing the list of folders
+		self.addButton = QPushButton("Add data folder")
+		self.addButton.clicked.connect(self.addClicked)
+		self.batchGrid.addWidget(self.addButton, 4, 0)
+
+		self.removeButton = QPushButton("Remove")
+		self.removeButton.clicked.connect(self.removeClicked)
+		self.batchGrid.addWidget(self.removeButton, 4, 1)
+
+		# The buttons for starting and cancelling the batch
+		self.startButton = QPushButton("Start")
+		self.startButton.clicked.connect(self.startClicked)
+		self.batchGrid.addWidget(self.startButton, 5, 1)
+
+		self.cancelButton = QPushButton("Cancel")
+		self.cancelButton.clicked.connect(self.cancelClicked)
+		self.cancelButton.setEnabled(False)
+		self.batchGrid.addWidget(self.cancelButton, 5, 2)
+
+		# The status table is updated regularly while the batch is running
+		self.statusTimer = QTimer(self)
+		self.statusTimer.setInterval(STATUS_INTERVAL)
+		self.statusTimer.timeout.connect(self.updateStatus)
+
+		self.resize(700, 400)
+
+	def templateClicked(self):
+		""" The browse button for the template project """
+		location = QFileDialog.getOpenFileName(self, 'Open file', '/home', "LAtools projects (*.lalog)")
+		if location[0] != '':
+			name = os.path.splitext(os.path.basename(location[0]))[0]
+			self.templateCombo.insertItem(0, name, location[0])
+			self.templateCombo.setCurrentIndex(0)
+
+	def outdirClicked(self):
+		""" The browse button for the output folder """
+		location = QFileDialog.getExistingDirectory(self, 'Open folder')
+		if location != '':
+			self.outdirLine.setText(location)
+
+	def addClicked(self):
+		""" Adds a data folder to the table """
+		location = QFileDialog.getExistingDirectory(self, 'Open folder')
+		if location == '':
+			return
+
+		row = self.table.rowCount()
+		self.table.insertRow(row)
+		self.table.setItem(row, 0, QTableWidgetItem(location))
+		self.table.setItem(row, 1, QTableWidgetItem(""))
+		self.table.setItem(row, 2, QTableWidgetItem(""))
+
+	def removeClicked(self):
+		""" Removes the selected data folders from the table """
+		for row in sorted({index.row() for index in self.table.selectedIndexes()}, reverse=True):
+			self.table.removeRow(row)
+
+	def startClicked(self):
+		""" Starts processing every data folder in the table """
+
+		templateFile = self.templateCombo.currentData()
+		if templateFile is None or not os.path.isfile(templateFile):
+			self.raiseError("Please select a template project.")
+			return
+
+		if self.outdirLine.text() == "":
+			self.raiseError("Please select an output folder.")
+			return
+
+		if self.table.rowCount() == 0:
+			self.raiseError("Please add at least one data folder.")
+			return
+
+		workers = None
+		if self.workersLine.text() != "":
+			workers = int(self.workersLine.text())
+
+		folders = [self.table.item(row, 0).text() for row in range(self.table.rowCount())]
+
+		self.queue = batchQueue.BatchQueue(templateFile, self.outdirLine.text(), workers)
+		self.queue.start(folders)
+
+		self.setRunning(True)
+		self.updateStatus()
+		self.statusTimer.start()
+
+	def cancelClicked(self):
+		""" Drops the data folders that haven't started processing """
+		if self.queue is not None:
+			self.queue.cancel()
+		self.cancelButton.setEnabled(False)
+
+	def updateStatus(self):
+		""" Updates the status table from the queue """
+		for row in range(len(self.queue.folders)):
+			status, result = self.queue.status(row)
+			self.table.item(row, 1).setText(status)
+			self.table.item(row, 2).setText(result)
+
+			if status == batchQueue.FAILED and self.table.item(row, 2).toolTip() != result:
+				self.table.item(row, 2).setToolTip(result)
+				self.logger.error("Batch processing failed for {}: {}".format(self.queue.folders[row], result))
+
+		if self.queue.isFinished():
+			self.statusTimer.stop()
+			self.setRunning(False)
+
+	def setRunning(self, running):
+		"""
+		Locks the options while the batch is running
+
+		Parameters
+		----------
+		running : bool
+			Whether the batch is running
+		"""
+		self.startButton.setEnabled(not running)
+		self.addButton.setEnabled(not running)
+		self.removeButton.setEnabled(not running)
+		self.templateCombo.setEnabled(not running)
+		self.templateButton.setEnabled(not running)
+		self.outdirButton.setEnabled(not running)
+		self.workersLine.setEnabled(not running)
+		self.cancelButton.setEnabled(running)
+
+	def raiseError(self, message):
+		""" Creates an error box with the given message """
+		errorBox = QMessageBox.critical(self, "Error", message, QMessageBox.Ok)
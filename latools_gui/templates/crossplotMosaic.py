@@ -0,0 +1,258 @@
+""" A graph item that draws the histogram of every pair of analytes as one image, for the crossplot window """
+
+from PyQt5.QtCore import QRectF, pyqtSignal
+from PyQt5.QtGui import QImage
+import pyqtgraph as pg
+import numpy as np
+
+from collections import OrderedDict
+
+# The blank space left between cells, in image pixels
+CELL_GAP = 1
+
+# The default memory budget of a MosaicCache, in bytes
+DEFAULT_BUDGET = 128 * 1024 ** 2
+
+
+def cellImage(hist):
+	"""
+	Colours a pair's histogram in grey, scaled from its smallest to its largest count
+
+	Parameters
+	----------
+	hist : array
+		The counts of the pair, with rows for the y bins and columns for the x bins
+
+	Returns
+	----------
+	array : The (rows x columns x 4) rgba image, with the highest y bin in its first row
+	"""
+	hist = np.asarray(hist, dtype=float)
+	lo = np.nanmin(hist) if hist.size else 0
+	hi = np.nanmax(hist) if hist.size else 0
+	if hi > lo:
+		grey = np.nan_to_num((hist - lo) / (hi - lo) * 255)
+	else:
+		grey = np.zeros(hist.shape)
+
+	image = np.empty(hist.shape + (4,), dtype=np.uint8)
+	image[..., :3] = grey[..., np.newaxis].astype(np.uint8)
+	image[..., 3] = 255
+	return image[::-1]
+
+
+class CrossplotMosaic(pg.GraphicsObject):
+	"""
+	Draws the histograms of every pair of analytes in a grid, as one image, with each analyte's name on the
+	diagonal. The cell in row i and column j shows analyte i against analyte j, and covers the square from
+	(j, i) to (j + 1, i + 1), so the view showing it should have its y axis inverted.
+	"""
+
+	# Emitted with the (row, column) of a pair's cell when it is clicked
+	sigCellClicked = pyqtSignal(object)
+
+	def __init__(self):
+		super().__init__()
+		self.setAcceptHoverEvents(True)
+
+		self.analytes = []
+		self.bins = 0
+		self.labels = []
+
+		# The rgba pixels of every cell, and the image made from them when they last changed
+		self.buffer = np.zeros((0, 0, 4), dtype=np.uint8)
+		self.image = None
+		self.selected = None
+
+	def setAnalytes(self, analytes, units, bins, buffer=None):
+		"""
+		Lays out the grid for a set of analytes, and removes every histogram
+
+		Parameters
+		----------
+		analytes : [str]
+			The analytes, in the order of the rows and columns
+		units : dict
+			The unit label of each analyte
+		bins : int
+			The number of bins of each histogram, along each axis
+		buffer : array or None
+			The pixels of a mosaic drawn earlier for the same analytes and bins, which are shown instead of
+			blank cells. The cells set from then on are drawn into it.
+		"""
+		self.analytes = list(analytes)
+		self.bins = bins
+		self.selected = None
+
+		size = len(self.analytes) * (bins + CELL_GAP)
+		if buffer is None or buffer.shape[:2] != (size, size):
+			buffer = np.zeros((size, size, 4), dtype=np.uint8)
+		self.buffer = buffer
+		self.image = None
+
+		for label in self.labels:
+			label.setParentItem(None)
+			if label.scene() is not None:
+				label.scene().removeItem(label)
+		self.labels = []
+		for n, a in enumerate(self.analytes):
+			unit = units.get(a, '')
+			unit = unit.replace("$^{", "<sup>")
+			unit = unit.replace("}$", "</sup>")
+			unit = unit.replace("$\\mu$", "&mu;")
+
+			label = pg.TextItem(anchor=(0.5, 0.5), html='<div style="text-align: center"><span style="color: #000;">%(txt)s</span></div>'%{"txt": a + '<br />' + unit})
+			label.setParentItem(self)
+			label.setPos(n + 0.5, n + 0.5)
+			self.labels.append(label)
+
+		self.prepareGeometryChange()
+		self.update()
+
+	def setCell(self, row, col, hist):
+		"""
+		Draws the histogram of a pair into its cell
+
+		Parameters
+		----------
+		row : int
+			The index of the pair's y analyte
+		col : int
+			The index of the pair's x analyte
+		hist : array
+			The counts of the pair, with rows for the y bins and columns for the x bins
+		"""
+		step = self.bins + CELL_GAP
+		self.buffer[row * step:row * step + self.bins, col * step:col * step + self.bins] = cellImage(hist)
+		self.image = None
+		self.update()
+
+	def cellAt(self, pos):
+		"""
+		Finds the pair under a point
+
+		Parameters
+		----------
+		pos : QPointF
+			The point, in the coordinates of this item
+
+		Returns
+		----------
+		(int, int) or None : The (row, column) of the pair, or None if the point isn't over a pair
+		"""
+		n = len(self.analytes)
+		if pos.x() < 0 or pos.y() < 0:
+			return None
+		row, col = int(pos.y()), int(pos.x())
+		if row >= n or col >= n or row == col:
+			return None
+		return row, col
+
+	def pairName(self, cell):
+		""" Describes the pair in a cell, as 'y vs x' """
+		row, col = cell
+		return '{} vs {}'.format(self.analytes[row], self.analytes[col])
+
+	def setSelected(self, cell):
+		""" Outlines a cell, or no cell if it is None """
+		self.selected = cell
+		self.update()
+
+	def hoverEvent(self, ev):
+		""" Names the pair under the cursor in a tooltip """
+		if ev.isExit():
+			self.setToolTip('')
+			return
+		cell = self.cellAt(ev.pos())
+		self.setToolTip('' if cell is None else self.pairName(cell))
+
+	def mouseClickEvent(self, ev):
+		cell = self.cellAt(ev.pos())
+		if cell is None:
+			return
+		ev.accept()
+		self.setSelected(cell)
+		self.sigCellClicked.emit(cell)
+
+	def boundingRect(self):
+		n = len(self.analytes)
+		return QRectF(0, 0, n, n)
+
+	def paint(self, painter, *args):
+		n = len(self.analytes)
+		if n == 0:
+			return
+
+		# The image is only remade from the pixels after they have changed
+		if self.image is None:
+			height, width = self.buffer.shape[:2]
+			self.image = QImage(np.ascontiguousarray(self.buffer).data, width, height, width * 4,
+								QImage.Format_RGBA8888).copy()
+		painter.drawImage(QRectF(0, 0, n, n), self.image)
+
+		if self.selected is not None:
+			row, col = self.selected
+			painter.setPen(pg.mkPen('r', width=2))
+			painter.setBrush(pg.mkBrush(None))
+			painter.drawRect(QRectF(col, row, 1, 1))
+
+
+class MosaicCache:
+	"""
+	The pixels of the most recently shown mosaics, within a memory budget and an optional number of mosaics.
+	A dropped mosaic is drawn again from its histograms when it is next shown.
+	"""
+
+	def __init__(self, budget=DEFAULT_BUDGET, maxEntries=None):
+		"""
+		Creates an empty cache
+
+		Parameters
+		----------
+		budget : int
+			The most memory the cache keeps, in bytes. The most recently used mosaic is always kept.
+		maxEntries : int or None
+			The most mosaics the cache keeps, or None for no limit
+		"""
+		self.budget = budget
+		self.maxEntries = maxEntries
+		self.entries = OrderedDict()
+
+	def __contains__(self, key):
+		return key in self.entries
+
+	def __len__(self):
+		return len(self.entries)
+
+	def get(self, key):
+		"""
+		Gets the pixels of a mosaic, marking it as the most recently used
+
+		Returns
+		----------
+		np.ndarray or None : The pixels, or None if the mosaic isn't cached
+		"""
+		buffer = self.entries.get(key)
+		if buffer is not None:
+			self.entries.move_to_end(key)
+		return buffer
+
+	def add(self, key, buffer):
+		""" Caches the pixels of a mosaic, dropping the least recently used mosaics if the cache is full """
+		self.entries[key] = buffer
+		self.entries.move_to_end(key)
+		self.trim()
+
+	def nbytes(self):
+		""" Returns the memory used by the cached mosaics, in bytes """
+		return sum(buffer.nbytes for buffer in self.entries.values())
+
+	def trim(self):
+		""" Drops the least recently used mosaics until the cache is within its budget """
+		while len(self.entries) > 1 and (self.nbytes() > self.budget or
+										 (self.maxEntries is not None and len(self.entries) > self.maxEntries)):
+			self.entries.popitem(last=False)
+
+	def clear(self):
+		""" Drops every mosaic """
+		self.entries.clear()
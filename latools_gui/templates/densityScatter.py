@@ -0,0 +1,177 @@
+""" A graph item that draws a large number of points as a density image, such as the raw background points """
+
+from PyQt5.QtCore import QRectF
+from PyQt5.QtGui import QImage
+import pyqtgraph as pg
+import numpy as np
+
+# When fewer points than this are near the view, they are drawn individually instead of as an image
+POINT_LIMIT = 20000
+
+# The width and height of each bin of the image, in pixels
+BIN_PIXELS = 2
+
+# Bins that hold any points are drawn at least this opaque, so that single points stay visible
+MIN_ALPHA = 0.15
+
+
+class DensityScatter(pg.GraphicsObject):
+	"""
+	Draws points binned by x and y into an image, coloured by how many points fall in each bin. When the view
+	is zoomed in far enough that only a few points are near it, the points are drawn individually instead.
+
+	The image covers the view and half of its size again on each side, so it is only remade when the view
+	moves out of it, or is zoomed.
+	"""
+
+	def __init__(self, colour, size=3):
+		"""
+		Parameters
+		----------
+		colour : [int]
+			The rgba colour of the points. The alpha is the opacity of the densest bin.
+		size : int
+			The size of the individual points, in pixels
+		"""
+		super().__init__()
+		self.colour = pg.mkColor(*colour)
+
+		self.points = pg.ScatterPlotItem(pen=None, brush=pg.mkBrush(self.colour), size=size)
+		self.points.setParentItem(self)
+
+		# The points, sorted by x, with any that can't be drawn removed
+		self.x = np.zeros(0)
+		self.y = np.zeros(0)
+		self.bounds = None
+
+		# The image, the area it covers, and the size of a pixel when it was made
+		self.image = None
+		self.imageRect = None
+		self.drawnRect = None
+		self.drawnPixel = None
+
+	def setData(self, x, y):
+		"""
+		Replaces the points
+
+		Parameters
+		----------
+		x : array_like
+			The x value of each point
+		y : array_like
+			The y value of each point
+		"""
+		x = np.asarray(x, dtype=float)
+		y = np.asarray(y, dtype=float)
+		finite = np.isfinite(x) & np.isfinite(y)
+		x = x[finite]
+		y = y[finite]
+
+		# The points are sorted, so the ones near the view can be found without checking every one
+		if np.any(np.diff(x) < 0):
+			order = np.argsort(x, kind='stable')
+			x = x[order]
+			y = y[order]
+		self.x = x
+		self.y = y
+
+		if len(x) > 0:
+			self.bounds = QRectF(x[0], y.min(), x[-1] - x[0], y.max() - y.min())
+		else:
+			self.bounds = None
+
+		self.drawnRect = None
+		self.prepareGeometryChange()
+		self.updateView()
+
+	def viewRangeChanged(self):
+		self.updateView()
+
+	def updateView(self):
+		""" Remakes the image, or the individual points, if the view has moved out of them or been zoomed """
+		view = self.viewRect()
+		if view is None:
+			return
+
+		pixel = (self.pixelWidth(), self.pixelHeight())
+		if self.drawnRect is not None and self.drawnRect.contains(view) and self.drawnPixel is not None:
+			# A change in zoom of less than a quarter doesn't change the image enough to be seen
+			ratios = [p / d for p, d in zip(pixel, self.drawnPixel) if d > 0]
+			if all(0.8 < r < 1.25 for r in ratios):
+				return
+
+		rect = view.adjusted(-view.width() / 2, -view.height() / 2, view.width() / 2, view.height() / 2)
+		self.drawnRect = rect
+		self.drawnPixel = pixel
+
+		start, end = np.searchsorted(self.x, [rect.left(), rect.right()])
+		x = self.x[start:end]
+		y = self.y[start:end]
+		near = (y >= rect.top()) & (y <= rect.bottom())
+
+		if np.count_nonzero(near) <= POINT_LIMIT:
+			self.image = None
+			self.points.setData(x[near], y[near])
+			self.points.show()
+		else:
+			self.points.hide()
+			self.points.setData([], [])
+			self.makeImage(x[near], y[near], rect, pixel)
+		self.update()
+
+	def makeImage(self, x, y, rect, pixel):
+		"""
+		Bins points into an image that covers an area of the view
+
+		Parameters
+		----------
+		x : array
+			The x value of each point inside the area
+		y : array
+			The y value of each point inside the area
+		rect : QRectF
+			The area covered by the image
+		pixel : (float, float)
+			The width and height of a screen pixel
+		"""
+		if pixel[0] > 0 and pixel[1] > 0:
+			nx = int(rect.width() / (pixel[0] * BIN_PIXELS))
+			ny = int(rect.height() / (pixel[1] * BIN_PIXELS))
+		else:
+			nx, ny = 500, 200
+		nx = min(max(nx, 1), 4000)
+		ny = min(max(ny, 1), 4000)
+
+		ix = np.clip(((x - rect.left()) / rect.width() * nx).astype(int), 0, nx - 1)
+		iy = np.clip(((y - rect.top()) / rect.height() * ny).astype(int), 0, ny - 1)
+		counts = np.bincount(iy * nx + ix, minlength=nx * ny).reshape(ny, nx)
+
+		# The opacity follows the log of the count, so sparse bins aren't lost next to the densest ones
+		alpha = np.log1p(counts) / np.log1p(counts.max())
+		alpha[counts > 0] = np.maximum(alpha[counts > 0], MIN_ALPHA)
+
+		rgba = np.empty((ny, nx, 4), dtype=np.uint8)
+		rgba[..., 0] = self.colour.red()
+		rgba[..., 1] = self.colour.green()
+		rgba[..., 2] = self.colour.blue()
+		rgba[..., 3] = (alpha * self.colour.alpha()).astype(np.uint8)
+
+		# The first row of the image is at the lowest y value of the area
+		self.image = QImage(rgba.data, nx, ny, nx * 4, QImage.Format_RGBA8888).copy()
+		self.imageRect = rect
+
+	def dataBounds(self, ax, frac=1.0, orthoRange=None):
+		if self.bounds is None:
+			return None, None
+		if ax == 0:
+			return self.bounds.left(), self.bounds.right()
+		return self.bounds.top(), self.bounds.bottom()
+
+	def boundingRect(self):
+		if self.bounds is None:
+			return QRectF()
+		return QRectF(self.bounds)
+
+	def paint(self, painter, *args):
+		if self.image is not None:
+			painter.drawImage(self.imageRect, self.image)
@@ -644,6 +644,9 @@ class FilterTab:
 		# We create a checkbox row object and add it to the list
 		self.checkBoxes.append(AnalyteCheckBoxes(name, self, self.summaryTab))
 
+		# The filters are recorded so that they are marked out of date if an earlier stage changes
+		self.project.stageApplied("filtering", {})
+
 	def deleteClick(self):
 		""" What happens when the delete filter button is pressed """
 
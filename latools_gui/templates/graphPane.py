@@ -13,6 +13,20 @@ import uncertainties.unumpy as un
 import matplotlib.pyplot as plt
 from functools import partial
 
+from project.decimation import DEFAULT_PIXELS
+from project import parallelProcessing
+from project import crossplotEngine
+from project.crossplotBuilder import CrossplotBuilder
+from project.traceCache import TraceCache
+from project.tracePrefetcher import TracePrefetcher
+from templates.multiCurveItem import MultiCurveItem
+from templates.regionOverlay import RegionOverlay
+from templates.densityScatter import DensityScatter
+from templates.sampleOverlay import SampleOverlay
+from templates.crossplotMosaic import CrossplotMosaic, MosaicCache
+from templates.sampleList import SampleListModel, SampleList
+from templates.analyteLegend import AnalyteModel, AnalyteLegend
+
 class GraphPane():
 	"""
 	The lower section of the stage screens that displays the graphs produced by the stage controls.
@@ -44,11 +58,16 @@ class GraphPane():
 		self.graphMainLayout.addLayout(self.graphLayout)
 
 		# GRAPH
+		# The graph windows all list the project's samples from the one model
+		self.sampleModel = SampleListModel()
+		# The analytes shown by the graphs, and included in exports, are checked in the one model
+		self.analyteModel = AnalyteModel()
+
 		# The project object is sent to the GraphWindow object
-		self.graph = MainGraph(project)
-		self.bkgGraph = BkgGraph(project)
-		self.caliGraph = CaliGraph(project)
-		self.crossPlot = Crossplot(project)
+		self.graph = MainGraph(project, sampleModel=self.sampleModel, analyteModel=self.analyteModel)
+		self.bkgGraph = BkgGraph(project, sampleModel=self.sampleModel, analyteModel=self.analyteModel)
+		self.caliGraph = CaliGraph(project, analyteModel=self.analyteModel)
+		self.crossPlot = Crossplot(project, sampleModel=self.sampleModel)
 
 		#  We add the graph to the pane and set minimum dimensions
 		self.graphLayout.addWidget(self.graph)
@@ -87,6 +106,9 @@ class GraphPane():
 			self.graph.initialiseGraph()
 			self.bkgGraph.initialiseGraph()
 			self.crossPlot.initialiseGraph()
+		else:
+			# A stage may have changed the data without changing the focus stage, so the crossplots are made again
+			self.crossPlot.dataChanged()
 		self.graph.updateFocus(showRanges)
 		self.graph.hideInternalStandard()
 		self.graph.autorange()
@@ -109,7 +131,7 @@ class GraphPane():
 
 
 class GraphWindow(QWidget):
-	def __init__(self, project):
+	def __init__(self, project, sampleModel=None, analyteModel=None):
 		"""	Initialises an empty PyQtGraph plot, containers for all graph settings, a new window button
 		that is initially hidden till data is set
 
@@ -118,10 +140,23 @@ class GraphWindow(QWidget):
 		project : RunningProject
 			This object contains all of the information unique to the current project.
 			The stages update the project object and the graph displays its current state.
+		sampleModel : SampleListModel
+			The samples shared by the graph windows. If None, the window keeps its own.
+		analyteModel : AnalyteModel
+			The analytes shared by the graph windows and exports. If None, the window keeps its own.
 
 		"""
 		super().__init__()
 		self.project = project
+		if sampleModel is None:
+			sampleModel = SampleListModel()
+		self.sampleModel = sampleModel
+		if analyteModel is None:
+			analyteModel = AnalyteModel()
+		self.analyteModel = analyteModel
+
+		# The graph is updated once for each change to the checked analytes, however many change
+		self.analyteModel.checkedChanged.connect(self.legendChanged)
 		self.sampleName = ""	
 		self.graph = None
 		self.highlightedAnalytes = []
@@ -129,8 +164,7 @@ class GraphWindow(QWidget):
 		self.populated = False
 		
 
-		# dicts for storing {analyte: checkbox pairs, analyte: pg.PlotDataItem pairs}
-		self.legendEntries = {}
+		# dicts for storing {analyte: pg.PlotDataItem pairs}
 		self.filts = {}
 		self.graphLines = {}
 		self.graphErrorbars = {}
@@ -164,9 +198,14 @@ class GraphWindow(QWidget):
 		return rgba
 		#return 'rgba(' + ','.join(srgba) + ')'
 
-	def initialiseSamples(self):
+	def initialiseSamples(self, extras=()):
 		"""
 			Add list of samples to the layout
+
+			Parameters
+			----------
+			extras : [String]
+				Entries listed before the samples, such as "ALL"
 		"""
 
 		samples = QWidget()
@@ -176,10 +215,10 @@ class GraphWindow(QWidget):
 
 		self.samplesLayout = samplesLayout
 
-		# Add List widget
-		sampleList = QListWidget()
+		# Add List widget, which shows the shared samples that match its search
+		sampleList = SampleList(self.sampleModel, extras)
 		sampleList.setMaximumWidth(100)
-		sampleList.itemSelectionChanged.connect(self.swapSample)
+		sampleList.sampleChanged.connect(self.swapSample)
 		samplesLayout.addWidget(sampleList)
 
 		self.sampleList = sampleList
@@ -213,6 +252,18 @@ class GraphWindow(QWidget):
 	def updateLogScale(self):
 		pass
 
+	# to be implemented in child classes
+	def legendChanged(self, analytes):
+		"""
+			Shows or hides the analytes whose legend entries have been checked or unchecked
+
+			Parameters
+			----------
+			analytes : [String]
+				The analytes that changed
+		"""
+		pass
+
 	def initialiseLegend(self):
 		"""
 			Generate default legend wigets and adds it to the graph layout
@@ -222,28 +273,16 @@ class GraphWindow(QWidget):
 		settingLayout = QGridLayout()
 		setting.setLayout(settingLayout)
 
-		# Add legend widget to the settings
-
-		scroll = QScrollArea()
-		scroll.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
-		scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-		scroll.setWidgetResizable(False)
-
-		self.scroll = scroll
-
-		legend = QWidget()
-		legendLayout = QVBoxLayout()
-		legendLayout.setAlignment(Qt.AlignTop)
-		legend.setLayout(legendLayout)
+		# Add legend widget to the settings, which shows the shared analytes
+		legend = AnalyteLegend(self.analyteModel)
 		legend.setMinimumWidth(150)
 
 		self.legend = legend
-		self.legendLayout = legendLayout
 
-		settingLayout.addWidget(scroll, 0, 0, 1, 2)
+		settingLayout.addWidget(legend, 0, 0, 1, 2)
 
 		toggleButton = QPushButton('Toggle Legend Items')
-		toggleButton.clicked.connect(self.toggleLegendItems)
+		toggleButton.clicked.connect(self.analyteModel.toggleAll)
 		settingLayout.addWidget(toggleButton, 1, 0, 1, 2)
 
 		self.save_current = QPushButton("Save plot")
@@ -266,11 +305,8 @@ class GraphWindow(QWidget):
 		"""
 		if self.project.eg is not None:
 
-			# We make a list of analytes to include based on the checkboxes
-			analyte_list = []
-			for item in range(self.legendLayout.count()):
-				if self.legendLayout.itemAt(item).widget().isChecked():
-					analyte_list.append(self.legendLayout.itemAt(item).widget().text())
+			# We make a list of analytes to include based on the legend
+			analyte_list = self.analyteModel.checkedAnalytes()
 
 			# We find the reports folder created on import to use as a default location for the save dialogue
 			reports_folder = self.project.dataLocation
@@ -285,7 +321,7 @@ class GraphWindow(QWidget):
 
 			try:
 				self.project.eg.trace_plots(analytes=analyte_list,
-											samples=self.sampleList.currentItem().text(),
+											samples=self.sampleList.currentSample(),
 											focus=self.project.eg.focus_stage,
 											outdir=self.fileLocation,
 											subset=None)
@@ -303,11 +339,8 @@ class GraphWindow(QWidget):
 		"""
 		if self.project.eg is not None:
 
-			# We make a list of analytes to include based on the checkboxes
-			analyte_list = []
-			for item in range(self.legendLayout.count()):
-				if self.legendLayout.itemAt(item).widget().isChecked():
-					analyte_list.append(self.legendLayout.itemAt(item).widget().text())
+			# We make a list of analytes to include based on the legend
+			analyte_list = self.analyteModel.checkedAnalytes()
 
 			# We find the reports folder created on import to use as a default location for the save dialogue
 			reports_folder = self.project.dataLocation
@@ -320,17 +353,31 @@ class GraphWindow(QWidget):
 			if fileLocation == "":
 				return
 
-			try:
-				self.project.eg.trace_plots(analytes=analyte_list,
-											focus=self.project.eg.focus_stage,
-											outdir=fileLocation)
-				infoBox = QMessageBox.information(self.legend, "Export",
-												  "The current data plots have been saved as pdfs in the folder.",
-												  QMessageBox.Ok)
-			except:
-				infoBox = QMessageBox.information(self.legend, "Export",
-												  "Encountered an error when attempting to export the plots.",
-												  QMessageBox.Ok)
+			# The plots are drawn across a pool of processes on the stage runner's worker thread, so the progress
+			# bar shows each sample as it is saved and the export can be cancelled
+			self.project.stageRunner.run("trace_plots",
+										 partial(parallelProcessing.tracePlots, self.project.eg,
+												 analytes=analyte_list,
+												 focus=self.project.eg.focus_stage,
+												 outdir=fileLocation),
+										 self.saveAllFinished,
+										 self.saveAllFailed)
+
+	def saveAllFinished(self, result=None):
+		"""
+			Lets the user know that every plot has been saved
+		"""
+		infoBox = QMessageBox.information(self.legend, "Export",
+										  "The current data plots have been saved as pdfs in the folder.",
+										  QMessageBox.Ok)
+
+	def saveAllFailed(self, error):
+		"""
+			Lets the user know that the plots could not all be saved
+		"""
+		infoBox = QMessageBox.information(self.legend, "Export",
+										  "Encountered an error when attempting to export the plots.",
+										  QMessageBox.Ok)
 
 	# populate sample list
 	def populateSamples(self):
@@ -341,63 +388,38 @@ class GraphWindow(QWidget):
 		samples = self.project.eg.samples
 		self.sampleName = samples[0]
 
-		self.sampleList.clear()
-		for sample in samples:
-			self.sampleList.addItem(sample)
+		# The samples are shared by every graph window, so they are only replaced when they have changed
+		if self.sampleModel.samples != list(samples):
+			self.sampleModel.setSamples(samples)
 
 	# populate legend check-boxes
 	def populateLegend(self):
 		"""
 			Populate legend with all analytes
 		"""
-		# clear legend Entries
-		for i in reversed(range(self.legendLayout.count())):
-			self.legendLayout.itemAt(i).widget().deleteLater()
-
-
-		for analyte in self.project.eg.analytes:
-			# Create legend entry for the element and add it to the legend widget
-			legendEntry = QCheckBox()
-			legendEntry.setChecked(True)
-			legendEntry.setText(analyte)
-			legendEntry.setStyleSheet("color: {:s}".format(self.project.eg.cmaps[analyte]))
-			legendEntry.stateChanged.connect(partial(self.legendStateChange, legendEntry.text()))
-			# record identity of check box in dict
-			self.legendEntries[analyte] = legendEntry
-			# add to layout
-			self.legendLayout.addWidget(legendEntry)
-
-		self.scroll.setWidget(self.legend)
+		# The analytes are shared by every graph window, so they are only replaced when they have changed.
+		# Otherwise the graph is brought in line with the analytes that are already checked.
+		eg = self.project.eg
+		if self.analyteModel.analytes != list(eg.analytes) or self.analyteModel.colours != dict(eg.cmaps):
+			self.analyteModel.setAnalytes(eg.analytes, eg.cmaps)
 
 	def hideInternalStandard(self):
 		"""
 			Hides the analyte set as the internal standard from line graphs, and the legend
 		"""
 		if self.currentInternalStandard != None:
-			self.legendEntries[self.currentInternalStandard].show()
-			self.graphLines[self.currentInternalStandard].show()
+			self.legend.setAnalyteHidden(self.currentInternalStandard, False)
+			self.graphLines[self.currentInternalStandard].setVisible(self.analyteModel.isChecked(self.currentInternalStandard))
 		analyte = self.project.eg.internal_standard
 		self.currentInternalStandard = analyte
 		if self.focusStage not in ['rawdata', 'despiked', 'bkgsub']:
-			self.legendEntries[analyte].hide()
+			self.legend.setAnalyteHidden(analyte, True)
 			self.graphLines[analyte].hide()
 			if analyte in self.filts:
 				self.filts[analyte].hide()
 		else:
-			self.legendEntries[analyte].show()
-			self.graphLines[analyte].show()
-
-	def toggleLegendItems(self):
-		"""
-			Checks/unchecks all legend analytes
-		"""
-		for item in reversed(range(self.legendLayout.count())):
-			if self.legendLayout.itemAt(item).widget().isChecked():
-				self.legendLayout.itemAt(item).widget().setChecked(False)
-			else:
-				self.legendLayout.itemAt(item).widget().setChecked(True)
-				if self.legendLayout.itemAt(item).widget().text() == self.currentInternalStandard:
-					self.hideInternalStandard()
+			self.legend.setAnalyteHidden(analyte, False)
+			self.graphLines[analyte].setVisible(self.analyteModel.isChecked(analyte))
 
 	def showGraph(self):
 		"""
@@ -407,12 +429,12 @@ class GraphWindow(QWidget):
 
 
 class AnalyteGridGraph(GraphWindow):
-	def __init__(self, project):
+	def __init__(self, project, sampleModel=None, analyteModel=None):
 			"""	
 				Parent class for graphs that have a grid of graph, one for each analyte.
 
 			"""
-			super().__init__(project)
+			super().__init__(project, sampleModel, analyteModel)
 			self.grids = {}
 			self.cells = {}
 
@@ -423,10 +445,9 @@ class MainGraph(GraphWindow):
 		Widget that contains a PyQtGraph plot, and all the settings that control it.
 
 	"""
-	def __init__(self, project):
-		super().__init__(project)
+	def __init__(self, project, sampleModel=None, analyteModel=None):
+		super().__init__(project, sampleModel, analyteModel)
 		self.showRanges = False
-		self.ranges = []
 		self.graphWins = []
 
 		# By default the focus stage is 'rawdata'
@@ -434,6 +455,19 @@ class MainGraph(GraphWindow):
 		self.filtering = False
 		self.calibrated = False
 
+		# Each trace is drawn from a min/max pyramid, so that only about two points per pixel are drawn.
+		# The unpacked traces and pyramids of recently viewed samples are kept, so that switching samples is quick.
+		self.traceCache = TraceCache()
+		# The samples either side of the current sample are prepared in the background. Stage calls change the
+		# data being read, so prefetching stops whenever one starts, and the stage call waits for the sample
+		# being read to finish.
+		self.prefetcher = TracePrefetcher(self.traceCache)
+		self.project.stageRunner.started.connect(self.prefetcher.cancel)
+		self.project.stageRunner.addReader(self.prefetcher.pool)
+		# The pyramids of the lines that are currently drawn, and of the greyed out filtered lines
+		self.traces = {}
+		self.filtTraces = {}
+
 		self.initialiseSamples()
 
 		# Add plot window to the layout
@@ -445,6 +479,20 @@ class MainGraph(GraphWindow):
 		graph = pg.PlotWidget()
 		graph.hideButtons()
 
+		# The traces are redrawn at the level of detail that suits the view whenever it is panned, zoomed or resized
+		graph.getViewBox().sigXRangeChanged.connect(self.updateDetail)
+		graph.getViewBox().sigResized.connect(self.updateDetail)
+
+		# Every trace, and its greyed out filtered line, is drawn by one item.
+		# graphLines and filts hold handles to its curves.
+		self.curves = MultiCurveItem()
+		self.curves.sigClicked.connect(self.onClickLine)
+		graph.addItem(self.curves)
+
+		# The background and signal ranges found by autorange are shaded by one item, which is moved to each sample
+		self.ranges = RegionOverlay()
+		graph.addItem(self.ranges)
+
 		self.graphWins.append(graph)
 
 		self.layout.addWidget(graph, 1)
@@ -459,20 +507,21 @@ class MainGraph(GraphWindow):
 		"""
 		dat = self.project.eg.data[self.sampleName]
 
-		for key, line in self.graphLines.items():
-			for graph in self.graphWins:
-				graph.removeItem(line)
+		self.curves.clear()
+		self.graphLines = {}
+		self.filts = {}
 
+		# The greyed out lines drawn underneath when filtering are added first, so they are drawn below every trace.
+		# They are created here, and reused for every sample.
 		for analyte in dat.analytes:
-			x = dat.Time
-			y, yerr = helpers.stat_fns.unpack_uncertainties(dat.data[self.focusStage][analyte])
-			line = pg.PlotDataItem(x, y, pen=pg.mkPen(dat.cmap[analyte], width=2), label=analyte, name=analyte, connect='finite')
-			line.curve.setClickable(True)
-			line.curve.sigClicked.connect(partial(self.onClickLine, analyte))
-			self.graphLines[analyte] = line
+			self.filts[analyte] = self.curves.addCurve(("filtered", analyte),
+													   pg.mkPen(color=self.hex_2_rgba(dat.cmap[analyte], 127), width=0.6))
+			self.filts[analyte].hide()
 
-			for graph in self.graphWins:
-				graph.addItem(line)
+		# The lines' data is set by updateLines
+		for analyte in dat.analytes:
+			self.graphLines[analyte] = self.curves.addCurve(analyte, pg.mkPen(dat.cmap[analyte], width=2), clickable=True)
+			self.graphLines[analyte].setVisible(self.analyteModel.isChecked(analyte))
 	
 	# draw labels
 	def drawLabels(self):
@@ -500,6 +549,10 @@ class MainGraph(GraphWindow):
 			Draw graph for the first time
 		"""
 		self.focusStage = self.project.eg.focus_stage
+		self.prefetcher.cancel()
+		self.traceCache.clear()
+		self.traces = {}
+		self.filtTraces = {}
 
 		self.populateSamples()
 		self.populateLegend()
@@ -508,7 +561,7 @@ class MainGraph(GraphWindow):
 		self.updateLogScale()
 
 		# set sample in list - has to happen *after* lines are drawn
-		self.sampleList.setCurrentItem(self.sampleList.item(0))
+		self.sampleList.setCurrentRow(0)
 
 	def autorange(self):
 		"""
@@ -523,14 +576,14 @@ class MainGraph(GraphWindow):
 			Grabs the name of the currently selected sample and passes it to the "updateGraphs" function
 		"""
 		# sets current sample to selected sample
-		selectedSamples = self.sampleList.selectedItems()
-		if len(selectedSamples) > 0:
-			selectedSample = selectedSamples[0]
-			self.sampleName = selectedSample.text()
+		selectedSample = self.sampleList.currentSample()
+		if selectedSample is not None:
+			self.sampleName = selectedSample
 
 			self.updateLines()
 			if self.filtering:
 				self.applyFilters()
+			self.prefetchNeighbours()
 			# self.updateLogScale()
 	
 	# change between log/linear y scale
@@ -543,48 +596,87 @@ class MainGraph(GraphWindow):
 		self.updateLines()
 
 	# action when legend check-boxes are changed
-	def legendStateChange(self, analyte):
+	def legendChanged(self, analytes):
 		"""
-			Actions to perform when legend check box changes state
+			Actions to perform when legend check boxes change state
 
 			Parameters
 			----------
-			analyte : String
-				The analyte that is associated with the check-box
+			analytes : [String]
+				The analytes whose check boxes changed
 		"""
 		# change line visibility
-		self.graphLines[analyte].setVisible(self.legendEntries[analyte].isChecked())
-		if analyte in self.filts:
-			self.filts[analyte].setVisible(self.legendEntries[analyte].isChecked())
-	
+		for analyte in analytes:
+			if analyte not in self.graphLines:
+				continue
+			checked = self.analyteModel.isChecked(analyte)
+			self.graphLines[analyte].setVisible(checked)
+			if analyte in self.filts:
+				self.filts[analyte].setVisible(checked and analyte in self.filtTraces)
+
+		# The internal standard stays hidden in the stages where it is divided out
+		if self.currentInternalStandard in analytes:
+			self.hideInternalStandard()
+
+		# Hidden lines aren't redrawn when the view changes, so lines that are shown again are brought up to date
+		self.updateDetail()
+
+	def tracePyramid(self, analyte):
+		"""
+			Gets the min/max pyramid of an analyte's trace for the current sample and focus stage
+
+			Parameters
+			----------
+			analyte : String
+				The analyte of the trace
+
+			Returns
+			-------
+			MinMaxPyramid : The summarised trace, in log scale if the graph is
+		"""
+		return self.traceCache.pyramid(self.project.eg, self.sampleName, self.focusStage, analyte,
+									   self.yLogCheckBox.isChecked())
+
+	def updateDetail(self, *args):
+		"""
+			Redraws the visible lines with about two points per pixel for the current view.
+			Each bucket of samples is drawn as its minimum and maximum, so spikes are never lost.
+		"""
+		for graph in self.graphWins:
+			viewBox = graph.getViewBox()
+			xmin, xmax = viewBox.viewRange()[0]
+			pixels = int(viewBox.width())
+			if pixels <= 0:
+				pixels = DEFAULT_PIXELS
+
+			# Every curve that changes is set at once, so the item's buffer is only rebuilt once
+			data = {}
+			for lines, traces in ((self.graphLines, self.traces), (self.filts, self.filtTraces)):
+				for analyte, pyramid in traces.items():
+					if analyte in lines and lines[analyte].isVisible():
+						data[lines[analyte].key] = pyramid.select(xmin, xmax, pixels)
+			self.curves.setCurveData(data)
+
 	def updateLines(self):
 		"""
 			Update lines for new self.sampleName and/or self.focusStage
 		"""
 		dat = self.project.eg.data[self.sampleName]
-		for graph in self.graphWins:
-			# update line data for new sample
-			for analyte in dat.analytes:
-				x = dat.Time
-				y, yerr = helpers.stat_fns.unpack_uncertainties(dat.data[self.focusStage][analyte])
-				# if in log mode, transform y
-				if self.yLogCheckBox.isChecked():
-					y = np.log10(y)
-				self.graphLines[analyte].curve.setData(x=x, y=y)
-				if analyte in self.filts:
-					self.filts[analyte].hide()
-
-			# this plots the ranges after 'autorange' calculation
-			for gRange in self.ranges:
-				graph.removeItem(gRange)
-				
-			if self.showRanges:
-				for lims in dat.bkgrng:
-					self.addRegion(graph, lims, pg.mkBrush((255,0,0,25)))
-				for lims in dat.sigrng:
-					self.addRegion(graph, lims, pg.mkBrush((0,0,0,25)))
-		
-		
+
+		# update line data for new sample
+		self.filtTraces = {}
+		for analyte in dat.analytes:
+			self.traces[analyte] = self.tracePyramid(analyte)
+			if analyte in self.filts:
+				self.filts[analyte].hide()
+		self.updateDetail()
+
+		# this plots the ranges after 'autorange' calculation
+		if self.showRanges:
+			self.ranges.setRegions([(pg.mkBrush((255,0,0,25)), dat.bkgrng),
+									(pg.mkBrush((0,0,0,25)), dat.sigrng)])
+		else:
+			self.ranges.clear()
 	
 	def updateFocus(self, showRanges):
 		"""
@@ -598,9 +690,27 @@ class MainGraph(GraphWindow):
 		self.showRanges = showRanges
 		
 		self.focusStage = self.project.eg.focus_stage
+
+		# A stage has been applied, so the cached traces may be out of date
+		self.prefetcher.cancel()
+		self.traceCache.clear()
 		
 		self.updateLines()
 		self.drawLabels()
+		self.prefetchNeighbours()
+
+	def prefetchNeighbours(self):
+		"""
+			Starts preparing the traces of the samples either side of the current sample, so that they are
+			ready when the user moves through the sample list
+		"""
+		# Stage calls change the data being prefetched, so nothing is prefetched while one is running
+		if self.project.stageRunner.isBusy():
+			return
+
+		samples = self.sampleList.entries()
+		self.prefetcher.prefetch(self.project.eg, samples, self.sampleName, self.focusStage,
+								 self.yLogCheckBox.isChecked(), self.filtering)
 	
 	def onClickLine(self, analyte):
 		"""	
@@ -619,11 +729,10 @@ class MainGraph(GraphWindow):
 		if len(self.highlightedAnalytes) > 0:
 			for a in self.project.eg.analytes:
 				if a not in self.highlightedAnalytes:
-					self.graphLines[a].curve.setPen(pg.mkPen(self.project.eg.cmaps[a], width=0.5))
-					self.legendEntries[a].setStyleSheet("color: {:s}".format(self.project.eg.cmaps[a]))
+					self.graphLines[a].setPen(pg.mkPen(self.project.eg.cmaps[a], width=0.5))
 				else:
-					self.graphLines[a].curve.setPen(pg.mkPen(self.project.eg.cmaps[a], width=3))
-					self.legendEntries[a].setStyleSheet("color: white; background-color: {:s}".format(self.project.eg.cmaps[a]))
+					self.graphLines[a].setPen(pg.mkPen(self.project.eg.cmaps[a], width=3))
+			self.analyteModel.setHighlighted(self.highlightedAnalytes)
 		else:
 			self.resetColours()
 	
@@ -632,73 +741,52 @@ class MainGraph(GraphWindow):
 			Resets all graph lines and legend entries to default stylings
 		"""
 		for a in self.project.eg.analytes:
-			self.graphLines[a].curve.setPen(pg.mkPen(self.project.eg.cmaps[a], width=2))
-			self.legendEntries[a].setStyleSheet("color: {:s}".format(self.project.eg.cmaps[a]))
-
-	def addRegion(self, targetGraph, lims, brush):
-		"""
-			Adds highlight region to graph with given ranges and brush
-
-			Parameters
-			----------
-			targetGraph : pg.plotItem
-				Graph that the region is being added to
-			lims : [???]
-				The range that the region occupies
-			brush : pg.mkBrush
-				Brush that styles the region
-		"""
-		region = pg.LinearRegionItem(values=lims, brush=brush, movable=False)
-		region.lines[0].setPen(pg.mkPen((0,0,0,0)))
-		region.lines[1].setPen(pg.mkPen((0,0,0,0)))
-		self.ranges.append(region)
-		targetGraph.addItem(region)
+			self.graphLines[a].setPen(pg.mkPen(self.project.eg.cmaps[a], width=2))
+		self.analyteModel.setHighlighted([])
 
 	def applyFilters(self):
 		"""
 			Using filtering data to grey out segments of the line graph
 		"""
 		dat = self.project.eg.data[self.sampleName]
-		for graph in self.graphWins:
-			for analyte in dat.analytes:
-				x = dat.Time
-				y, yerr = helpers.stat_fns.unpack_uncertainties(dat.data[self.focusStage][analyte])
-				ind = dat.filt.grab_filt(True, analyte)
-				xf = x.copy()
-				yf = y.copy()
-				#yerrf = yerr.copy()
-				#print(any(~ind))
-				if any(~ind):
-					xf[~ind] = np.nan
-					yf[~ind] = np.nan
-					#yerrf[~ind] = np.nan
-				
-				self.graphLines[analyte].setData(xf, yf)
-				if analyte in self.filts:
-					self.filts[analyte].setData(x, y)
-					self.filts[analyte].show()
-				elif self.filtering and any(~ind):
-					line = pg.PlotDataItem(x,
-					y,
-					pen=pg.mkPen(color=self.hex_2_rgba(self.project.eg.cmaps[analyte], 127), width=0.6), connect='finite')
-					graph.addItem(line)
-					self.filts[analyte] = line
-			self.hideInternalStandard()
+		logScale = self.yLogCheckBox.isChecked()
+
+		# The masks of every analyte are made together, and kept with the sample until its filters change
+		traces = self.traceCache.get(self.project.eg, self.sampleName, self.focusStage)
+		for analyte in dat.analytes:
+			ind, self.traces[analyte] = traces.filtered(dat, analyte, logScale)
+
+			# The full line is drawn greyed out underneath, where anything is filtered out
+			if ind.all():
+				self.filts[analyte].hide()
+			else:
+				self.filtTraces[analyte] = self.tracePyramid(analyte)
+				self.filts[analyte].setVisible(self.analyteModel.isChecked(analyte))
+		self.hideInternalStandard()
+		self.updateDetail()
 		
 class BkgGraph(GraphWindow):
 	"""
 		Openable window from the Background Subtraction stage. Graphs background subtraction data between all samples
 	"""
-	def __init__(self, project, err='stderr'):
-		super().__init__(project)
-		self.bkgSamplelines = {}
-		self.highlightRegions = {}
+	def __init__(self, project, err='stderr', sampleModel=None, analyteModel=None):
+		super().__init__(project, sampleModel, analyteModel)
+
+		# The start of every sample, and the span of the selected one, are drawn by one item
+		self.sampleOverlay = SampleOverlay()
+
+		# The scatter, line and fill of each analyte, the edges of each fill, and the data points of
+		# each analyte, for the linear (False) and log (True) scales
+		self.graphItems = {}
+		self.fillCurves = {}
+		self.datapoints = {}
+		self.bkgTime = None
 		self.err = err
 		
 		self.setWindowTitle("LAtools bkg Plot")
 
-		# Initialise samples menu
-		self.initialiseSamples()
+		# Initialise samples menu, with an entry for highlighting no sample
+		self.initialiseSamples(extras=["NONE"])
 
 		# Create graph
 		graph = pg.PlotWidget()
@@ -722,7 +810,8 @@ class BkgGraph(GraphWindow):
 
 	def getDatapoints(self, dat, analyte):
 		"""
-			Retrieve data points from LaTools Data object
+			Retrieve data points from LaTools Data object, for the current y scale. The linear and log data
+			of each analyte are only worked out once, and are kept until the background is recalculated.
 
 			Parameters
 			----------
@@ -730,119 +819,149 @@ class BkgGraph(GraphWindow):
 				LaTools analyse object
 			analyte : String
 				The analyte being considered for background data points
+
+			Returns
+			----------
+			[array] : The raw background points, and the time, mean, lower and upper error of the
+				calculated background
 		"""
-		sy = dat.bkg['raw'].loc[:, analyte]
+		logScale = self.yLogCheckBox.isChecked()
+		cached = self.datapoints.setdefault(analyte, {})
 
-		x = dat.bkg['calc']['uTime']
-		y = dat.bkg['calc'][analyte]['mean']
-		yl = dat.bkg['calc'][analyte]['mean'] - dat.bkg['calc'][analyte][self.err]
-		yu = dat.bkg['calc'][analyte]['mean'] + dat.bkg['calc'][analyte][self.err]
+		if False not in cached:
+			sy = np.asarray(dat.bkg['raw'].loc[:, analyte], dtype=float)
 
-		if self.yLogCheckBox.isChecked():
-			sy = np.log10(sy)
-			#x = np.log10(x)
-			#y = np.log10(y)
-			yl = np.log10(yl)
-			yu = np.log10(yu)
+			x = np.asarray(dat.bkg['calc']['uTime'], dtype=float)
+			y = np.asarray(dat.bkg['calc'][analyte]['mean'], dtype=float)
+			yl = y - dat.bkg['calc'][analyte][self.err]
+			yu = y + dat.bkg['calc'][analyte][self.err]
 
-		return [sy, x, y, yl, yu]
+			cached[False] = [sy, x, y, yl, yu]
+
+		if logScale and True not in cached:
+			sy, x, y, yl, yu = cached[False]
+			# The line is drawn in the graph's log mode, which takes the log itself
+			with np.errstate(divide='ignore', invalid='ignore'):
+				cached[True] = [np.log10(sy), x, y, np.log10(yl), np.log10(yu)]
+
+		return cached[logScale]
 
 	def populateGraph(self):
 		"""
 			Processes subtraction data and populates the graph with the processed data
 		"""
 		dat = self.project.eg
+
+		# Any items from a previous project are removed, so there is only ever one set
+		self.graph.clear()
+		self.graphScatters = {}
+		self.graphLines = {}
+		self.graphFills = {}
+		self.fillCurves = {}
+		self.graphItems = {}
+		self.datapoints = {}
+
+		self.bkgTime = np.asarray(dat.bkg['raw'].uTime, dtype=float)
 		for analyte in self.project.eg.analytes:
 			datapoints = self.getDatapoints(dat, analyte)
 
 			# Add items to graph
 
-			scatter = pg.ScatterPlotItem(dat.bkg['raw'].uTime, datapoints[0], pen=None, brush=pg.mkBrush(self.hex_2_rgba(dat.cmaps[analyte], 127)), size=3)
+			# The raw points are drawn as a density image, until the view is zoomed in on only a few of them
+			scatter = DensityScatter(self.hex_2_rgba(dat.cmaps[analyte], 127), size=3)
+			scatter.setData(self.bkgTime, datapoints[0])
 			self.graphScatters[analyte] = scatter
 
 			line = pg.PlotDataItem(datapoints[1], datapoints[2], pen=pg.mkPen(dat.cmaps[analyte], width=2), label=analyte, name=analyte, connect='finite')
 			self.graphLines[analyte] = line
 
-			fill = pg.FillBetweenItem(pg.PlotDataItem(datapoints[1], datapoints[3], pen=pg.mkPen(0,0,0,0)), pg.PlotDataItem(datapoints[1], datapoints[4], pen=pg.mkPen(0,0,0,0)), brush=pg.mkBrush(self.hex_2_rgba(dat.cmaps[analyte], 204)))
+			# The fill's edges are kept, so their data can be replaced when the scale changes
+			lower = pg.PlotDataItem(datapoints[1], datapoints[3], pen=pg.mkPen(0,0,0,0))
+			upper = pg.PlotDataItem(datapoints[1], datapoints[4], pen=pg.mkPen(0,0,0,0))
+			fill = pg.FillBetweenItem(lower, upper, brush=pg.mkBrush(self.hex_2_rgba(dat.cmaps[analyte], 204)))
 			self.graphFills[analyte] = fill
+			self.fillCurves[analyte] = (lower, upper)
 
-			self.graphLines[analyte] = (scatter, line, fill)
+			self.graphItems[analyte] = (scatter, line, fill)
 
 			self.graph.addItem(scatter)
 			self.graph.addItem(line)
 			self.graph.addItem(fill)
+
+			# Analytes unchecked in the shared legend start hidden
+			for item in self.graphItems[analyte]:
+				item.setVisible(self.analyteModel.isChecked(analyte))
 				
 
-		# Add/update highlighted sample regions to graph
-		for s, d in dat.data.items():
-			self.addRegion(s, self.graph, (d.uTime[0], d.uTime[-1]), pg.mkBrush((0,0,0,25)))
-			sampleLine = pg.InfiniteLine(pos=d.uTime[0], pen=pg.mkPen(color=(0,0,0,51), style=Qt.DashLine, width=2), label=s, labelOpts={'position': .999, 'anchors': ((0., 0.), (0., 0.))})
-			self.bkgSamplelines[d] = sampleLine
-			self.graph.addItem(sampleLine)
+		# Add the sample lines and highlighted sample region to graph
+		self.updateSamples()
+		self.graph.addItem(self.sampleOverlay)
 
 		self.populated = True				
-		self.sampleList.setCurrentItem(self.sampleList.item(0))
+		self.sampleList.setCurrentRow(0)
 
-	def updateData(self):
+	def setDatapoints(self):
 		"""
-			Updates the data of the graph
+			Gives every analyte's items the data points for the current y scale
 		"""
 		dat = self.project.eg
-		for analyte in self.project.eg.analytes:
+		for analyte in self.graphItems:
 			datapoints = self.getDatapoints(dat, analyte)
 
-			# Update graph data
-			self.graphScatters[analyte].setData(dat.bkg['raw'].uTime, datapoints[0])
+			self.graphScatters[analyte].setData(self.bkgTime, datapoints[0])
 			self.graphLines[analyte].setData(datapoints[1], datapoints[2])
-			self.graphFills[analyte].setCurves(pg.PlotDataItem(datapoints[1], datapoints[3], pen=pg.mkPen(0,0,0,0)), pg.PlotDataItem(datapoints[1], datapoints[4], pen=pg.mkPen(0,0,0,0)))
-		
-		# Update highlight region data
-		for s, d in dat.data.items():
-			self.highlightRegions[s].setRegion((d.uTime[0], d.uTime[-1]))
-			self.bkgSamplelines[d].setValue(d.uTime[0])
+			lower, upper = self.fillCurves[analyte]
+			lower.setData(datapoints[1], datapoints[3])
+			upper.setData(datapoints[1], datapoints[4])
 
-	# populate sample list
-	def populateSamples(self):
+	def updateData(self):
 		"""
-			Updates the list of available samples from the dataset viewable on the graph
+			Updates the data of the graph
 		"""
+		dat = self.project.eg
 
-		samples = self.project.eg.samples
-		self.sampleName = samples[0]
+		# The background has been recalculated, so the cached points are out of date
+		self.datapoints = {}
+		self.bkgTime = np.asarray(dat.bkg['raw'].uTime, dtype=float)
+		self.setDatapoints()
+		
+		self.updateSamples()
 
-		self.sampleList.clear()
-		self.sampleList.addItem("NONE")
-		for sample in samples:
-			self.sampleList.addItem(sample)
+	def updateSamples(self):
+		"""
+			Gives the sample overlay the start and end of every sample
+		"""
+		data = self.project.eg.data
+		names = list(data.keys())
+		starts = [data[s].uTime[0] for s in names]
+		ends = [data[s].uTime[-1] for s in names]
+		self.sampleOverlay.setSamples(names, starts, ends)
 
 	def swapSample(self):
 		"""
 			sets current sample to selected sample
 		"""
-		selectedSamples = self.sampleList.selectedItems()
-		if len(selectedSamples) > 0:
-			selectedSample = selectedSamples[0]
-			self.sampleName = selectedSample.text()
+		selectedSample = self.sampleList.currentSample()
+		if selectedSample is not None:
+			self.sampleName = selectedSample
 
-			for s, d in self.project.eg.data.items():
-				if self.sampleName == 'NONE' or s != self.sampleName:
-					self.highlightRegions[s].setVisible(False)
-				else:
-					self.highlightRegions[s].setVisible(True)
+			# Only the selected sample is shaded, and 'NONE' shades nothing
+			self.sampleOverlay.setHighlighted(None if self.sampleName == 'NONE' else self.sampleName)
 
 	# action when legend check-boxes are changed
-	def legendStateChange(self, analyte):
+	def legendChanged(self, analytes):
 		"""
-			Actions to perform when legend check box changes state
+			Actions to perform when legend check boxes change state
 
 			Parameters
 			----------
-			analyte : String
-				Analyte attributed to the tickbox clicked
+			analytes : [String]
+				Analytes attributed to the tickboxes clicked
 		"""
-
-		for item in self.graphLines[analyte]:
-			item.setVisible(self.legendEntries[analyte].isChecked())
+		for analyte in analytes:
+			if analyte in self.graphItems:
+				for item in self.graphItems[analyte]:
+					item.setVisible(self.analyteModel.isChecked(analyte))
 
 		box = self.graph.getViewBox()
 		box.update()
@@ -853,39 +972,21 @@ class BkgGraph(GraphWindow):
 			When log(y) checkbox is modified, update y-axis scale
 		"""
 		self.graph.setLogMode(x=False, y=self.yLogCheckBox.isChecked())
-		self.populateGraph()
-
-	def addRegion(self, name, targetGraph, lims, brush):
-		"""
-			Based of given parameters creates a region item and adds it to target graph
-
-			Parameters
-			----------
-			name : String
-				Name given to created region
-			targetGraph : pg.PlotItem
-				Graph that the region will be added to
-			lims : [???]
-				Pair of data points that are the limits of the region
-			brush : pg.mkBrush
-				Brush that defines the look of the region
-		
-		"""
-		region = pg.LinearRegionItem(values=lims, brush=brush, movable=False)
-		region.lines[0].setPen(pg.mkPen((0,0,0,0)))
-		region.lines[1].setPen(pg.mkPen((0,0,0,0)))
-		region.setVisible(False)
-		self.highlightRegions[name] = region
-		targetGraph.addItem(region)
+		if self.populated:
+			# The same items are kept, and given the points for the new scale
+			self.setDatapoints()
 
 class CaliGraph(AnalyteGridGraph):
 	"""
 		Openable window from the Calibration stage. Graphs all analytes calibrated to the internal standard
 	"""
-	def __init__(self, project, loglog=False):
-		super().__init__(project)
+	def __init__(self, project, loglog=False, analyteModel=None):
+		super().__init__(project, analyteModel=analyteModel)
 		self.loglog = loglog
 
+		# The grid cell of each analyte, which is hidden when the analyte is unchecked in the legend
+		self.analyteCells = {}
+
 		self.errPlots = {}
 		self.histPlots = {}
 		self.analyteTexts = {}
@@ -1018,6 +1119,7 @@ class CaliGraph(AnalyteGridGraph):
 				cell.addLabel('counts/counts ' + dat.internal_standard, 1, 1, colspan=2)
 
 				self.cells[(row, i)] = cell
+				self.analyteCells[analyte] = cell
 				self.graphLayout.addWidget(self.cells[(row, i)], row, i%3)
 
 				errPlot = cell.addPlot(0, 1)
@@ -1148,21 +1250,54 @@ class CaliGraph(AnalyteGridGraph):
 
 		
 		self.populated = True
+		self.legendChanged(list(self.analyteCells))
 		self.scroll.setWidget(self.graph)
 
+	def legendChanged(self, analytes):
+		"""
+			Shows the calibration of each analyte that is checked in the legend, and hides the rest
+
+			Parameters
+			----------
+			analytes : [String]
+				The analytes whose check boxes changed
+		"""
+		for analyte in analytes:
+			if analyte in self.analyteCells:
+				self.analyteCells[analyte].setVisible(self.analyteModel.isChecked(analyte))
+
 class Crossplot(AnalyteGridGraph):
-	def __init__(self, project):
-		super().__init__(project)
+	def __init__(self, project, sampleModel=None):
+		super().__init__(project, sampleModel)
 		self.lognorm = True
 		self.bins = 25
 		self.samples = None
 		self.subset = None
 		self.colourful = True
 
-		self.labels = {}
-
-		# Initialise samples menu
-		self.initialiseSamples()
+		# The histograms of recently viewed crossplots, and the drawn mosaics of the most recently shown. A mosaic
+		# dropped from grids is drawn again from its cached histograms.
+		self.histogramCache = crossplotEngine.HistogramCache()
+		self.grids = MosaicCache()
+
+		# The pairs are worked out on a worker thread, and drawn as they are done. Only the crossplot being
+		# shown is drawn.
+		self.builder = CrossplotBuilder()
+		self.builder.signals.prepared.connect(self.crossplotPrepared)
+		self.builder.signals.pairReady.connect(self.crossplotPairReady)
+		self.builder.signals.finished.connect(self.crossplotFinished)
+		self.builder.signals.failed.connect(self.crossplotFailed)
+		self.crossplotKey = None
+		self.crossplotHistograms = None
+
+		# Stage calls change the data, so no crossplot is made while one is running. A crossplot that was being
+		# made, or was asked for meanwhile, is made once the stage calls are done.
+		self.crossplotPending = False
+		self.project.stageRunner.started.connect(self.builder.cancel)
+		self.project.stageRunner.busyChanged.connect(self.runnerBusyChanged)
+
+		# Initialise samples menu, with an entry for the crossplot of every sample
+		self.initialiseSamples(extras=["ALL"])
 		self.yLogCheckBox.hide()
 		self.autorangeButton.hide()
 
@@ -1174,335 +1309,279 @@ class Crossplot(AnalyteGridGraph):
 		self.filtCheckBox = filtCheckBox
 		self.samplesLayout.addWidget(filtCheckBox)
 
+		# Names the pair that was last clicked
+		pairLabel = QLabel()
+		pairLabel.setMaximumWidth(100)
+		pairLabel.setWordWrap(True)
+		self.pairLabel = pairLabel
+		self.samplesLayout.addWidget(pairLabel)
+
 		self.setWindowTitle("LAtools Crossplot")
 
-		# Create scollable area that holds all the elements of the window
-		scrollMain = QScrollArea()
-		scrollMain.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
-		scrollMain.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
-		scrollMain.setWidgetResizable(True)
+		# Every pair is drawn into one image, in a single view
+		self.mosaic = CrossplotMosaic()
+		self.mosaic.sigCellClicked.connect(self.cellClicked)
 
-		self.scrollMain = scrollMain
+		view = pg.GraphicsView()
+		box = pg.ViewBox(lockAspect=True, invertY=True)
+		box.addItem(self.mosaic)
+		view.setCentralItem(box)
+		view.setMinimumSize(500, 500)
+		self.mosaicBox = box
 
-		self.layout.addWidget(scrollMain, 1)
+		self.graph = view
+		self.layout.addWidget(view, 1)
 
 	def initialiseGraph(self):
+		# The data may have changed, so every crossplot is made again
+		self.builder.cancel()
+		self.histogramCache.clear()
+		self.grids.clear()
 		self.populateSamples()
 
+	def dataChanged(self):
+		"""
+			Drops every crossplot made from the old data, and makes the one being shown again
+		"""
+		self.builder.cancel()
+		self.histogramCache.clear()
+		self.grids.clear()
+		if self.populated:
+			self.showCrossplot()
+
 	def startup(self):
 		"""
-			Generate holder widget to houses the various crossplots, add all samples crossplot as default
+			Add all samples crossplot as default
 		"""
-		self.sampleName = self.sampleList.item(0).text()
-		self.sampleList.setCurrentItem(self.sampleList.item(0))
+		self.sampleName = self.sampleList.entries()[0]
+		self.sampleList.setCurrentRow(0)
 		if not self.populated:
-			self.createCrossplot()
-			holder = QWidget()
-			holderLayout = QHBoxLayout(holder)
-			self.holderLayout = holderLayout
-			self.scrollMain.setWidget(holder)
-			self.graph = self.grids[self.sampleName+'False']['grid']
-			self.holderLayout.addWidget(self.graph)
 			self.populated = True
-	
-	def createCrossplot(self):
+			self.showCrossplot()
+
+	def currentKey(self):
 		"""
-			If non-existant, generate a crossplot based of the currently selected sample
+			The sample, filter state and bins of the crossplot of the selected sample
 		"""
-		key = self.sampleName+str(self.filtCheckBox.isChecked())
-		if not key in self.grids:
-			dat = self.project.eg
-			cmap = dat.cmaps
+		filt = self.filtCheckBox.isChecked()
+		return (self.sampleName, crossplotEngine.filterState(self.project.eg, self.sampleName, filt), self.bins)
 
-			# set up colour scales
-			if self.colourful:
-				cmlist = ['Blues', 'BuGn', 'BuPu', 'GnBu',
-							'Greens', 'Greys', 'Oranges', 'OrRd',
-							'PuBu', 'PuBuGn', 'PuRd', 'Purples',
-							'RdPu', 'Reds', 'YlGn', 'YlGnBu', 'YlOrBr', 'YlOrRd']
-			else:
-				cmlist = ['Greys']
+	def showCrossplot(self):
+		"""
+			Shows the crossplot of the selected sample. If it hasn't been drawn, its values are copied from the
+			analyse object, then its pairs are worked out on a worker thread and drawn as they are done. Any
+			crossplot that was being made is stopped.
+		"""
+		self.builder.cancel()
+		self.crossplotPending = False
+		key = self.currentKey()
+		self.crossplotKey = key
+		self.pairLabel.setText('')
 
-			#AnalyteObject
+		buffer = self.grids.get(key)
+		histograms = self.histogramCache.get(key)
+		self.crossplotHistograms = histograms
+		if buffer is not None and histograms is not None:
+			self.mosaic.setAnalytes(histograms.analytes, histograms.units, self.bins, buffer)
+			self.mosaicBox.autoRange(padding=0)
+			return
 
-			grid = self.initialiseGrid(key)
+		if histograms is not None:
+			# The pairs that are already done are drawn straight away
+			self.crossplotPrepared(key, histograms)
+		else:
+			self.mosaic.setAnalytes([], {}, self.bins)
 
-			if self.sampleName == "ALL":
-				self.createCrossplotAll(key, dat, cmap, cmlist, grid)
-			else:
-				self.createCrossplotDat(key, dat, cmap, cmlist, grid)
+		if self.project.stageRunner.isBusy():
+			self.crossplotPending = True
+			self.pairLabel.setText('Waiting for the stage to finish...')
+			return
+
+		if histograms is None:
+			self.pairLabel.setText('Working...')
+			prepare = partial(self.createCrossplot, key, **self.crossplotArrays(key[0], self.filtCheckBox.isChecked()))
+		else:
+			prepare = lambda: histograms
+		self.builder.build(key, prepare)
 
-	def createCrossplotAll(self, key, dat, cmap, cmlist, grid):
+	def crossplotArrays(self, sampleName, filt):
 		"""
-			Generate crossplot spanning all samples
+			Copies the values a crossplot is made from out of the analyse object, on the GUI thread, so that the
+			worker thread never reads the analyse object while a stage call might be changing it
 
 			Parameters
 			----------
-			key : String
-				Name of the created plot configuration
-			dat : la.latools.analyse
-				LaTools analyse object
-			cmap : la.latools.analyse.cmaps
-				Colour maps
-			cmlist : [String]
-				Strings that represent colours to be used
-			grid : {QWidget, QGridLayout}
-				The grid that holds the plots
-		"""
-		analytes = dat.analytes
-		if dat.focus_stage in ['ratio', 'calibrated']:
-			analytes = [a for a in analytes if dat.internal_standard not in a]
-		# sort analytes
-		try:
-			analytes = sorted(analytes, key=lambda x: float(re.findall('[0-9.-]+', x)[0]))
-		except IndexError:
-			analytes = sorted(analytes)
-
-		dat.get_focus(filt=self.filtCheckBox.isChecked(), samples=self.samples, subset=self.subset)
-
-		numvars = len(analytes)
-
-		if cmap is None and self.mode == 'scatter':
-			cmap = {k: 'k' for k in dat.analytes()}
+			sampleName : String
+				The sample of the crossplot, or "ALL" for every sample
+			filt : bool
+				Whether the crossplot is filtered
 
-		while len(cmlist) < len(analytes):
-			cmlist *= 2
-
-		# isolate nominal_values for all analytes
-		focus = {k: helpers.stat_fns.nominal_values(dat.focus[k]) for k in analytes}
-		# determine units for all analytes
-		udict = {a: helpers.helpers.unitpicker(np.nanmean(focus[a]),
-							focus_stage=dat.focus_stage,
-							denominator=dat.internal_standard) for a in analytes}
-
-		axes = np.zeros((numvars, numvars))
-		
-		for i, j in zip(*np.triu_indices_from(axes, k=1)):
-			# get analytes
-			ai = analytes[i]
-			aj = analytes[j]
-
-			# remove nan, apply multipliers
-			pi = focus[ai] * udict[ai][0]
-			pj = focus[aj] * udict[aj][0]
-
-			# draw plots
-
-			# remove nan
-			pi = pi[~np.isnan(pi)]
-			pj = pj[~np.isnan(pj)]
-			
-			h = np.histogram2d(pj, pi, self.bins, normed = self.lognorm)
-			item = pg.ImageItem(image=h[0], autoLevels=True)
-			view1 = pg.GraphicsView()
-			box = pg.ViewBox()
-			box.setMouseEnabled(False, False)
-			box.addItem(item)
-			box.setAspectLocked(False)
-			box.setRange(xRange=[0, h[0].shape[0]], yRange=[0, h[0].shape[1]])
-			view1.setCentralItem(box)
-
-			self.cells[(key, (i, j))] = box
-			
+			Returns
+			----------
+			dict : The analytes, values, masks, focus stage and internal standard of the crossplot
+		"""
+		dat = self.project.eg
+		if sampleName == "ALL":
+			analytes = self.crossplotAnalytes(dat)
+			values, masks = crossplotEngine.sessionArrays(dat, analytes, filt, samples=self.samples,
+														  subset=self.subset)
+		else:
+			sampleObj = dat.data[sampleName]
+			analytes = self.crossplotAnalytes(dat, sampleObj)
+			values, masks = crossplotEngine.sampleArrays(sampleObj, analytes, filt)
+		return {'analytes': analytes, 'values': values, 'masks': masks, 'focusStage': dat.focus_stage,
+				'internalStandard': dat.internal_standard}
 
-			h = np.histogram2d(pi, pj, self.bins, normed = self.lognorm)
-			item = pg.ImageItem(image=h[0])
-			view2 = pg.GraphicsView()
-			box = pg.ViewBox()
-			box.setMouseEnabled(False, False)
-			box.addItem(item)
-			box.setAspectLocked(False)
-			box.setRange(xRange=[0, h[0].shape[0]], yRange=[0, h[0].shape[1]])
-			view2.setCentralItem(box)
+	def createCrossplot(self, key, analytes, values, masks, focusStage, internalStandard):
+		"""
+			Gets the histograms of a crossplot, working out their units and bins if they aren't cached.
+			Called on the builder's worker thread, with values copied by crossplotArrays.
 
-			self.cells[(key, (j, i))] = box
+			Parameters
+			----------
+			key : tuple
+				The sample, filter state and bins of the crossplot
+			analytes : [String]
+				The analytes of the crossplot
+			values : np.ndarray
+				The (analytes x time) nominal values
+			masks : np.ndarray or None
+				The filter masks of the values
+			focusStage : String
+				The focus stage of the values
+			internalStandard : String
+				The internal standard of the project
+
+			Returns
+			----------
+			PairHistograms : The histograms of the crossplot
+		"""
+		histograms = self.histogramCache.get(key)
+		if histograms is None:
+			histograms = crossplotEngine.PairHistograms(analytes, values, masks, focusStage, internalStandard,
+														 self.bins)
+			self.histogramCache.add(key, histograms)
+		return histograms
 
-			grid['gridLayout'].addWidget(view1, i, j)
-			grid['gridLayout'].addWidget(view2, j, i)
+	def runnerBusyChanged(self, busy):
+		"""
+			Stops making the crossplot while stage calls run, and makes it once they are done
 
+			Parameters
+			----------
+			busy : bool
+				Whether the stage runner has started or finished its stage calls
+		"""
+		if busy:
+			self.builder.cancel()
+			if self.crossplotKey is not None and self.crossplotKey not in self.grids:
+				self.crossplotPending = True
+				self.pairLabel.setText('Waiting for the stage to finish...')
+		elif self.crossplotPending and self.populated:
+			self.showCrossplot()
 
+	def crossplotPrepared(self, key, histograms):
+		"""
+			Lays out the crossplot once its analytes and units are known, with any pairs that are already done
 
-		# diagonal labels
-		for a, n in zip(analytes, np.arange(len(analytes))):
-			a2 = udict[a][1]
-			a2 = a2.replace("$^{", "<sup>")
-			a2 = a2.replace("}$", "</sup>")
-			a2 = a2.replace("$\\mu$", "&mu;")
+			Parameters
+			----------
+			key : tuple
+				The key of the crossplot
+			histograms : PairHistograms
+				The histograms of the crossplot
+		"""
+		if key != self.crossplotKey:
+			return
+		self.crossplotHistograms = histograms
+		self.mosaic.setAnalytes(histograms.analytes, histograms.units, self.bins)
+		for i, j in histograms.computedPairs():
+			self.crossplotPairReady(key, i, j)
+		self.pairLabel.setText('')
+		self.mosaicBox.autoRange(padding=0)
 
-			item = pg.TextItem(anchor=(0.5,0.5), html='<div style="text-align: center"><span style="color: #000;font-size:8em;">%(txt)s</span></div>'%{"txt": a + '<br />' + a2})
-			view = pg.GraphicsView()
-			box = pg.ViewBox()
-			box.autoRange()
-			box.setMouseEnabled(False, False)
-			box.addItem(item)
-			item.setPos(0.5, 0.5)
-			view.setCentralItem(box)
+	def crossplotPairReady(self, key, i, j):
+		"""
+			Draws a pair, and its mirror, once its histogram is done
+		"""
+		if key != self.crossplotKey or self.crossplotHistograms is None:
+			return
+		self.mosaic.setCell(i, j, self.crossplotHistograms.pair(i, j))
+		self.mosaic.setCell(j, i, self.crossplotHistograms.pair(j, i))
 
-			self.labels[(key, n)] = item
-			self.cells[(key, (n, n))] = box
-			grid['gridLayout'].addWidget(view, n, n)
+	def crossplotFinished(self, key):
+		"""
+			Keeps the mosaic's pixels once every pair is drawn, so it is shown straight away next time
+		"""
+		if key == self.crossplotKey:
+			self.grids.add(key, self.mosaic.buffer)
 
+	def crossplotFailed(self, key, error):
+		"""
+			Lets the user know that the crossplot could not be made
+		"""
+		if key != self.crossplotKey:
+			return
+		self.pairLabel.setText('')
+		infoBox = QMessageBox.information(self, "Crossplot",
+										  "Encountered an error when making the crossplot.",
+										  QMessageBox.Ok)
 
-	def createCrossplotDat(self, key, dat, cmap, cmlist, grid):
+	def crossplotAnalytes(self, dat, sampleObj=None):
 		"""
-			Generate crossplot for the specified sample
+			The analytes of a crossplot, leaving out the internal standard once the data are ratios
 
 			Parameters
 			----------
-			key : String
-				Name of the created plot configuration
 			dat : la.latools.analyse
 				LaTools analyse object
-			cmap : la.latools.analyse.cmaps
-				Colour maps
-			cmlist : [String]
-				Strings that represent colours to be used
-			grid : {QWidget, QGridLayout}
-				The grid that holds the plots
+			sampleObj : la.latools.D or None
+				The sample of the crossplot, or None for the crossplot of every sample
+
+			Returns
+			----------
+			[str] : The analytes, in the order of the rows and columns
 		"""
-		
-		#DatObject
-		sampleObj = dat.data[self.sampleName]
-		analytes = sampleObj.analytes
+		if sampleObj is not None:
+			analytes = sampleObj.analytes
+		else:
+			analytes = dat.analytes
 		if dat.focus_stage in ['ratio', 'calibrated']:
 			analytes = [a for a in analytes if dat.internal_standard not in a]
 
-		numvars = len(analytes)
-		axes = np.zeros((numvars, numvars))
-
-		while len(cmlist) < len(analytes):
-			cmlist *= 2
-
-		udict = {}
-		for i, j in zip(*np.triu_indices_from(axes, k=1)):
-			for x, y in [(i, j), (j, i)]:
-				# set unit multipliers
-				mx, ux = helpers.helpers.unitpicker(np.nanmean(sampleObj.focus[analytes[x]]),
-									denominator=dat.internal_standard,
-									focus_stage=dat.focus_stage)
-				my, uy = helpers.helpers.unitpicker(np.nanmean(sampleObj.focus[analytes[y]]),
-									denominator=dat.internal_standard,
-									focus_stage=dat.focus_stage)
-				udict[analytes[x]] = (x, ux)
-
-				# get filter
-				ind = (sampleObj.filt.grab_filt(self.filtCheckBox.isChecked(), analytes[x]) &
-					sampleObj.filt.grab_filt(self.filtCheckBox.isChecked(), analytes[y]) &
-					~np.isnan(helpers.stat_fns.nominal_values(sampleObj.focus[analytes[x]])) &
-					~np.isnan(helpers.stat_fns.nominal_values(sampleObj.focus[analytes[y]])))
-
-				# make plot
-				pi = helpers.stat_fns.nominal_values(sampleObj.focus[analytes[x]][ind]) * mx
-				pj = helpers.stat_fns.nominal_values(sampleObj.focus[analytes[y]][ind]) * my
-
-				# draw plots
-				h = np.histogram2d(pj, pi, self.bins, normed = self.lognorm)
-				item = pg.ImageItem(image=h[0], autoLevels=True)
-				view1 = pg.GraphicsView()
-				box = pg.ViewBox()
-				box.setMouseEnabled(False, False)
-				box.addItem(item)
-				box.setAspectLocked(False)
-				box.setRange(xRange=[0, h[0].shape[0]], yRange=[0, h[0].shape[1]])
-				view1.setCentralItem(box)
-
-				self.cells[(key, (i, j))] = box
-				
+		if sampleObj is None:
+			# sort analytes
+			try:
+				analytes = sorted(analytes, key=lambda x: float(re.findall('[0-9.-]+', x)[0]))
+			except IndexError:
+				analytes = sorted(analytes)
+		return list(analytes)
 
-				h = np.histogram2d(pi, pj, self.bins, normed = self.lognorm)
-				item = pg.ImageItem(image=h[0])
-				view2 = pg.GraphicsView()
-				box = pg.ViewBox()
-				box.setMouseEnabled(False, False)
-				box.addItem(item)
-				box.setAspectLocked(False)
-				box.setRange(xRange=[0, h[0].shape[0]], yRange=[0, h[0].shape[1]])
-				view2.setCentralItem(box)
-
-				self.cells[(key, (j, i))] = box
-
-				grid['gridLayout'].addWidget(view1, i, j)
-				grid['gridLayout'].addWidget(view2, j, i)
-
-		# diagonal labels
-		for a, (i, u) in udict.items():
-			a2 = u
-			a2 = a2.replace("$^{", "<sup>")
-			a2 = a2.replace("}$", "</sup>")
-			a2 = a2.replace("$\\mu$", "&mu;")
-
-			item = pg.TextItem(anchor=(0.5,0.5), html='<div style="text-align: center"><span style="color: #000;font-size:8em;">%(txt)s</span></div>'%{"txt": a + '<br />' + a2})
-			view = pg.GraphicsView()
-			box = pg.ViewBox()
-			box.autoRange()
-			box.setMouseEnabled(False, False)
-			box.addItem(item)
-			item.setPos(0.5, 0.5)
-			view.setCentralItem(box)
-
-			self.labels[(key, i)] = item
-			self.cells[(key, (i, i))] = box
-			grid['gridLayout'].addWidget(view, i, i)
-
-	def initialiseGrid(self, key):
-		"""
-			Creates a grid widget with default settings
+	def cellClicked(self, cell):
 		"""
-		# Initialise Grid that contains all the analyte graphs
-		grid = QWidget()
-		gridLayout = QGridLayout()
-		gridLayout.setSpacing(0)
-		grid.setLayout(gridLayout)
-		minSize = grid.minimumSize()
-		minSize.scale(1000, 1000, Qt.KeepAspectRatio)
-		grid.setMinimumSize(minSize)
+			Names the pair that was clicked
 
-		grid = { 'grid': grid, 'gridLayout': gridLayout}
-
-		self.grids[key] = grid
-
-		return grid
-	
-	# populate sample list
-	def populateSamples(self):
-		"""
-			Updates the list of available samples from the dataset viewable on the graph
+			Parameters
+			----------
+			cell : (int, int)
+				The row and column of the pair
 		"""
-
-		samples = self.project.eg.samples
-		self.sampleName = samples[0]
-
-		self.sampleList.clear()
-		self.sampleList.addItem("ALL")
-		for sample in samples:
-			self.sampleList.addItem(sample)
-
+		self.pairLabel.setText(self.mosaic.pairName(cell))
+	
 	def swapSample(self):
 		"""
 			sets current sample to selected sample
 		"""
-		selectedSamples = self.sampleList.selectedItems()
-		if len(selectedSamples) > 0:
-			selectedSample = selectedSamples[0]
-			self.sampleName = selectedSample.text()
+		selectedSample = self.sampleList.currentSample()
+		if selectedSample is not None:
+			self.sampleName = selectedSample
 
 		if self.populated:
-			self.createCrossplot()
-			self.graph.setParent(None)
-			self.graph = self.grids[self.sampleName+'False']['grid']
-			self.holderLayout.addWidget(self.graph)
+			self.showCrossplot()
 
 	def updateFilt(self):
 		"""
 			Generates a crossplot reflecting whether the filt checkbox is ticked or not
 		"""
-		if not self.filtCheckBox.isChecked():
-			self.createCrossplot()
-			self.graph.setParent(None)
-			self.graph = self.grids[self.sampleName+'False']['grid']
-			self.holderLayout.addWidget(self.graph)
-		else:
-			self.createCrossplot()
-			self.graph.setParent(None)
-			self.graph = self.grids[self.sampleName+'True']['grid']
-			self.holderLayout.addWidget(self.graph)
+		if self.populated:
+			self.showCrossplot()
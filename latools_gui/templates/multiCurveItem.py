@@ -0,0 +1,272 @@
+""" A graph item that draws many curves from one buffer, so that the graph's cost grows with points rather than lines """
+
+from PyQt5.QtCore import Qt, QRectF, pyqtSignal
+import pyqtgraph as pg
+import numpy as np
+
+# How close a click has to be to a curve to select it, in pixels
+CLICK_TOLERANCE = 5
+
+
+class Curve:
+	""" A handle to one of the curves in a MultiCurveItem, which can be used much like a PlotDataItem """
+
+	def __init__(self, item, key):
+		"""
+		Parameters
+		----------
+		item : MultiCurveItem
+			The item that draws the curve
+		key : object
+			The name of the curve in the item
+		"""
+		self.item = item
+		self.key = key
+
+	def setData(self, x, y):
+		""" Replaces the curve's points """
+		self.item.setCurveData({self.key: (x, y)})
+
+	def setPen(self, pen):
+		""" Changes the pen the curve is drawn with """
+		self.item.setCurvePen(self.key, pen)
+
+	def setVisible(self, visible):
+		""" Shows or hides the curve """
+		self.item.setCurveVisible(self.key, visible)
+
+	def show(self):
+		self.setVisible(True)
+
+	def hide(self):
+		self.setVisible(False)
+
+	def isVisible(self):
+		return self.item.isCurveVisible(self.key)
+
+
+class MultiCurveItem(pg.GraphicsObject):
+	"""
+	Draws a set of curves, each with its own pen, as a single graph item. The points of every curve are held in one
+	contiguous buffer, and the curves are drawn in the order they were added.
+	"""
+
+	# Emitted with the curve's key when a clickable curve is clicked
+	sigClicked = pyqtSignal(object)
+
+	def __init__(self):
+		super().__init__()
+		self.removeCurves()
+
+	def removeCurves(self):
+		""" Forgets every curve and its points """
+		self.keys = []
+		self.index = {}
+		self.pens = []
+		self.visible = np.zeros(0, dtype=bool)
+		self.clickable = np.zeros(0, dtype=bool)
+
+		# The points of curve i are x[offsets[i]:offsets[i + 1]] and y[offsets[i]:offsets[i + 1]]
+		self.x = np.zeros(0)
+		self.y = np.zeros(0)
+		self.offsets = np.zeros(1, dtype=int)
+
+		# The painter paths of each curve, made when the curve is first drawn after its points change
+		self.paths = []
+		self.bounds = None
+
+	def addCurve(self, key, pen, clickable=False):
+		"""
+		Adds an empty curve, which is drawn over the curves added before it
+
+		Parameters
+		----------
+		key : object
+			The name of the curve, which is emitted by sigClicked
+		pen : QPen
+			The pen the curve is drawn with
+		clickable : bool
+			Whether clicking the curve emits sigClicked
+
+		Returns
+		----------
+		Curve : A handle to the curve
+		"""
+		self.index[key] = len(self.keys)
+		self.keys.append(key)
+		self.pens.append(pg.mkPen(pen))
+		self.visible = np.append(self.visible, True)
+		self.clickable = np.append(self.clickable, clickable)
+		self.offsets = np.append(self.offsets, self.offsets[-1])
+		self.paths.append(None)
+		return Curve(self, key)
+
+	def curve(self, key):
+		""" Gets a handle to a curve """
+		return Curve(self, key)
+
+	def clear(self):
+		""" Removes every curve, and redraws the item empty """
+		self.removeCurves()
+		self.dataChanged()
+
+	def curveData(self, key):
+		""" Gets a curve's points, as views of the buffer """
+		i = self.index[key]
+		start, stop = self.offsets[i], self.offsets[i + 1]
+		return self.x[start:stop], self.y[start:stop]
+
+	def setCurveData(self, data):
+		"""
+		Replaces the points of some curves. The buffer is rebuilt once, however many curves change.
+
+		Parameters
+		----------
+		data : dict
+			The new (x, y) points of each curve that changes, keyed by the curve's key
+		"""
+		parts = [data[key] if key in data else self.curveData(key) for key in self.keys]
+		lengths = [len(x) for x, y in parts]
+
+		self.offsets = np.concatenate(([0], np.cumsum(lengths))).astype(int)
+		if len(parts) > 0:
+			self.x = np.concatenate([np.asarray(x, dtype=float) for x, y in parts])
+			self.y = np.concatenate([np.asarray(y, dtype=float) for x, y in parts])
+
+		for key in data:
+			self.paths[self.index[key]] = None
+		self.dataChanged()
+
+	def setCurvePen(self, key, pen):
+		""" Changes the pen a curve is drawn with """
+		self.pens[self.index[key]] = pg.mkPen(pen)
+		self.update()
+
+	def setCurveVisible(self, key, visible):
+		""" Shows or hides a curve """
+		i = self.index[key]
+		if self.visible[i] != visible:
+			self.visible[i] = visible
+			self.dataChanged()
+
+	def isCurveVisible(self, key):
+		return bool(self.visible[self.index[key]])
+
+	def dataChanged(self):
+		""" Lets the view know that the item's extent may have changed, and redraws it """
+		self.bounds = None
+		self.prepareGeometryChange()
+		self.informViewBoundsChanged()
+		self.update()
+
+	def visiblePoints(self):
+		""" Gets a mask of the points in the buffer that belong to visible curves """
+		return np.repeat(self.visible, np.diff(self.offsets))
+
+	def dataBounds(self, ax, frac=1.0, orthoRange=None):
+		"""
+		Gets the range of the visible curves along an axis, which the view uses to auto range
+
+		Parameters
+		----------
+		ax : int
+			0 for the x axis, or 1 for the y axis
+		frac : float
+			Unused, as every point is included
+		orthoRange : (float, float)
+			Only points within this range of the other axis are included, or None for every point
+
+		Returns
+		----------
+		(float, float) : The smallest and largest values, or (None, None) if nothing is drawn
+		"""
+		mask = self.visiblePoints()
+		if orthoRange is not None:
+			other = self.y if ax == 0 else self.x
+			mask = mask & (other >= orthoRange[0]) & (other <= orthoRange[1])
+
+		values = (self.x if ax == 0 else self.y)[mask]
+		values = values[np.isfinite(values)]
+		if len(values) == 0:
+			return None, None
+		return values.min(), values.max()
+
+	def boundingRect(self):
+		if self.bounds is None:
+			xmin, xmax = self.dataBounds(0)
+			ymin, ymax = self.dataBounds(1)
+			if xmin is None or ymin is None:
+				self.bounds = QRectF()
+			else:
+				self.bounds = QRectF(xmin, ymin, xmax - xmin, ymax - ymin)
+		return self.bounds
+
+	def paint(self, painter, *args):
+		for i, key in enumerate(self.keys):
+			if not self.visible[i] or self.offsets[i + 1] == self.offsets[i]:
+				continue
+			if self.paths[i] is None:
+				x, y = self.curveData(key)
+				self.paths[i] = pg.arrayToQPath(x, y, connect='finite')
+			painter.setPen(self.pens[i])
+			painter.drawPath(self.paths[i])
+
+	def curveAt(self, pos, tolerance=CLICK_TOLERANCE):
+		"""
+		Finds the clickable curve nearest a point, checking only the segments near it
+
+		Parameters
+		----------
+		pos : QPointF
+			The point, in data coordinates
+		tolerance : float
+			How close the curve has to be, in pixels
+
+		Returns
+		----------
+		object : The key of the nearest curve, or None if no curve is close enough
+		"""
+		xScale = self.pixelWidth() * tolerance
+		yScale = self.pixelHeight() * tolerance
+		if xScale == 0 or yScale == 0:
+			return None
+
+		nearest, nearestDistance = None, 1.0
+		# The curves drawn last are on top, so they are checked first
+		for i in reversed(range(len(self.keys))):
+			if not (self.visible[i] and self.clickable[i]):
+				continue
+			x, y = self.curveData(self.keys[i])
+
+			# The points are in time order, so only the segments within the tolerance of the click are checked
+			start = max(int(np.searchsorted(x, pos.x() - xScale)) - 1, 0)
+			stop = min(int(np.searchsorted(x, pos.x() + xScale)) + 1, len(x))
+			if stop - start < 1:
+				continue
+
+			# Distances are measured in units of the tolerance, so that x and y are on the same scale
+			px = (x[start:stop] - pos.x()) / xScale
+			py = (y[start:stop] - pos.y()) / yScale
+			if stop - start == 1:
+				distance = np.hypot(px, py)
+			else:
+				dx, dy = np.diff(px), np.diff(py)
+				length = dx ** 2 + dy ** 2
+				with np.errstate(divide='ignore', invalid='ignore'):
+					t = np.clip(-(px[:-1] * dx + py[:-1] * dy) / length, 0, 1)
+				t[length == 0] = 0
+				distance = np.hypot(px[:-1] + t * dx, py[:-1] + t * dy)
+
+			distance = distance[np.isfinite(distance)]
+			if len(distance) > 0 and distance.min() < nearestDistance:
+				nearest, nearestDistance = self.keys[i], distance.min()
+
+		return nearest
+
+	def mouseClickEvent(self, ev):
+		if ev.button() != Qt.LeftButton:
+			return
+		key = self.curveAt(ev.pos())
+		if key is not None:
+			ev.accept()
+			self.sigClicked.emit(key)
@@ -54,6 +54,12 @@ class ProgressPane:
 		# The object that updates the progress bar
 		self.progressUpdater = progressUpdater.ProgressUpdater(self.progressBar)
 
+		# A cancel button stops the stage call that is currently running
+		self.cancelButton = QPushButton("Cancel")
+		self.cancelButton.clicked.connect(self.cancelButtonClick)
+		self.cancelButton.setEnabled(False)
+		self.progressLayout.addWidget(self.cancelButton)
+
 		# We add a right button
 		self.rightButton = QPushButton("→")
 		self.rightButton.clicked.connect(self.rightButtonClick)
@@ -63,6 +69,10 @@ class ProgressPane:
 		self.leftButton.setEnabled(False)
 		self.rightButton.setEnabled(False)
 
+		# While a stage call is running on the worker thread, the project data mustn't be changed or plotted
+		self.project.stageRunner.busyChanged.connect(self.setBusy)
+		self.project.stageRunner.started.connect(self.jobStarted)
+
 	def addToLayout(self, stageLayout):
 		"""
 		Adds the progress pane to the stage layout. It is a function so that this can occur after the Controls
@@ -78,13 +88,51 @@ class ProgressPane:
 	def leftButtonClick(self):
 		""" Controls what happens when the left button is pressed. """
 
+		if self.project.stageRunner.isBusy():
+			return
 		self.stageTabs.leftPress()
 
 	def rightButtonClick(self):
 		""" Controls what happens when the right button is pressed. """
 
+		if self.project.stageRunner.isBusy():
+			return
 		self.stageTabs.rightPress()
 
+	def setBusy(self, busy):
+		"""
+		Locks the stages and graph while the stage runner is working, and unlocks them when it is done
+
+		Parameters
+		----------
+		busy : bool
+			Whether the stage runner is working
+		"""
+		self.stageTabs.tabs.setEnabled(not busy)
+		self.graphPane.graphFrame.setEnabled(not busy)
+		self.cancelButton.setEnabled(busy)
+
+		# The bar shows where the last job got to
+		if not busy:
+			self.progressUpdater.finish()
+
+	def jobStarted(self, name):
+		"""
+		Clears any earlier cancel request when the stage runner starts a new job
+
+		Parameters
+		----------
+		name : str
+			The name of the job
+		"""
+		self.progressUpdater.clearCancel()
+
+	def cancelButtonClick(self):
+		""" Cancels the running stage call and any calls waiting behind it """
+		self.cancelButton.setEnabled(False)
+		self.progressUpdater.cancel()
+		self.project.stageRunner.cancel()
+
 	def setRightEnabled(self):
 		""" To prevent moving through stages without running the data processing, the right button is
 			only enabled by the stages once the Apply button has been successfully pressed.
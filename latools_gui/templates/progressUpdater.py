@@ -1,10 +1,21 @@
 """ An interface for controlling the GUI progress bar """
 
 from PyQt5.QtWidgets import *
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from project.stageRunner import JobCancelled
+import threading
 
-class ProgressUpdater:
+# The most times per second the progress bar is repainted, however often it is updated
+FRAME_RATE = 30
+
+class ProgressUpdater(QObject):
 	""" Provides an interface that controls the GUI progress bar """
 
+	# The progress bar may only be changed on the GUI thread. Stage calls run on the stage runner's
+	# worker thread, so the start and end of a bar are passed through these signals.
+	rangeChanged = pyqtSignal(int)
+	resetRequested = pyqtSignal()
+
 	def __init__(self, progressBar):
 		"""
 		Lists a progress bar which will be updated when the controlling functions are called.
@@ -14,11 +25,26 @@ class ProgressUpdater:
 		progressBar : QProgressBar
 			The qt progress bar which will be updated
 		"""
+		super().__init__()
 		self.total = None
 		self.desc = None
 		self.value = 0
 		self.progressBar = progressBar
 
+		# The counters may be changed from any thread, so they are only read or written with the lock held
+		self.lock = threading.Lock()
+		self.cancelled = False
+
+		# Updates only change the counters. The bar is redrawn from them at a fixed frame rate, so that a
+		# long loop of updates doesn't cause a repaint for each step.
+		self.shownValue = None
+		self.frameTimer = QTimer(self)
+		self.frameTimer.setInterval(1000 // FRAME_RATE)
+		self.frameTimer.timeout.connect(self.refresh)
+
+		self.rangeChanged.connect(self.setBarRange)
+		self.resetRequested.connect(self.resetBar)
+
 	def __enter__(self):
 		""" A function that is required for this object to be interchangeable with other progress bars """
 		return self
@@ -46,22 +72,82 @@ class ProgressUpdater:
 		----------
 		Itself: A progress bar updating interface
 		"""
-		self.total = total
-		self.desc = desc
-		self.reset()
-		# QProgressBar works off the difference between a min and max
-		self.progressBar.setMinimum(1)
-		self.progressBar.setMaximum(total)
+		self.checkCancelled()
+		with self.lock:
+			self.total = total
+			self.desc = desc
+			self.value = 0
+		self.rangeChanged.emit(total)
 		return self
 
 	def update(self):
-		""" Called for each step of the progress bar. Increments the progress bar by 1 """
-		self.value += 1
-		if self.value <= self.total:
-			self.progressBar.setValue(self.value)
-		QApplication.processEvents()
+		"""
+		Called for each step of the progress bar. Increments the progress bar by 1.
+		If the job has been cancelled, a JobCancelled exception is raised to stop it.
+		"""
+		self.checkCancelled()
+		with self.lock:
+			self.value += 1
 
 	def reset(self):
 		""" Resets the progress bar """
+		with self.lock:
+			self.value = 0
+		self.resetRequested.emit()
+
+	def cancel(self):
+		""" Asks the job using this progress bar to stop at its next update """
+		with self.lock:
+			self.cancelled = True
+
+	def clearCancel(self):
+		""" Allows the next job to use this progress bar after a cancelled one """
+		with self.lock:
+			self.cancelled = False
+
+	def checkCancelled(self):
+		""" Raises a JobCancelled exception if the job has been cancelled """
+		with self.lock:
+			cancelled = self.cancelled
+		if cancelled:
+			raise JobCancelled()
+
+	def setBarRange(self, total):
+		"""
+		Sets the range of the progress bar and starts redrawing it. Always run on the GUI thread.
+
+		Parameters
+		----------
+		total : int
+			Number of steps
+		"""
+		# QProgressBar works off the difference between a min and max
+		self.progressBar.setMinimum(1)
+		self.progressBar.setMaximum(total)
+		self.shownValue = None
+		self.frameTimer.start()
+
+	def resetBar(self):
+		""" Resets the progress bar and stops redrawing it. Always run on the GUI thread. """
+		self.frameTimer.stop()
+		self.shownValue = None
 		self.progressBar.reset()
-		self.value = 0
+
+	def finish(self):
+		""" Draws the final state of the progress bar once the job using it has stopped. Always run on the GUI thread. """
+		self.frameTimer.stop()
+		self.refresh()
+
+	def refresh(self):
+		""" Redraws the progress bar if the counters have changed since the last frame """
+		with self.lock:
+			value = self.value
+			total = self.total
+
+		if value == self.shownValue or value < 1:
+			return
+		self.shownValue = value
+
+		if total is not None and value > total:
+			value = total
+		self.progressBar.setValue(value)
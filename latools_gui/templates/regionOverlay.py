@@ -0,0 +1,89 @@
+""" A graph item that shades many time ranges at once, such as the background and signal ranges of a sample """
+
+from PyQt5.QtCore import QRectF, QPointF
+from PyQt5.QtGui import QPainterPath
+import pyqtgraph as pg
+import numpy as np
+
+
+class RegionOverlay(pg.GraphicsObject):
+	"""
+	Shades groups of time ranges across the full height of the view, as a single graph item. Each group has its own
+	brush. The ranges are replaced in place, so no graph items are created or removed when they change.
+	"""
+
+	def __init__(self):
+		super().__init__()
+		# Drawn under the graph's lines
+		self.setZValue(-10)
+
+		# A list of (brush, ranges) pairs, where ranges is an (n x 2) array of the start and end of each range
+		self.groups = []
+
+		# The outline of each group's ranges, with a height of one, made when the ranges change
+		self.paths = []
+		self.xBounds = None
+
+	def setRegions(self, groups):
+		"""
+		Replaces every shaded range
+
+		Parameters
+		----------
+		groups : [(QBrush, array_like)]
+			The brush of each group, and the (start, end) of each of its ranges
+		"""
+		self.groups = []
+		self.paths = []
+		for brush, ranges in groups:
+			ranges = np.asarray(ranges, dtype=float).reshape(-1, 2)
+			self.groups.append((pg.mkBrush(brush), ranges))
+
+			path = QPainterPath()
+			for start, end in ranges:
+				path.addRect(QRectF(start, 0, end - start, 1))
+			self.paths.append(path)
+
+		lims = [ranges for brush, ranges in self.groups if len(ranges) > 0]
+		if len(lims) > 0:
+			lims = np.concatenate(lims)
+			self.xBounds = (lims.min(), lims.max())
+		else:
+			self.xBounds = None
+
+		self.prepareGeometryChange()
+		self.update()
+
+	def clear(self):
+		""" Removes every shaded range """
+		self.setRegions([])
+
+	def viewRangeChanged(self):
+		""" The ranges span the height of the view, so they are redrawn whenever it moves """
+		self.prepareGeometryChange()
+		self.update()
+
+	def dataBounds(self, ax, frac=1.0, orthoRange=None):
+		""" The shaded ranges are left out when the view auto ranges """
+		return None, None
+
+	def boundingRect(self):
+		view = self.viewRect()
+		if self.xBounds is None or view is None:
+			return QRectF()
+		return QRectF(self.xBounds[0], view.top(), self.xBounds[1] - self.xBounds[0], view.height())
+
+	def paint(self, painter, *args):
+		view = self.viewRect()
+		if view is None:
+			return
+
+		# The outlines are one unit high, so they are stretched to the height of the view
+		painter.save()
+		painter.setPen(pg.mkPen(None))
+		painter.translate(QPointF(0, view.top()))
+		painter.scale(1, view.height())
+		for (brush, ranges), path in zip(self.groups, self.paths):
+			painter.setBrush(brush)
+			painter.drawPath(path)
+		painter.restore()
@@ -0,0 +1,258 @@
+""" The sample lists of the graph windows, which all show one shared list of the project's samples """
+
+from PyQt5.QtWidgets import *
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QItemSelectionModel, pyqtSignal
+
+import re
+
+
+class SampleListModel(QAbstractListModel):
+	"""
+	The project's samples, shared by every graph window. The list views ask for only the rows they show,
+	so no item is created for each sample.
+	"""
+
+	def __init__(self, parent=None):
+		super().__init__(parent)
+		self.samples = []
+
+	def setSamples(self, samples):
+		"""
+		Replaces the list of samples, such as when a project is imported
+
+		Parameters
+		----------
+		samples : [str]
+			The names of the samples
+		"""
+		self.beginResetModel()
+		self.samples = list(samples)
+		self.endResetModel()
+
+	def rowCount(self, parent=QModelIndex()):
+		if parent.isValid():
+			return 0
+		return len(self.samples)
+
+	def data(self, index, role=Qt.DisplayRole):
+		if index.isValid() and role == Qt.DisplayRole:
+			return self.samples[index.row()]
+		return None
+
+
+class SampleFilterModel(QAbstractListModel):
+	"""
+	One graph window's view of the shared samples: the samples that match its search, after any extra entries
+	(such as "ALL") that the window lists first
+	"""
+
+	def __init__(self, source, extras=(), parent=None):
+		"""
+		Parameters
+		----------
+		source : SampleListModel
+			The shared samples
+		extras : [str]
+			Entries listed before the samples, which are always shown
+		"""
+		super().__init__(parent)
+		self.source = source
+		self.extras = list(extras)
+		self.search = ""
+
+		# The indexes of the shown samples in the shared list
+		self.rows = list(range(len(source.samples)))
+
+		source.modelReset.connect(self.sourceReset)
+
+	def sourceReset(self):
+		""" Filters the new samples with the current search """
+		self.beginResetModel()
+		self.rows = self.matchingRows(self.search, range(len(self.source.samples)))
+		self.endResetModel()
+
+	def setSearch(self, search):
+		"""
+		Shows only the samples that match a search. A search between slashes, such as /^Sample_1\\d$/,
+		is a regular expression. Any other search matches samples that contain it, ignoring case.
+		An invalid regular expression leaves the list as it is.
+
+		Parameters
+		----------
+		search : str
+			The search text
+		"""
+		if search == self.search:
+			return
+
+		# A longer version of a plain text search can only match samples the shorter one matched,
+		# so only those are checked again
+		if not isRegex(self.search) and not isRegex(search) and search.lower().startswith(self.search.lower()):
+			candidates = self.rows
+		else:
+			candidates = range(len(self.source.samples))
+
+		try:
+			rows = self.matchingRows(search, candidates)
+		except re.error:
+			return
+
+		self.beginResetModel()
+		self.search = search
+		self.rows = rows
+		self.endResetModel()
+
+	def matchingRows(self, search, candidates):
+		"""
+		Finds the samples that match a search
+
+		Parameters
+		----------
+		search : str
+			The search text
+		candidates : iterable of int
+			The indexes of the samples to check
+
+		Returns
+		----------
+		[int] : The indexes of the matching samples
+		"""
+		samples = self.source.samples
+		if search == "":
+			return list(candidates)
+		if isRegex(search):
+			pattern = re.compile(search[1:-1])
+			return [i for i in candidates if pattern.search(samples[i])]
+		search = search.lower()
+		return [i for i in candidates if search in samples[i].lower()]
+
+	def rowCount(self, parent=QModelIndex()):
+		if parent.isValid():
+			return 0
+		return len(self.extras) + len(self.rows)
+
+	def data(self, index, role=Qt.DisplayRole):
+		if index.isValid() and role == Qt.DisplayRole:
+			return self.entry(index.row())
+		return None
+
+	def entry(self, row):
+		""" Gets the text of a row """
+		if row < len(self.extras):
+			return self.extras[row]
+		return self.source.samples[self.rows[row - len(self.extras)]]
+
+	def rowOf(self, entry):
+		""" Gets the row an entry is shown in, or -1 if it isn't shown """
+		if entry in self.extras:
+			return self.extras.index(entry)
+		for row, i in enumerate(self.rows):
+			if self.source.samples[i] == entry:
+				return len(self.extras) + row
+		return -1
+
+	def entries(self):
+		""" Gets the text of every shown row """
+		return self.extras + [self.source.samples[i] for i in self.rows]
+
+
+def isRegex(search):
+	""" Checks whether a search is a regular expression, written between slashes """
+	return len(search) >= 2 and search.startswith("/") and search.endswith("/")
+
+
+class SampleList(QWidget):
+	""" A searchable list of samples, shown by a graph window """
+
+	# Emitted with the text of the selected entry whenever a different one is selected
+	sampleChanged = pyqtSignal(str)
+
+	def __init__(self, source, extras=(), parent=None):
+		"""
+		Parameters
+		----------
+		source : SampleListModel
+			The shared samples
+		extras : [str]
+			Entries listed before the samples, such as "ALL"
+		"""
+		super().__init__(parent)
+		self.model = SampleFilterModel(source, extras, self)
+		self.current = None
+
+		layout = QVBoxLayout(self)
+		layout.setContentsMargins(0, 0, 0, 0)
+
+		self.searchEdit = QLineEdit()
+		self.searchEdit.setPlaceholderText("Search")
+		self.searchEdit.setToolTip("Shows the samples that contain this text.\n"
+								   "Put a regular expression between slashes, such as /^Sample_1/, to match it instead.")
+		self.searchEdit.textChanged.connect(self.model.setSearch)
+		layout.addWidget(self.searchEdit)
+
+		self.listView = QListView()
+		self.listView.setModel(self.model)
+		# Every row is the same height, so the view doesn't need to measure each sample
+		self.listView.setUniformItemSizes(True)
+		self.listView.selectionModel().selectionChanged.connect(self.selectionChanged)
+		layout.addWidget(self.listView)
+
+		# The selection is cleared when the list is filtered, so the selected sample is selected again.
+		# A new list of samples starts with nothing selected.
+		self.model.modelReset.connect(self.restoreSelection)
+		source.modelAboutToBeReset.connect(self.clearSelection)
+
+	def setMaximumWidth(self, width):
+		super().setMaximumWidth(width)
+		self.searchEdit.setMaximumWidth(width)
+		self.listView.setMaximumWidth(width)
+
+	def count(self):
+		""" Returns the number of shown entries """
+		return self.model.rowCount()
+
+	def entries(self):
+		""" Gets the text of every shown entry, in order """
+		return self.model.entries()
+
+	def currentSample(self):
+		""" Gets the text of the selected entry, or None if nothing is selected """
+		return self.current
+
+	def setCurrentRow(self, row):
+		""" Selects an entry by its row. sampleChanged is emitted even if the entry was already selected. """
+		self.current = None
+		self.setCurrentIndex(self.model.index(row, 0))
+		if self.current is None:
+			self.selectionChanged()
+
+	def setCurrentSample(self, sample):
+		""" Selects an entry by its text, if it is shown """
+		row = self.model.rowOf(sample)
+		if row >= 0:
+			self.setCurrentRow(row)
+
+	def setCurrentIndex(self, index):
+		self.listView.selectionModel().setCurrentIndex(index, QItemSelectionModel.ClearAndSelect)
+
+	def selectionChanged(self, *args):
+		""" Emits sampleChanged when a different entry is selected """
+		selected = self.listView.selectionModel().selectedIndexes()
+		if len(selected) == 0:
+			return
+		sample = self.model.entry(selected[0].row())
+		if sample != self.current:
+			self.current = sample
+			self.sampleChanged.emit(sample)
+
+	def restoreSelection(self):
+		""" Selects the selected entry again after the list is filtered, without emitting sampleChanged """
+		row = self.model.rowOf(self.current)
+		if row >= 0:
+			index = self.model.index(row, 0)
+			self.setCurrentIndex(index)
+			self.listView.scrollTo(index)
+
+	def clearSelection(self):
+		""" Forgets the selected entry, so that selecting any entry of a new list emits sampleChanged """
+		self.current = None
@@ -0,0 +1,169 @@
+""" A graph item that marks where every sample starts, and shades the selected sample, such as on the bkg graph """
+
+from PyQt5.QtCore import Qt, QRectF, QPointF
+from PyQt5.QtGui import QPainterPath, QFontMetrics
+import pyqtgraph as pg
+import numpy as np
+
+# The space left between two labels, in pixels. A label that would be closer to the one before it isn't drawn.
+LABEL_SPACING = 4
+
+
+class SampleOverlay(pg.GraphicsObject):
+	"""
+	Draws a labelled line at the start of each sample, and shades the span of the selected sample, as a single
+	graph item. Labels that would overlap the one before them are left out, so that only some are shown when
+	the view is zoomed out.
+	"""
+
+	def __init__(self, linePen=None, labelColour=(0, 0, 0, 150), highlightBrush=(0, 0, 0, 25)):
+		"""
+		Parameters
+		----------
+		linePen : QPen
+			The pen of the lines at the start of each sample
+		labelColour : colour
+			The colour of the sample names
+		highlightBrush : brush
+			The brush that shades the selected sample
+		"""
+		super().__init__()
+		if linePen is None:
+			linePen = pg.mkPen(color=(0, 0, 0, 51), style=Qt.DashLine, width=2)
+		self.linePen = linePen
+		self.labelPen = pg.mkPen(labelColour)
+		self.highlightBrush = pg.mkBrush(highlightBrush)
+
+		# The samples, sorted by their start
+		self.names = []
+		self.starts = np.zeros(0)
+		self.ends = np.zeros(0)
+		self.rows = {}
+
+		# The lines at the start of each sample, with a height of one, made when the samples change
+		self.path = QPainterPath()
+		self.highlighted = None
+
+	def setSamples(self, names, starts, ends):
+		"""
+		Replaces the samples
+
+		Parameters
+		----------
+		names : [str]
+			The name of each sample
+		starts : array_like
+			The time each sample starts
+		ends : array_like
+			The time each sample ends
+		"""
+		starts = np.asarray(starts, dtype=float)
+		ends = np.asarray(ends, dtype=float)
+		order = np.argsort(starts, kind='stable')
+
+		self.names = [names[i] for i in order]
+		self.starts = starts[order]
+		self.ends = ends[order]
+		self.rows = {name: i for i, name in enumerate(self.names)}
+
+		self.path = QPainterPath()
+		for start in self.starts:
+			self.path.moveTo(start, 0)
+			self.path.lineTo(start, 1)
+
+		# The selected sample stays selected, if it's still there
+		if self.highlighted not in self.rows:
+			self.highlighted = None
+
+		self.prepareGeometryChange()
+		self.update()
+
+	def setHighlighted(self, name):
+		"""
+		Shades a sample, and removes the shading from any other
+
+		Parameters
+		----------
+		name : str or None
+			The sample to shade, or None to shade no sample
+		"""
+		if name not in self.rows:
+			name = None
+		if name != self.highlighted:
+			self.highlighted = name
+			self.update()
+
+	def viewRangeChanged(self):
+		""" The lines span the height of the view, so they are redrawn whenever it moves """
+		self.prepareGeometryChange()
+		self.update()
+
+	def dataBounds(self, ax, frac=1.0, orthoRange=None):
+		""" The samples are left out when the view auto ranges """
+		return None, None
+
+	def boundingRect(self):
+		view = self.viewRect()
+		if len(self.starts) == 0 or view is None:
+			return QRectF()
+		left = self.starts[0]
+		right = max(self.ends.max(), self.starts[-1])
+		return QRectF(left, view.top(), right - left, view.height())
+
+	def paint(self, painter, *args):
+		view = self.viewRect()
+		if view is None or len(self.starts) == 0:
+			return
+
+		painter.save()
+		if self.highlighted is not None:
+			row = self.rows[self.highlighted]
+			painter.setPen(pg.mkPen(None))
+			painter.setBrush(self.highlightBrush)
+			painter.drawRect(QRectF(self.starts[row], view.top(), self.ends[row] - self.starts[row], view.height()))
+
+		# The lines are one unit high, so they are stretched to the height of the view
+		painter.translate(QPointF(0, view.top()))
+		painter.scale(1, view.height())
+		painter.setPen(self.linePen)
+		painter.setBrush(pg.mkBrush(None))
+		painter.drawPath(self.path)
+		painter.restore()
+
+		self.paintLabels(painter, view)
+
+	def paintLabels(self, painter, view):
+		"""
+		Writes the names of the samples that start in the view, at its top, leaving out any that would overlap
+
+		Parameters
+		----------
+		painter : QPainter
+			The painter of the item
+		view : QRectF
+			The area of the view
+		"""
+		first, last = np.searchsorted(self.starts, [view.left(), view.right()])
+		if last <= first:
+			return
+
+		# The labels are written in screen pixels, so they aren't stretched with the view
+		transform = painter.transform()
+		xs = self.starts[first:last] * transform.m11() + transform.dx()
+		top = min(transform.map(QPointF(0, view.top())).y(), transform.map(QPointF(0, view.bottom())).y())
+
+		painter.save()
+		painter.resetTransform()
+		painter.setPen(self.labelPen)
+		metrics = QFontMetrics(painter.font())
+		baseline = top + metrics.ascent() + 2
+
+		right = -np.inf
+		for row in range(first, last):
+			x = xs[row - first]
+			if x < right:
+				continue
+			name = self.names[row]
+			painter.drawText(QPointF(x + 2, baseline), name)
+			right = x + 2 + metrics.width(name) + LABEL_SPACING
+		painter.restore()
@@ -78,6 +78,24 @@ class StageTabs:
 		# The export tab is enabled
 		self.tabs.setTabEnabled(len(self.STAGES) - 1, True)
 
+	def setOutdated(self, indexes):
+		"""
+		Marks the tabs of stages that need to be applied again, because an earlier stage has changed
+
+		Parameters
+		----------
+		indexes : [int]
+			The indexes of the out of date stages
+		"""
+		for i in range(len(self.tabsList)):
+			if i in indexes:
+				self.tabs.setTabText(i, self.STAGES[i] + " *")
+				self.tabs.setTabToolTip(i, "An earlier stage has changed since this stage was applied. "
+										   "Apply it again to update its results.")
+			else:
+				self.tabs.setTabText(i, self.STAGES[i])
+				self.tabs.setTabToolTip(i, "")
+
 	def rightPress(self):
 		""" When the right button is pressed we move to the next tab """
 		self.tabs.setCurrentIndex(self.tabs.currentIndex() + 1)
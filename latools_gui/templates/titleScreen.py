@@ -193,26 +193,37 @@ class TitleScreen():
 
 		if self.loadProjectBool:
 			# Load project
-			self.project.loadFile(self.projectName, self.fileLocation, self.progressUpdater)
+			self.titleGridWidget.setEnabled(False)
+			self.project.loadFile(self.projectName, self.fileLocation, self.progressUpdater, self.showStages)
 
 		elif self.newProjectBool:
 			# New project
 			self.projectName = self.nameEdit.text()
 			self.recentProjects.load(self.projectName, self.fileLocation)
 			self.project.newFile(self.projectName, None)
+			self.showStages()
 
 		else:
 			# Dropdown selected
 			self.projectName = self.recentDropdown.currentText()
 			self.fileLocation = self.recentProjects.getLocation(self.recentDropdown.currentIndex() - 1)
 			self.recentProjects.reorderDropdown(self.recentDropdown.currentIndex() - 1)
+			self.titleGridWidget.setEnabled(False)
 			try:
-				self.project.loadFile(self.projectName, self.fileLocation, self.progressUpdater)
+				self.project.loadFile(self.projectName, self.fileLocation, self.progressUpdater, self.showStages)
 			except:
+				self.titleGridWidget.setEnabled(True)
 				message = "The .lalog file could not be found."
 				errorBox = QMessageBox.critical(self.mainWidget, "Error", message, QMessageBox.Ok)
 				return
 
+	def showStages(self):
+		"""
+		Moves on to the stages screen once the project is ready. When loading a project, this is called once
+		all of the saved stages have been run.
+		"""
+		self.titleGridWidget.setEnabled(True)
+
 		# The project title is delivered to the stages screen
 		self.importListener.setTitle(self.projectName)
 
@@ -0,0 +1,68 @@
+""" Tests for naming the output folders of a batch, and reporting the state of each folder.
+	You can run these tests from the latools_gui directory with the command:
+	python -m unittest tests.test_batchQueue
+"""
+
+from concurrent.futures import Future
+import queue
+import unittest
+from project import batchQueue
+from project.batchQueue import outputNames
+
+
+class TestBatchQueue(unittest.TestCase):
+
+	def test_uniqueNames(self):
+		names = outputNames(["/data/a/run1", "/data/b/run1/", "/data/c/run2"])
+		self.assertEqual(names[2], "run2")
+		self.assertTrue(names[0].startswith("run1_"))
+		self.assertTrue(names[1].startswith("run1_"))
+		self.assertNotEqual(names[0], names[1])
+
+	def test_stableNames(self):
+		# A folder keeps its name wherever it is in the queue
+		first = outputNames(["/data/a/run1", "/data/b/run1"])
+		second = outputNames(["/data/b/run1", "/data/c/run3", "/data/a/run1"])
+		self.assertEqual(first[0], second[2])
+		self.assertEqual(first[1], second[0])
+
+
+class TestBatchStatus(unittest.TestCase):
+
+	def setUp(self):
+		# The queue is given futures that are set by hand, in place of a pool of processes
+		self.queue = batchQueue.BatchQueue("template.lalog", "out")
+		self.queue.folders = ["a", "b", "c"]
+		self.queue.futures = [Future() for folder in self.queue.folders]
+		self.queue.startedQueue = queue.Queue()
+
+	def states(self):
+		return [self.queue.status(i)[0] for i in range(len(self.queue.folders))]
+
+	def test_queuedUntilStarted(self):
+		# The pool marks a future as running as soon as it is handed to a process, before the project starts
+		for future in self.queue.futures:
+			future.set_running_or_notify_cancel()
+		self.assertEqual(self.states(), [batchQueue.QUEUED] * 3)
+
+		self.queue.startedQueue.put(1)
+		self.assertEqual(self.states(), [batchQueue.QUEUED, batchQueue.RUNNING, batchQueue.QUEUED])
+		self.assertFalse(self.queue.isFinished())
+
+	def test_finished(self):
+		self.queue.startedQueue.put(0)
+		self.queue.startedQueue.put(1)
+		self.queue.futures[0].set_running_or_notify_cancel()
+		self.queue.futures[0].set_result("out/a")
+		self.queue.futures[1].set_running_or_notify_cancel()
+		self.queue.futures[1].set_exception(ValueError("The template project has no import stage"))
+		self.queue.cancel()
+
+		self.assertEqual(self.queue.status(0), (batchQueue.DONE, "out/a"))
+		self.assertEqual(self.queue.status(1), (batchQueue.FAILED, "The template project has no import stage"))
+		self.assertEqual(self.queue.status(2), (batchQueue.CANCELLED, ""))
+		self.assertTrue(self.queue.isFinished())
+
+
+if __name__ == '__main__':
+	unittest.main()
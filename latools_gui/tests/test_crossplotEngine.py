@@ -0,0 +1,72 @@
+""" Tests for working out the histograms of the crossplot window.
+	You can run these tests from the latools_gui directory with the command:
+	python -m unittest tests.test_crossplotEngine
+"""
+
+import unittest
+import numpy as np
+from project.crossplotEngine import PairHistograms, HistogramCache, binEdges
+
+
+class TestCrossplotEngine(unittest.TestCase):
+
+	def setUp(self):
+		rng = np.random.RandomState(0)
+		self.values = rng.lognormal(size=(4, 5000)) * 1000
+		self.values[1, 100:200] = np.nan
+		self.values[2, 150:250] = np.nan
+		self.masks = np.ones(self.values.shape, dtype=bool)
+		self.masks[3, :1000] = False
+		self.histograms = PairHistograms(['Mg24', 'Al27', 'Ca43', 'Sr88'], self.values, self.masks, 'rawdata',
+										 'Ca43', 25)
+
+	def expected(self, i, j):
+		""" The histogram of a pair, from np.histogram2d with the same bins """
+		ind = np.isfinite(self.values[i]) & np.isfinite(self.values[j]) & self.masks[i] & self.masks[j]
+		pi = self.values[i][ind] * self.histograms.multipliers[self.histograms.analytes[i]]
+		pj = self.values[j][ind] * self.histograms.multipliers[self.histograms.analytes[j]]
+		return np.histogram2d(pi, pj, [self.histograms.edges[self.histograms.analytes[i]],
+									   self.histograms.edges[self.histograms.analytes[j]]])[0]
+
+	def test_matchesHistogram2d(self):
+		for i, j in [(0, 1), (1, 2), (2, 3), (0, 3)]:
+			np.testing.assert_array_equal(self.histograms.pair(i, j), self.expected(i, j))
+
+	def test_transpose(self):
+		np.testing.assert_array_equal(self.histograms.pair(3, 1), self.expected(3, 1))
+		# Only one histogram is kept for the pair and its mirror
+		self.assertEqual(list(self.histograms.histograms.keys()), [(1, 3)])
+
+	def test_complete(self):
+		for i, j in self.histograms.pairs():
+			self.histograms.pair(i, j)
+		self.assertTrue(self.histograms.complete())
+		# The bin indices are dropped once every pair is done
+		self.assertIsNone(self.histograms.indices)
+		np.testing.assert_array_equal(self.histograms.pair(2, 0), self.expected(2, 0))
+
+	def test_pairsBySpread(self):
+		# Al27 varies the most, then Mg24
+		self.values[1] = self.values[1] ** 2
+		self.values[2] = 1000 + self.values[2] / 100
+		self.values[3] = 1000 + self.values[3] / 10
+		histograms = PairHistograms(['Mg24', 'Al27', 'Ca43', 'Sr88'], self.values, None, 'rawdata', 'Ca43', 25)
+
+		pairs = histograms.pairsBySpread()
+		self.assertEqual(pairs, [(0, 1), (1, 3), (0, 3), (1, 2), (0, 2), (2, 3)])
+
+	def test_singleValue(self):
+		edges = binEdges(np.array([5., 5.]), 4)
+		self.assertEqual(edges[0], 4.5)
+		self.assertEqual(edges[-1], 5.5)
+
+	def test_cacheBudget(self):
+		cache = HistogramCache(budget=self.histograms.nbytes() + 1)
+		cache.add(('a', '', 25), self.histograms)
+		cache.add(('b', '', 25), self.histograms)
+		self.assertIsNone(cache.get(('a', '', 25)))
+		self.assertIs(cache.get(('b', '', 25)), self.histograms)
+
+
+if __name__ == '__main__':
+	unittest.main()
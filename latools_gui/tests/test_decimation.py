@@ -0,0 +1,53 @@
+""" Tests for summarising traces into min/max pyramids for drawing.
+	You can run these tests from the latools_gui directory with the command:
+	python -m unittest tests.test_decimation
+"""
+
+import unittest
+import numpy as np
+from project.decimation import MinMaxPyramid
+
+
+class TestDecimation(unittest.TestCase):
+
+	def setUp(self):
+		self.x = np.arange(50001) * 0.1
+		self.y = np.sin(self.x) + 2
+		self.y[12345] = 100
+		self.y[30000] = -5
+		self.y[20000:20010] = np.nan
+		self.pyramid = MinMaxPyramid(self.x, self.y)
+
+	def test_spikesKept(self):
+		x, y = self.pyramid.select(pixels=500)
+
+		self.assertLess(len(x), 4 * 500)
+		self.assertEqual(np.nanmax(y), 100)
+		self.assertEqual(np.nanmin(y), -5)
+		self.assertEqual(x[np.nanargmax(y)], self.x[12345])
+
+	def test_ordered(self):
+		x, y = self.pyramid.select(1000, 2000, pixels=500)
+
+		self.assertTrue(np.all(np.diff(x) >= 0))
+
+		# The rest of the trace is still drawn, at a coarser level
+		self.assertLess(x[0], 10)
+		self.assertGreater(x[-1], 4990)
+
+	def test_zoomedIn(self):
+		# With fewer samples in view than pixels, every sample in view is drawn
+		x, y = self.pyramid.select(1230, 1240, pixels=500)
+		inView = (self.x >= 1230) & (self.x <= 1240)
+
+		np.testing.assert_array_equal(np.intersect1d(x, self.x[inView]), self.x[inView])
+		self.assertEqual(np.nanmax(y), 100)
+
+	def test_short(self):
+		pyramid = MinMaxPyramid(self.x[:100], self.y[:100])
+		x, y = pyramid.select(pixels=500)
+
+		np.testing.assert_array_equal(x, self.x[:100])
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,89 @@
+""" Tests for reading the stage calls out of an .lalog file.
+	You can run these tests from the latools_gui directory with the command:
+	python -m unittest tests.test_lalogParser
+"""
+
+import unittest
+from project import lalogParser
+
+LOG = ["# Analysis Log",
+	   "__init__ :: args=() kwargs={'data_folder': './data', 'config': 'DEFAULT', 'extension': '.csv', "
+	   "'srm_identifier': 'STD'}",
+	   "despike :: args=() kwargs={'expdecay_despiker': False, 'exponent': None, 'noise_despiker': True, "
+	   "'win': 3.0, 'nlim': 12.0, 'exponentplot': False, 'maxiter': 4}",
+	   "autorange :: args=() kwargs={'analyte': 'total_counts', 'gwin': 5, 'swin': 3, 'win': 20, "
+	   "'on_mult': [1.0, 1.5], 'off_mult': [1.5, 1.0], 'transform': False}",
+	   "bkg_calc_interp1d :: args=() kwargs={'analytes': None, 'kind': 1, 'n_min': 10}",
+	   "bkg_calc_weightedmean :: args=() kwargs={'analytes': None, 'weight_fwhm': None, 'n_min': 20}",
+	   "bkg_subtract :: args=() kwargs={'analytes': None, 'errtype': 'stderr', 'focus_stage': 'despiked'}",
+	   "filter_threshold :: args=() kwargs={'analyte': 'Al27', 'threshold': 100.0}",
+	   "filter_threshold_percentile :: args=() kwargs={'analyte': 'Al27', 'percentiles': [50]}",
+	   "filter_on :: args=('0_Al27_thresh_below', 'Ca43') kwargs={}",
+	   "filter_off :: args=('0_Al27_thresh_below',) kwargs={}"]
+
+
+class TestLalogParser(unittest.TestCase):
+
+	def test_stages(self):
+		contents = lalogParser.parseLog(LOG)
+
+		self.assertEqual(contents.lastStage, 3)
+		self.assertEqual(contents.stageParams["import"]["data_folder"], "./data")
+		self.assertEqual(contents.stageParams["despike"]["win"], 3.0)
+		self.assertEqual(contents.stageParams["autorange"]["on_mult"], [1.0, 1.5])
+
+		# Only the most recent background calculation is kept
+		self.assertIn("bkg_calc_weightedmean", contents.stageParams)
+		self.assertNotIn("bkg_calc_interp1d", contents.stageParams)
+
+	def test_filters(self):
+		contents = lalogParser.parseLog(LOG)
+
+		self.assertEqual([f[0] for f in contents.filters], ["filter_threshold", "filter_threshold_percentile"])
+		self.assertEqual(contents.filters[0][1]["threshold"], 100.0)
+
+		# Turning the filter off for every analyte overrides turning it on for one
+		self.assertEqual(contents.filterOnOff, [("filter_off", ('0_Al27_thresh_below',))])
+
+	def test_collapseSwitches(self):
+		toggles = ["filter_on :: args=('0_Al27_thresh_below', 'Ca43') kwargs={}",
+				   "filter_off :: args=('0_Al27_thresh_below', 'Ca43') kwargs={}",
+				   "filter_on :: args=('1_Mg24_thresh_above',) kwargs={}",
+				   "filter_on :: args=('0_Al27_thresh_below', 'Ca43') kwargs={}",
+				   "filter_off :: args=('1_Mg24_thresh_above', 'Al27') kwargs={}"]
+		contents = lalogParser.parseLog(toggles * 100)
+
+		self.assertEqual(contents.filterOnOff, [("filter_on", ('1_Mg24_thresh_above',)),
+												("filter_on", ('0_Al27_thresh_below', 'Ca43')),
+												("filter_off", ('1_Mg24_thresh_above', 'Al27'))])
+
+	def test_unknownLines(self):
+		contents = lalogParser.parseLog(["despike :: args=(1,) kwargs={}",
+										 "not a call",
+										 "ratio :: args=() kwargs={'internal_standard': 'Ca43'}"])
+
+		self.assertEqual(contents.stageParams, {"ratio": {"internal_standard": "Ca43"}})
+		self.assertEqual(contents.lastStage, 4)
+
+	def test_isFilterLine(self):
+		filterLines = [line for line in LOG if lalogParser.isFilterLine(line)]
+
+		self.assertEqual(filterLines, LOG[-4:])
+		self.assertFalse(lalogParser.isFilterLine("# Analysis Log"))
+
+	def test_empty(self):
+		contents = lalogParser.parseLog([])
+
+		self.assertEqual(contents.lastStage, -1)
+		self.assertEqual(contents.stageParams, {})
+
+	def test_blankNones(self):
+		contents = lalogParser.parseLog(LOG)
+		lalogParser.blankNones(contents.stageParams)
+
+		self.assertEqual(contents.stageParams["despike"]["exponent"], "")
+		self.assertEqual(contents.stageParams["bkg_subtract"]["analytes"], "")
+		self.assertEqual(contents.stageParams["despike"]["maxiter"], 4)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,59 @@
+""" Tests for recording which stage results are up to date.
+	You can run these tests from the latools_gui directory with the command:
+	python -m unittest tests.test_pipeline
+"""
+
+import unittest
+from project import pipeline
+
+IMPORT = {"data_folder": "./data", "config": "DEFAULT", "extension": ".csv", "srm_identifier": "STD"}
+AUTORANGE = {"analyte": "total_counts", "gwin": 5, "swin": 3, "win": 20, "on_mult": [1.0, 1.5],
+			 "off_mult": [1.5, 1.0], "transform": False}
+WEIGHTEDMEAN = {"analytes": None, "weight_fwhm": None, "n_min": 20}
+
+
+class TestPipeline(unittest.TestCase):
+
+	def setUp(self):
+		self.pipeline = pipeline.Pipeline()
+		self.pipeline.applied("import", IMPORT, "eg")
+		self.pipeline.applied("autorange", AUTORANGE)
+		self.pipeline.applied("bkg_calc_weightedmean", WEIGHTEDMEAN)
+
+	def test_unchanged(self):
+		self.assertTrue(self.pipeline.isCurrent("import", dict(IMPORT)))
+		self.assertTrue(self.pipeline.isCurrent("autorange", AUTORANGE))
+		self.assertEqual(self.pipeline.result("import"), "eg")
+
+	def test_changedParams(self):
+		self.assertFalse(self.pipeline.isCurrent("autorange", dict(AUTORANGE, win=30)))
+
+		# The other background calculation is recorded as the same result, so it replaces the first
+		self.assertFalse(self.pipeline.isCurrent("bkg_calc_interp1d", WEIGHTEDMEAN))
+
+	def test_downstreamOutdated(self):
+		outdated = self.pipeline.applied("autorange", dict(AUTORANGE, win=30))
+
+		self.assertEqual(outdated, ["bkg_calc"])
+		self.assertEqual(self.pipeline.outdatedStages(), [3])
+		self.assertFalse(self.pipeline.isCurrent("bkg_calc_weightedmean", WEIGHTEDMEAN))
+
+		# Applying the outdated stage again brings it up to date
+		self.pipeline.applied("bkg_calc_weightedmean", WEIGHTEDMEAN)
+		self.assertEqual(self.pipeline.outdatedStages(), [])
+
+	def test_optionalStage(self):
+		# Despiking after autorange means autorange was run on the raw data
+		outdated = self.pipeline.applied("despike", {"win": 3})
+
+		self.assertEqual(outdated, ["autorange", "bkg_calc"])
+		self.assertEqual(self.pipeline.outdatedStages(), [2, 3])
+
+	def test_clear(self):
+		self.pipeline.clear()
+
+		self.assertFalse(self.pipeline.isCurrent("import", IMPORT))
+		self.assertIsNone(self.pipeline.result("import"))
+
+if __name__ == '__main__':
+	unittest.main()
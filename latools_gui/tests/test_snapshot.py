@@ -0,0 +1,54 @@
+""" Tests for storing the tables and arrays of a project snapshot.
+	You can run these tests from the latools_gui directory with the command:
+	python -m unittest tests.test_snapshot
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+import uncertainties.unumpy as un
+from project.snapshot import putArray, getArray, putTable, getTable, STD_SUFFIX
+
+
+class TestSnapshot(unittest.TestCase):
+
+	def test_uncertainArray(self):
+		arrays = {}
+		values = un.uarray([1., 2., np.nan], [0.1, 0.2, 0.3])
+		putArray(arrays, "ratios", values)
+
+		# Only plain numeric arrays are stored
+		self.assertEqual(sorted(arrays), ["ratios", "ratios" + STD_SUFFIX])
+		self.assertEqual(arrays["ratios"].dtype, float)
+
+		restored = getArray(arrays, "ratios")
+		np.testing.assert_array_equal(un.nominal_values(restored), un.nominal_values(values))
+		np.testing.assert_array_equal(un.std_devs(restored), un.std_devs(values))
+
+	def test_multiIndexTable(self):
+		index = pd.MultiIndex.from_arrays([["Mg24", "Mg24", "Sr88"], ["STD-1", "STD-2", "STD-1"], [10., 250., 10.]],
+										  names=[None, "STD", "gTime"])
+		table = pd.DataFrame({"meas_mean": [1., 2., 3.], "srm_mean": [1.5, 2.5, 3.5]}, index=index)
+
+		arrays = {}
+		layout = putTable(arrays, "srmtabs", table)
+		self.assertTrue(all(a.dtype.kind in "fU" for a in arrays.values()))
+
+		restored = getTable(arrays, "srmtabs", layout)
+		np.testing.assert_array_equal(restored.loc["Mg24", "meas_mean"].values, [1., 2.])
+		self.assertEqual(list(restored.index.names), [None, "STD", "gTime"])
+
+	def test_uncertainColumns(self):
+		columns = pd.MultiIndex.from_product([["Mg24", "Sr88"], ["m"]])
+		table = pd.DataFrame([un.uarray([1., 2.], [0.1, 0.2]), un.uarray([3., 4.], [0.3, 0.4])],
+							 index=[0., 100.], columns=columns)
+
+		arrays = {}
+		restored = getTable(arrays, "calib_params", putTable(arrays, "calib_params", table))
+
+		self.assertEqual(list(restored.columns), [("Mg24", "m"), ("Sr88", "m")])
+		np.testing.assert_array_equal(un.std_devs(restored.loc[:, ("Sr88", "m")].values), [0.2, 0.4])
+
+
+if __name__ == '__main__':
+	unittest.main()
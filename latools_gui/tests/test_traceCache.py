@@ -0,0 +1,53 @@
+""" Tests for working out the filter masks of the trace cache.
+	You can run these tests from the latools_gui directory with the command:
+	python -m unittest tests.test_traceCache
+"""
+
+import unittest
+import numpy as np
+from project.traceCache import filterMasks
+
+
+class FakeFilt:
+	""" Holds only the parts of a latools filt object that filterMasks uses """
+
+	def __init__(self, components, switches, size):
+		self.components = components
+		self.switches = switches
+		self.size = size
+
+
+class TestFilterMasks(unittest.TestCase):
+
+	def test_switchedComponents(self):
+		rng = np.random.RandomState(0)
+		analytes = ["Mg24", "Sr88", "Ba138", "Al27"]
+		components = {name: rng.rand(50) > 0.3 for name in ["thresh_below", "thresh_above", "defrag", "signal"]}
+		switches = {
+			"Mg24": {"thresh_below": True, "thresh_above": False, "defrag": True, "signal": False},
+			"Sr88": {"thresh_below": False, "thresh_above": True, "defrag": True, "signal": True},
+			# A component missing from an analyte's switches is off
+			"Ba138": {"signal": True},
+			"Al27": {name: False for name in components},
+		}
+		masks = filterMasks(FakeFilt(components, switches, 50), analytes)
+
+		self.assertEqual(masks.shape, (4, 50))
+		self.assertEqual(masks.dtype, bool)
+		for row, analyte in enumerate(analytes):
+			expected = np.ones(50, dtype=bool)
+			for name, on in switches[analyte].items():
+				if on:
+					expected &= components[name]
+			np.testing.assert_array_equal(masks[row], expected)
+
+		# With no components switched on, nothing is filtered out
+		self.assertTrue(masks[3].all())
+
+	def test_noComponents(self):
+		masks = filterMasks(FakeFilt({}, {"Mg24": {}, "Sr88": {}}, 20), ["Mg24", "Sr88"])
+		np.testing.assert_array_equal(masks, np.ones((2, 20), dtype=bool))
+
+
+if __name__ == '__main__':
+	unittest.main()